@@ -104,7 +104,7 @@ class AddHabitFrame(wx.Frame):
         Handles the saving of an edited habit.
 
         Gathers the habit details from the input fields, updates the habit, and saves it
-        using the Orchestrator. Also, refreshes the main menu list and closes the frame.
+        using the Orchestrator, which updates the row of the habit in the main menu list. Then closes the frame.
 
         Parameters:
             event (wx.Event, optional): The event object. Defaults to None.
@@ -115,8 +115,7 @@ class AddHabitFrame(wx.Frame):
         new_frequency = self.frequency_choice.GetString(self.frequency_choice.GetSelection())
         self.habit.edit_habit(new_name, new_goal, new_frequency)
         self.habit.next_due_date = self.habit.calculate_next_due_date()
-        self.Orchestrator.save_data()
-        self.Orchestrator.refresh_main_menu_list()
+        self.Orchestrator.habit_edited(self.habit)
         self.Close()
 
     def on_frequency_choice(self, event):
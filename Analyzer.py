@@ -1,5 +1,63 @@
 import logging
-from datetime import datetime, timedelta
+import os
+from datetime import datetime, date
+from typing import NamedTuple, Optional
+from frequencyRules import compile_frequency, EveryNDaysRule
+
+
+class StreakPoint(NamedTuple):
+    """
+    The state of a habit right after one log entry, see streak_series().
+
+    Attributes:
+        date (str): The log entry in 'YYYY-MM-DD' format.
+        streak (int): The streak including this entry.
+        broken (bool): True if the streak was broken right before this entry.
+        next_due_date (str): The date the habit was due next after this entry in 'YYYY-MM-DD' format.
+    """
+    date: str
+    streak: int
+    broken: bool
+    next_due_date: str
+
+
+class HabitStats(NamedTuple):
+    """
+    The statistics of a habit, calculated once by summarize().
+
+    Attributes:
+        current_streak (int): The streak at the last log entry.
+        longest_streak (int): The longest streak.
+        times_broken (int): How often the streak was broken.
+        consistency (float): The consistency rate as a percentage, see calculate_consistency_rate.
+        average_gap (int): The average number of days between two log entries, rounded.
+        longest_gap (int): The longest break in days.
+        first_date (str or None): The first log entry in 'YYYY-MM-DD' format.
+        last_date (str or None): The last log entry in 'YYYY-MM-DD' format.
+        month_counts (tuple): Pairs of (year, month) and the number of log entries in that month, oldest first.
+    """
+    current_streak: int
+    longest_streak: int
+    times_broken: int
+    consistency: float
+    average_gap: int
+    longest_gap: int
+    first_date: Optional[str]
+    last_date: Optional[str]
+    month_counts: tuple
+
+    def performed_in_month(self, month, year):
+        """
+        Returns the number of log entries in a month.
+
+        Parameters:
+            month (int): The month (1-12).
+            year (int): The year.
+
+        Returns:
+            int: The count of log entries in that month.
+        """
+        return dict(self.month_counts).get((year, month), 0)
 
 
 def average_duration_between_dates(dates):
@@ -27,6 +85,9 @@ def count_performed_in_month(dates, month, year):
     """
     Count the number of times the habit was performed in a specific month.
 
+    Habits keep these counts in their calendar index, see Habit.calendar. This function is for plain
+    lists of dates, e.g. from a savefile.
+
     Parameters:
         dates (list): List of dates in 'YYYY-MM-DD' format.
         month (int): The month to filter by (1-12).
@@ -35,7 +96,27 @@ def count_performed_in_month(dates, month, year):
     Returns:
         int: The count of dates that fall in the specified month and year.
     """
-    return len([date for date in dates if datetime.strptime(date, "%Y-%m-%d").month == month and datetime.strptime(date, "%Y-%m-%d").year == year])
+    # The dates are zero padded, so the month is a prefix of the date and nothing needs to be parsed.
+    prefix = f"{year:04d}-{month:02d}-"
+    return sum(1 for date in dates if date.startswith(prefix))
+
+
+def count_performed_per_month(dates):
+    """
+    Counts the number of times the habit was performed in every month that has logs.
+
+    Parameters:
+        dates (list): List of dates in 'YYYY-MM-DD' format.
+
+    Returns:
+        dict: Mapping of (year, month) to the count, oldest month first.
+    """
+    counts = {}
+    for date_str in sorted(dates):
+        performed = datetime.strptime(date_str, "%Y-%m-%d")
+        key = (performed.year, performed.month)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
 
 
 def longest_break_between_dates(dates):
@@ -55,12 +136,13 @@ def longest_break_between_dates(dates):
     return max(breaks) if breaks else 0
 
 
-def days_until_date(target_date_str: str) -> int:
+def days_until_date(target_date_str: str, as_of: Optional[str] = None) -> int:
     """
     Returns the number of days until or since the given target date.
 
     Parameters:
         target_date_str (str): Target date as a string in "YYYY-MM-DD" format.
+        as_of (str, optional): The date to count from in "YYYY-MM-DD" format. Defaults to today.
 
     Returns:
         int: Number of days until target date. Positive if the target date is in the future, negative if it is in the past.
@@ -72,8 +154,8 @@ def days_until_date(target_date_str: str) -> int:
         logging.error(f"Invalid date format: {target_date_str}. Expected format is YYYY-MM-DD.")
         raise e
 
-    # Calculate the difference between target date and current date
-    today = datetime.now().date()
+    # Calculate the difference between target date and the reference date
+    today = datetime.strptime(as_of, "%Y-%m-%d").date() if as_of else datetime.now().date()
     difference = target_date - today
     logging.debug(f"Days until {target_date_str}: {difference.days}")
 
@@ -96,11 +178,9 @@ def find_longest_streak(date_logs: list[str], frequency: str) -> int:
     current_streak = 1
     streak_broken = 0
 
-    for i in range(1, len(date_logs)):
-        prev_date = datetime.strptime(date_logs[i-1], "%Y-%m-%d")
-        curr_date = datetime.strptime(date_logs[i], "%Y-%m-%d")
-
-        if verify_frequency_in_range(curr_date, prev_date, frequency):
+    days = [datetime.strptime(date_log, "%Y-%m-%d").toordinal() for date_log in date_logs]
+    for in_range in compile_frequency(frequency).in_range_many(days):
+        if in_range:
             current_streak += 1
         else:
 
@@ -139,68 +219,164 @@ def calculate_consistency_rate(date_logs: list[str], frequency: str):
     return consistency_rate
 
 
+def summarize(logs: list[str], frequency: str) -> HabitStats:
+    """
+    Calculates all statistics of a habit in a single pass over its logs.
+
+    Parameters:
+        logs (list[str]): List of dates in "YYYY-MM-DD" format sorted in ascending order.
+        frequency (str): Expected frequency of habit; "Daily", "Weekly", "Monthly", or a digit as a string.
+
+    Returns:
+        HabitStats: The statistics of the habit.
+    """
+    return summarize_days([datetime.strptime(log, "%Y-%m-%d").toordinal() for log in logs], frequency)
+
+
+def summarize_days(days, frequency: str) -> HabitStats:
+    """
+    Calculates all statistics of a habit from its day ordinals, see summarize().
+
+    Habits already keep their logs as day ordinals (Habit.log_days), so no dates need to be parsed.
+
+    Parameters:
+        days (sequence of int): The day ordinals sorted in ascending order.
+        frequency (str): Expected frequency of habit; "Daily", "Weekly", "Monthly", or a digit as a string.
+
+    Returns:
+        HabitStats: The statistics of the habit.
+    """
+    rule = compile_frequency(frequency)
+    current_streak = 1
+    longest_streak = 1
+    times_broken = 0
+    gap_sum = 0
+    longest_gap = 0
+    month_counts = {}
+
+    prev_day = None
+    # The month of the last day and the day ordinal it ends on, so dates are only built once per month.
+    month = None
+    month_end = 0
+    for day in days:
+        if day > month_end:
+            log_date = date.fromordinal(day)
+            month = (log_date.year, log_date.month)
+            months = log_date.year * 12 + log_date.month
+            month_end = date(months // 12, months % 12 + 1, 1).toordinal() - 1
+        month_counts[month] = month_counts.get(month, 0) + 1
+
+        if prev_day is not None:
+            gap = day - prev_day
+            gap_sum += gap
+            longest_gap = max(longest_gap, gap)
+            if rule.in_range(prev_day, day):
+                current_streak += 1
+                longest_streak = max(longest_streak, current_streak)
+            else:
+                times_broken += 1
+                current_streak = 1
+        prev_day = day
+
+    total = len(days)
+    if total == 0:
+        consistency = 0.0
+    elif total == 1:
+        consistency = 100.0
+    else:
+        # Same definition as calculate_consistency_rate.
+        consistency = (total - times_broken) / total * 100 if longest_streak > 1 else 0.0
+
+    return HabitStats(
+        current_streak=current_streak,
+        longest_streak=longest_streak,
+        times_broken=times_broken,
+        consistency=consistency,
+        average_gap=round(gap_sum / (total - 1)) if total > 1 else 0,
+        longest_gap=longest_gap,
+        first_date=date.fromordinal(days[0]).isoformat() if total else None,
+        last_date=date.fromordinal(days[-1]).isoformat() if total else None,
+        month_counts=tuple(month_counts.items())
+    )
+
+
+def streak_series(logs: list[str], frequency: str, as_of: Optional[str] = None) -> list[StreakPoint]:
+    """
+    Calculates the streak, whether it was broken and the next due date at every log entry in one pass.
+
+    Parameters:
+        logs (list[str]): List of dates in "YYYY-MM-DD" format sorted in ascending order.
+        frequency (str): Expected frequency of habit; "Daily", "Weekly", "Monthly", or a digit as a string.
+        as_of (str, optional): Reference date in "YYYY-MM-DD" format. Entries after it are left out and checks
+                               that depend on the current day are done as of this day. Defaults to today.
+
+    Returns:
+        list[StreakPoint]: One point per log entry up to the reference date.
+    """
+    rule = compile_frequency(frequency)
+    today = datetime.strptime(as_of, "%Y-%m-%d").date().toordinal() if as_of else date.today().toordinal()
+
+    series = []
+    streak = 0
+    prev_day = None
+    for log in logs:
+        day = datetime.strptime(log, "%Y-%m-%d").date().toordinal()
+        if day > today:
+            break
+        broken = prev_day is not None and not rule.in_range_on(prev_day, day, today)
+        streak = 1 if prev_day is None or broken else streak + 1
+        series.append(StreakPoint(log, streak, broken, date.fromordinal(rule.next_due(day)).isoformat()))
+        prev_day = day
+    return series
+
+
 def next_habit_due(last_performed_str: str, frequency: str) -> str:
     """
-    Checks if the habit is overdue based on the last performed date and frequency.
+    Calculates the date the habit is due next based on the last performed date and frequency.
+
+    The due date only depends on the last performed date, not on the current date. Use days_until_date
+    with as_of to check it against any reference date.
 
     Parameters:
         last_performed_str (str): Last date the habit was performed, in 'YYYY-MM-DD' format.
         frequency (str): Expected frequency of the habit; can be "Daily", "Weekly", "Monthly", or a digit as a string representing days.
-        today_str (str): Optional. The date to check, in 'YYYY-MM-DD' format. Defaults to the current date.
 
     Returns:
-        bool: True if the habit is overdue, False otherwise.
+        str: The next due date in 'YYYY-MM-DD' format.
     """
     logging.debug("Analyzer.next_habit_due called")
-    today = datetime.now()
-    today_str = today.strftime("%Y-%m-%d")
-    last_performed = datetime.strptime(last_performed_str, "%Y-%m-%d")
-
     logging.debug(f"Analyzer.next_habit_due frequency {frequency}")
 
-    # Based on the frequency we need to do different things.
-    if frequency == 'Daily':
-        due_date = last_performed + timedelta(days=1)
-
-    elif frequency == "Weekly" or frequency == "Monthly":
-        if frequency == "Weekly":
-            check_range = 15
-        else:
-            check_range = 63  # Max days of two consecutiv months. Happening for juli and dcember and the onth after.
-        last_true = None
-        # To find the next due date we will iterate through all possible dates until we find the first one that doesnt fit.
-        # The one before is our new due date.
-        for i in range(check_range):
-            possible_due_date = last_performed + timedelta(days=i)
-            debug_string = f"possible_due_date {str(possible_due_date)}, last performed: {str(last_performed)}"
-            logging.debug(debug_string)
-            if verify_frequency_in_range(possible_due_date, last_performed, frequency):
-                last_true = possible_due_date
-            else:
-                due_date = last_true
-                break
-    # Every x days
-    elif "Days" in frequency:
-        number_frequency = int(frequency.split(" ")[1])
-        due_date = last_performed + timedelta(days=number_frequency)
-
-    # Every Weekday. Maybe using a table to switch from frequceny string to an id would have been smarter.
-    elif "Days" not in frequency and "Every" in frequency:
-        weekday = frequency.split(" ")[1]
-        for i in range(1, 8):
-            due_date = last_performed + timedelta(days=i)
-            logging.debug(f"Analyezer.next_habit_due weekday {due_date.strftime('%A')}")
-            if weekday == due_date.strftime('%A'):
-                return due_date.strftime("%Y-%m-%d")
-        logging.error("Analyezer.next_habit_due 8 days were checked but due_date was not found.")
-    else:
-        raise ValueError("No matching frequency found.")
-        return None
+    # The frequency string is only parsed once, the compiled rule knows how to find the next due date.
+    rule = compile_frequency(frequency)
+    last_performed = datetime.strptime(last_performed_str, "%Y-%m-%d").date()
+    due_date = date.fromordinal(rule.next_due(last_performed.toordinal()))
 
     logging.debug("Returning " + due_date.strftime("%Y-%m-%d"))
     return due_date.strftime("%Y-%m-%d")
 
 
+def next_habit_due_many(pairs) -> list[str]:
+    """
+    Calculates the next due dates of many habits in one call.
+
+    Parameters:
+        pairs (iterable of tuple): Pairs of the last performed date in 'YYYY-MM-DD' format and the frequency.
+
+    Returns:
+        list[str]: The next due dates in 'YYYY-MM-DD' format, in the order of the pairs.
+
+    Raises:
+        ValueError: If a frequency is not supported.
+    """
+    due_dates = []
+    for last_performed_str, frequency in pairs:
+        rule = compile_frequency(frequency)
+        last_day = date.fromisoformat(last_performed_str).toordinal()
+        due_dates.append(date.fromordinal(rule.next_due(last_day)).isoformat())
+    return due_dates
+
+
 def verify_frequency_in_range(curr_date: datetime, prev_date: datetime, frequency: str, strict: bool = False) -> bool:
     """
     Verify if the timespan between two date matches the given frequency.
@@ -215,69 +391,28 @@ def verify_frequency_in_range(curr_date: datetime, prev_date: datetime, frequenc
         bool: True if the two dates are in the desired range, False otherwise.
     """
     logging.debug("Analyzer.verify_frequency_in_range called")
-    # Daily is easy.
-    if frequency == "Daily":
-        logging.debug("Analyzer.verify_frequency_in_range Frequency Daily")
-        delta_days = (curr_date - prev_date).days
-        if abs(delta_days) == 1:
-            return True
-        else:
-            return False
-
-    # Check if both week numbers are one apart.
-    elif frequency == "Weekly":
-        logging.debug("Analyzer.verify_frequency_in_range Frequency Weekly")
-        _, curr_week, _ = curr_date.isocalendar()
-        _, prev_week, _ = prev_date.isocalendar()
-        # Some years have 52 weeks and some 53.
-        # For years with 53 weeks user wont get penelized for not loggig an action in the last week.
-        # <= 1 because doing it twice in the same week should not provide a negative
-        if curr_week - prev_week <= 1 or (curr_week == 1 and (prev_week == 52 or prev_week == 53)):
-            return True
-        else:
-            return False
-
-    # Callculate the ammount of months since year 0 and see if the difference is one
-    elif frequency == "Monthly":
-        logging.debug("Analyzer.verify_frequency_in_range Frequency Monthly")
-        curr_month = curr_date.month
-        curr_year = curr_date.year
-        prev_month = prev_date.month
-        prev_year = prev_date.year
-        total_curr_months = curr_year * 12 + curr_month
-        total_prev_months = prev_year * 12 + prev_month
-
-        delta_months = total_curr_months - total_prev_months
-
-        if delta_months <= 1:
-            return True
-        else:
-            return False
-
-    # Every x days.
-    # Get delta of days and see if they match the frequency number.
-    # Strict means it needs to be exactly X days.
-    elif "Days" in frequency:
-        logging.debug("Frequency every x days")
-        number_frequency = int(frequency.split(" ")[1])
-        if strict is None:
-            logging.error("Strict has no value.")
-            raise ValueError("Strict Value missing.")
-        delta_days = (curr_date - prev_date).days
-        if strict:
-            return delta_days == number_frequency
-        else:
-            return delta_days <= number_frequency
-
-    # Weekday.
-    elif "Days" not in frequency and "Every" in frequency:
-        logging.debug("Frequenccy Weekday")
-        weekday = frequency.split(" ")[1]
-        today = datetime.today().strftime('%A')
-        if (curr_date - prev_date).days > 7:
-            return False
-        return today == weekday
-
+    rule = compile_frequency(frequency)
+    # Strict only matters for every x days.
+    if strict is None and isinstance(rule, EveryNDaysRule):
+        logging.error("Strict has no value.")
+        raise ValueError("Strict Value missing.")
+    return rule.in_range(prev_date.toordinal(), curr_date.toordinal(), strict)
+
+
+# The analysis functions above are the pure Python backend. If NumPy is available they are replaced
+# by the vectorized versions of AnalyzerNumpy, unless HABITHERO_ANALYZER_BACKEND is set to "python".
+BACKEND = "python"
+if os.environ.get("HABITHERO_ANALYZER_BACKEND", "numpy").lower() != "python":
+    try:
+        import AnalyzerNumpy
+    except ImportError:
+        logging.info("NumPy is not installed, using the pure Python analyzer backend.")
     else:
-        logging.error("Frequency Value Error")
-        raise ValueError("No matching frequency found.")
+        average_duration_between_dates = AnalyzerNumpy.average_duration_between_dates
+        count_performed_in_month = AnalyzerNumpy.count_performed_in_month
+        count_performed_per_month = AnalyzerNumpy.count_performed_per_month
+        longest_break_between_dates = AnalyzerNumpy.longest_break_between_dates
+        find_longest_streak = AnalyzerNumpy.find_longest_streak
+        calculate_consistency_rate = AnalyzerNumpy.calculate_consistency_rate
+        BACKEND = "numpy"
+logging.debug(f"Analyzer backend: {BACKEND}")
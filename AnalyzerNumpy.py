@@ -0,0 +1,208 @@
+import logging
+import numpy as np
+from frequencyRules import compile_frequency, DailyRule, WeeklyRule, MonthlyRule, EveryNDaysRule
+
+# date.toordinal() of 1970-01-01, the epoch of datetime64.
+_EPOCH_ORDINAL = 719163
+
+
+def as_day_array(dates):
+    """
+    Converts dates to a datetime64[D] array.
+
+    Parameters:
+        dates (list of str or numpy.ndarray): Dates in 'YYYY-MM-DD' format or a datetime64 array.
+
+    Returns:
+        numpy.ndarray: The dates as datetime64[D] in the given order.
+    """
+    if isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64):
+        return dates.astype("datetime64[D]")
+    return np.array(list(dates), dtype="datetime64[D]")
+
+
+def days_from_ordinals(ordinals):
+    """
+    Converts day ordinals, e.g. Habit.log_days, to a datetime64[D] array without building strings.
+
+    Parameters:
+        ordinals (sequence of int): Day ordinals as returned by date.toordinal().
+
+    Returns:
+        numpy.ndarray: The days as datetime64[D].
+    """
+    return (np.asarray(ordinals, dtype=np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def _gaps(days):
+    """Returns the number of days between consecutive days as integers."""
+    return np.diff(days).astype(np.int64)
+
+
+def iso_weeks(days):
+    """
+    Calculates the ISO week number of every day.
+
+    The ISO week of a day is the week of the Thursday in the same Monday to Sunday week.
+
+    Parameters:
+        days (numpy.ndarray): datetime64[D] array.
+
+    Returns:
+        numpy.ndarray: The ISO week numbers.
+    """
+    day_numbers = days.astype(np.int64)
+    # 1970-01-01 was a Thursday, so shifting by 3 makes Monday weekday 0.
+    weekdays = (day_numbers + 3) % 7
+    thursdays = days - weekdays + 3
+    year_starts = thursdays.astype("datetime64[Y]").astype("datetime64[D]")
+    return (thursdays - year_starts).astype(np.int64) // 7 + 1
+
+
+def in_range_mask(days, frequency, strict=False):
+    """
+    Checks every pair of consecutive days against the frequency.
+
+    Parameters:
+        days (numpy.ndarray): datetime64[D] array in ascending order.
+        frequency (str): The frequency of the habit.
+        strict (bool, optional): Whether the check should be strict. Doesn't apply to all frequencies.
+
+    Returns:
+        numpy.ndarray: Boolean array, entry i belongs to days[i] and days[i + 1].
+    """
+    rule = compile_frequency(frequency)
+    if isinstance(rule, DailyRule):
+        return np.abs(_gaps(days)) == 1
+    if isinstance(rule, WeeklyRule):
+        weeks = iso_weeks(days)
+        prev_weeks, curr_weeks = weeks[:-1], weeks[1:]
+        return (curr_weeks - prev_weeks <= 1) | ((curr_weeks == 1) & ((prev_weeks == 52) | (prev_weeks == 53)))
+    if isinstance(rule, MonthlyRule):
+        return np.diff(days.astype("datetime64[M]").astype(np.int64)) <= 1
+    if isinstance(rule, EveryNDaysRule):
+        if strict:
+            return _gaps(days) == rule.days
+        return _gaps(days) <= rule.days
+
+    # Weekdays depend on the current date, they are checked by the rule itself.
+    ordinals = (days.astype(np.int64) + _EPOCH_ORDINAL).tolist()
+    return np.array(rule.in_range_many(ordinals, strict), dtype=bool)
+
+
+def _longest_true_run(mask):
+    """Returns the length of the longest run of True values in a boolean array."""
+    if not mask.any():
+        return 0
+    # Run-length encoding: the edges of the padded mask mark where runs start and end.
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+
+def average_duration_between_dates(dates):
+    """
+    Calculates the average duration between consecutive dates in a list of dates.
+
+    Parameters:
+        dates (list): List of dates in 'YYYY-MM-DD' format.
+
+    Returns:
+        float: Average duration in days.
+    """
+    if dates is None or len(dates) < 2:
+        return 0
+    gaps = _gaps(np.sort(as_day_array(dates)))
+    return round(int(gaps.sum()) / len(gaps))
+
+
+def count_performed_in_month(dates, month, year):
+    """
+    Count the number of times the habit was performed in a specific month.
+
+    Parameters:
+        dates (list): List of dates in 'YYYY-MM-DD' format.
+        month (int): The month to filter by (1-12).
+        year (int): The year to filter by.
+
+    Returns:
+        int: The count of dates that fall in the specified month and year.
+    """
+    if len(dates) == 0:
+        return 0
+    months = as_day_array(dates).astype("datetime64[M]")
+    return int(np.count_nonzero(months == np.datetime64(f"{year:04d}-{month:02d}", "M")))
+
+
+def count_performed_per_month(dates):
+    """
+    Counts the number of times the habit was performed in every month that has logs.
+
+    Parameters:
+        dates (list): List of dates in 'YYYY-MM-DD' format.
+
+    Returns:
+        dict: Mapping of (year, month) to the count, oldest month first.
+    """
+    if len(dates) == 0:
+        return {}
+    months, counts = np.unique(as_day_array(dates).astype("datetime64[M]").astype(np.int64), return_counts=True)
+    # Months since 1970-01.
+    return {(1970 + int(m) // 12, int(m) % 12 + 1): int(c) for m, c in zip(months, counts)}
+
+
+def longest_break_between_dates(dates):
+    """
+    Finds the longest break (in days) between two consecutive dates in a list of dates.
+
+    Parameters:
+        dates (list): List of dates in 'YYYY-MM-DD' format.
+
+    Returns:
+        int: The longest break in days.
+    """
+    if dates is None or len(dates) < 2:
+        return 0
+    return int(_gaps(np.sort(as_day_array(dates))).max())
+
+
+def find_longest_streak(date_logs, frequency):
+    """
+    Calculate the longest consecutive streak from a list of dates based on a given frequency.
+
+    Parameters:
+        date_logs (list of str): List of dates in "YYYY-MM-DD" format sorted in ascending order.
+        frequency (str): Expected frequency of habit; "Daily", "Weekly", "Monthly", or a digit as a string.
+
+    Returns:
+        tuple: Longest streak of consecutive dates according to the specified frequency and the number of breaks.
+    """
+    if len(date_logs) < 2:
+        return 1, 0
+    mask = in_range_mask(as_day_array(date_logs), frequency)
+    logging.debug(f"AnalyzerNumpy.find_longest_streak checked {len(mask)} pairs")
+    return _longest_true_run(mask) + 1, int(np.count_nonzero(~mask))
+
+
+def calculate_consistency_rate(date_logs, frequency):
+    """
+    Calculate the consistency rate of a habit. Consistentcy Rate is defiend by percented of successfull iterations.
+
+    Parameters:
+        date_logs (list[str]): List of dates in "YYYY-MM-DD" format.
+        frequency (str): Expected frequency of habit; "Daily", "Weekly", "Monthly", or a digit as a string.
+
+    Returns:
+        float: The consistency rate as a percentage.
+    """
+    total_days_tracked = len(date_logs)
+    if total_days_tracked == 0:
+        return 0.0
+    if total_days_tracked == 1:
+        return 100.0
+
+    longest_streak, times_streak_broken = find_longest_streak(date_logs, frequency)
+    # Assuming a streak is valid only if it's longer than 1 day
+    successful_days = total_days_tracked - times_streak_broken if longest_streak > 1 else 0
+    return (successful_days / total_days_tracked) * 100
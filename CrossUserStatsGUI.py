@@ -0,0 +1,65 @@
+import wx
+
+
+class CrossUserStatsFrame(wx.Frame):
+    """
+    A small window showing the leaderboards and consistency percentiles across all users.
+
+    Parameters:
+        parent (wx.Window): The parent window.
+        stats (CrossUserStats): The collected statistics, see crossUserStats.
+        title (str, optional): The title of the frame. Defaults to "Leaderboard".
+    """
+
+    def __init__(self, parent, stats, title="Leaderboard"):
+        super(CrossUserStatsFrame, self).__init__(parent, title=title, size=(700, 600))
+        self.stats = stats
+        panel = wx.Panel(self)
+        main_sizer = wx.BoxSizer(wx.VERTICAL)
+
+        summary = wx.StaticText(panel, label=f"{stats.habits} habits of {stats.users} users")
+        main_sizer.Add(summary, 0, wx.ALL, 10)
+
+        # Leaderboards next to each other
+        boards_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        boards_sizer.Add(self.create_leaderboard(panel, "Longest Streak", stats.top_longest_streaks()),
+                         1, wx.ALL | wx.EXPAND, 5)
+        boards_sizer.Add(self.create_leaderboard(panel, "Current Streak", stats.top_current_streaks()),
+                         1, wx.ALL | wx.EXPAND, 5)
+        main_sizer.Add(boards_sizer, 1, wx.EXPAND)
+
+        # Consistency percentiles per frequency type
+        percentile_label = wx.StaticText(panel, label="Consistency rate percentiles")
+        main_sizer.Add(percentile_label, 0, wx.ALL, 5)
+        self.percentile_view = wx.ListCtrl(panel, style=wx.LC_REPORT)
+        for column, heading in enumerate(["Frequency", "Habits", "Median", "90th", "99th"]):
+            self.percentile_view.InsertColumn(column, heading)
+        for kind, count in stats.frequency_types().items():
+            percentiles = stats.percentiles(kind, (50, 90, 99))
+            self.percentile_view.Append([kind, count] + [f"{percentiles[percent]:.1f}%" for percent in (50, 90, 99)])
+        main_sizer.Add(self.percentile_view, 1, wx.ALL | wx.EXPAND, 5)
+
+        panel.SetSizer(main_sizer)
+        self.Centre()
+        self.Show()
+
+    def create_leaderboard(self, panel, heading, entries):
+        """
+        Creates a list with the ranked habits.
+
+        Parameters:
+            panel (wx.Panel): The parent panel.
+            heading (str): The heading of the value column.
+            entries (list[tuple]): Tuples of value, username and habit name, highest first.
+
+        Returns:
+            wx.ListCtrl: The list.
+        """
+        leaderboard = wx.ListCtrl(panel, style=wx.LC_REPORT)
+        for column, title in enumerate(["#", heading, "User", "Habit"]):
+            leaderboard.InsertColumn(column, title)
+        for rank, (value, user_name, habit_name) in enumerate(entries, start=1):
+            leaderboard.Append([rank, value, user_name, habit_name])
+        for column in range(4):
+            leaderboard.SetColumnWidth(column, wx.LIST_AUTOSIZE_USEHEADER)
+        return leaderboard
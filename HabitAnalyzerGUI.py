@@ -7,15 +7,72 @@ Created on Tue Oct 17 18:30:26 2023
 
 from habit import Habit
 from datetime import datetime
+import calendar
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import Analyzer
 import wx.lib.agw.aui as aui
 import wx
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
+from matplotlib.backends.backend_wx import NavigationToolbar2Wx
 from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection, PolyCollection
 import matplotlib.dates as mdates
+from timelineBins import TimelineBins, visible_days
 import matplotlib
 matplotlib.use('WXAgg')
 
+# The analytics are computed off the GUI thread, so the window opens right away.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="analytics")
+
+# Shown until a value is computed.
+PLACEHOLDER = "..."
+
+# Difference between Matplotlib date numbers and day ordinals.
+_DATE_OFFSET = mdates.date2num(datetime.fromordinal(1)) - 1
+
+
+def summarize_habit(habit):
+    """
+    Calculates the statistics of a habit, see Analyzer.summarize_days. Runs in a worker thread.
+
+    Parameters:
+        habit (Habit): A snapshot of the habit, so changes on the GUI thread don't interfere.
+
+    Returns:
+        HabitStats: The statistics of the habit.
+    """
+    return Analyzer.summarize_days(habit.log_days, habit.frequency)
+
+
+def timeline_bins(habit):
+    """
+    Prepares the logs of a habit for the timeline. Runs in a worker thread.
+
+    Parameters:
+        habit (Habit): A snapshot of the habit.
+
+    Returns:
+        TimelineBins: The logs with their weekly and monthly counts.
+    """
+    timeline = TimelineBins(habit.log_days)
+    timeline.aggregate("week")
+    timeline.aggregate("month")
+    return timeline
+
+
+def to_plot_date(day):
+    """
+    Converts a day ordinal into the date number Matplotlib plots.
+
+    Parameters:
+        day (int): The day ordinal.
+
+    Returns:
+        float: The Matplotlib date number.
+    """
+    return day + _DATE_OFFSET
+
 
 class AnalyzeGUI(wx.Frame):
     """
@@ -32,14 +89,22 @@ class AnalyzeGUI(wx.Frame):
         pos (wx.Point, optional): The window position. Defaults to wx.DefaultPosition.
         size (wx.Size, optional): The window size. Defaults to wx.DefaultSize.
         style (long, optional): The window style. Defaults to wx.DEFAULT_FRAME_STYLE.
+        analyzer_cache (AnalyzerCache, optional): Cache of the statistics, so reopening the window for an
+                                                  unchanged habit doesn't compute them again. Defaults to None.
     """
 
     def __init__(self, habit, parent=None, id=wx.ID_ANY, title="Habit Analysis",
-                 pos=wx.DefaultPosition, size=wx.DefaultSize, style=wx.DEFAULT_FRAME_STYLE):
+                 pos=wx.DefaultPosition, size=wx.DefaultSize, style=wx.DEFAULT_FRAME_STYLE, analyzer_cache=None):
 
         super(AnalyzeGUI, self).__init__(parent, id, title, pos, size, style)
 
         self.habit = habit
+        self.analyzer_cache = analyzer_cache
+        # All statistics are calculated in one pass over the logs and shared by the pages.
+        # They are None until the worker delivers them.
+        self.stats = None
+        self.futures = []
+        self.closed = False
 
         # Create the notebook
         self.notebook = aui.AuiNotebook(self)
@@ -47,12 +112,87 @@ class AnalyzeGUI(wx.Frame):
 
         self.streak = StreakAnalysisPanel(self)
         self.notebook.AddPage(self.streak, "Streak")
+        # The month counts come from the calendar index of the habit, so they don't wait for the worker.
+        self.create_page("Months", self.get_month_report)
 
         sizer = wx.BoxSizer(wx.VERTICAL)
         sizer.Add(self.notebook, 1, wx.ALL | wx.EXPAND)
         self.SetSizer(sizer)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
         self.Show()
 
+        self.start_analysis()
+
+    def start_analysis(self):
+        """
+        Starts computing the statistics and the timeline in the background.
+
+        The habit is copied first, so it can change while the results are computed. Cached statistics are shown right away.
+        """
+        snapshot = self.habit.snapshot()
+        stats = self.analyzer_cache.cached_summary(snapshot) if self.analyzer_cache else None
+        if stats:
+            self.on_stats(stats)
+        else:
+            self.submit(summarize_habit, snapshot, lambda stats: self.on_stats(stats, snapshot))
+        self.submit(timeline_bins, snapshot, self.streak.draw_timeline)
+
+    def submit(self, function, snapshot, callback):
+        """
+        Runs a function in the worker pool and passes the result to the callback on the GUI thread.
+
+        Parameters:
+            function (callable): The function, called with the snapshot of the habit.
+            snapshot (Habit): The snapshot of the habit.
+            callback (callable): Called with the result on the GUI thread, unless the window was closed.
+        """
+        future = _executor.submit(function, snapshot)
+        future.add_done_callback(lambda done: wx.CallAfter(self.deliver, done, callback))
+        self.futures.append(future)
+
+    def deliver(self, future, callback):
+        """
+        Passes the result of a finished future to its callback. Runs on the GUI thread.
+
+        Parameters:
+            future (Future): The finished future.
+            callback (callable): Called with the result.
+        """
+        # A closed window drops its results, its widgets may already be gone.
+        if self.closed or future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Error occurred while analyzing habit {self.habit.name}. Error: {str(e)}")
+            return
+        callback(result)
+
+    def on_stats(self, stats, snapshot=None):
+        """
+        Shows the statistics once they are computed.
+
+        Parameters:
+            stats (HabitStats): The statistics of the habit.
+            snapshot (Habit, optional): The snapshot they were computed for, to cache them. Defaults to None.
+        """
+        self.stats = stats
+        if snapshot is not None and self.analyzer_cache:
+            self.analyzer_cache.store_summary(snapshot, stats)
+        self.streak.show_stats()
+
+    def on_close(self, event):
+        """
+        Cancels the computations that haven't started yet and drops the results of the running ones.
+
+        Parameters:
+            event (wx.Event): The event object.
+        """
+        self.closed = True
+        for future in self.futures:
+            future.cancel()
+        event.Skip()
+
     def create_page(self, title, method):
         """
         Creates a new page in the notebook with the given title and content generated by the method.
@@ -87,7 +227,7 @@ class AnalyzeGUI(wx.Frame):
         Returns:
             str: A string representation of the average duration in days.
         """
-        avg_duration = Analyzer.average_duration_between_dates(self.habit.logs)
+        avg_duration = self.stats.average_gap
         return f"Average Duration: {avg_duration} days"
 
     def get_count_performed(self):
@@ -98,9 +238,30 @@ class AnalyzeGUI(wx.Frame):
             str: A string indicating the count of times the habit was performed in the current month.
         """
         today = datetime.now()
-        count = Analyzer.count_performed_in_month(self.habit.logs, today.month, today.year)
+        count = self.habit.calendar.count_in_month(today.month, today.year)
         return f"Count Performed this month: {count} times"
 
+    def get_year_over_year(self):
+        """
+        Compares the count of every month of the current year with the same month of the year before.
+
+        Returns:
+            str: One line per month with both counts.
+        """
+        year = datetime.now().year
+        lines = [f"{calendar.month_abbr[month]}: {count} times ({year - 1}: {count_before} times)"
+                 for month, count, count_before in self.habit.calendar.year_over_year(year)]
+        return "\n".join(lines)
+
+    def get_month_report(self):
+        """
+        Combines the count of the current month and the comparison with the year before.
+
+        Returns:
+            str: The text of the "Months" page.
+        """
+        return f"{self.get_count_performed()}\n\n{self.get_year_over_year()}"
+
     def get_longest_break(self):
         """
         Determines the longest break between consecutive habit logs.
@@ -108,7 +269,7 @@ class AnalyzeGUI(wx.Frame):
         Returns:
             str: A string representation of the longest break in days.
         """
-        longest_break = Analyzer.longest_break_between_dates(self.habit.logs)
+        longest_break = self.stats.longest_gap
         return f"Longest Break: {longest_break} days"
 
 
@@ -134,9 +295,10 @@ class StreakAnalysisPanel(wx.Panel):
         self.habit_goal = wx.StaticText(self, label=f"Goal: {self.parent.habit.goal}")
         self.days_since_start = wx.StaticText(self, label=f"Started habit {self.days_since()} days ago")
         self.current_streak_value = wx.StaticText(self, label=f"Current Streak: {self.get_current_streak()}")
-        self.longest_streak_value = wx.StaticText(self, label=f"Longest streak: {self.calculate_longest_streak()}")
-        self.streak_broken_value = wx.StaticText(self, label=f"Times streak was broken: {self.calculate_streak_broken()}")
-        self.sconsistentcy_rate = wx.StaticText(self, label=f"Consistentcy rate: {self.calculate_consistentcy_rate()}%")
+        # The statistics are shown as soon as the parent has computed them, see show_stats.
+        self.longest_streak_value = wx.StaticText(self, label=f"Longest streak: {PLACEHOLDER}")
+        self.streak_broken_value = wx.StaticText(self, label=f"Times streak was broken: {PLACEHOLDER}")
+        self.sconsistentcy_rate = wx.StaticText(self, label=f"Consistentcy rate: {PLACEHOLDER}")
 
         # Add widgets to the layout
         self.layout.Add(self.habit_name, 0, wx.ALL | wx.EXPAND, 5)
@@ -147,44 +309,102 @@ class StreakAnalysisPanel(wx.Panel):
         self.layout.Add(self.streak_broken_value, 0, wx.ALL | wx.EXPAND, 5)
         self.layout.Add(self.sconsistentcy_rate, 0, wx.ALL | wx.EXPAND, 5)
 
-        # Matplotlib Figure
+        # Matplotlib Figure, drawn once the timeline is computed.
         self.figure = Figure()
         self.axes = self.figure.add_subplot(111)
+        self.axes.get_yaxis().set_visible(False)
         self.canvas = FigureCanvas(self, -1, self.figure)
+        # Zooming and panning with the toolbar changes the visible dates, see on_xlim_changed.
+        self.toolbar = NavigationToolbar2Wx(self.canvas)
+        self.toolbar.Realize()
+        self.timeline = None
+        # The lines or bars of the visible part of the timeline and what they show.
+        self.timeline_artist = None
+        self.timeline_view = None
 
         # Add the matplotlib canvas to the layout
         self.layout.Add(self.canvas, 1, wx.LEFT | wx.TOP | wx.GROW)
-
-        self.draw_timeline()
+        self.layout.Add(self.toolbar, 0, wx.LEFT | wx.EXPAND)
 
         # Set the sizer for the panel
         self.SetSizer(self.layout)
 
-    def draw_timeline(self):
+    def show_stats(self):
         """
-        This method plots dates on a Matplotlib graph to visually represent the
-        performance history of the habit. The timeline is a simple representation
-        with vertical lines indicating the dates of habit performance.
+        Replaces the placeholders with the statistics of the parent.
         """
-        # Sample list of dates for demonstration purposes
-        dates = self.parent.habit.logs
+        self.longest_streak_value.SetLabel(f"Longest streak: {self.calculate_longest_streak()}")
+        self.streak_broken_value.SetLabel(f"Times streak was broken: {self.calculate_streak_broken()}")
+        self.sconsistentcy_rate.SetLabel(f"Consistentcy rate: {self.calculate_consistentcy_rate()}%")
+        self.Layout()
 
-        # Convert string dates to datetime objects
-        date_objects = [datetime.strptime(date, '%Y-%m-%d') for date in dates]
+    def draw_timeline(self, timeline):
+        """
+        This method plots dates on a Matplotlib graph to visually represent the
+        performance history of the habit.
 
-        # Plot each date on the timeline
-        self.axes.plot(date_objects, [1] * len(date_objects), '|', markersize=15)
+        As long as few entries are visible the timeline shows one vertical line per entry. With more
+        entries it shows bars with the number of entries per week or per month. The timeline is drawn
+        again for the visible dates after every zoom or pan.
+
+        Parameters:
+            timeline (TimelineBins): The logs of the habit, see timeline_bins.
+        """
+        self.timeline = timeline
+        self.axes.set_xlim(to_plot_date(timeline.days[0] - 1), to_plot_date(timeline.days[-1] + 1))
+        self.update_timeline()
+        self.axes.callbacks.connect('xlim_changed', self.on_xlim_changed)
 
         # Format the x-axis to show dates
         self.axes.xaxis.set_major_locator(mdates.AutoDateLocator())
         self.axes.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
         self.figure.autofmt_xdate()
 
-        # Hide the y-axis
-        self.axes.get_yaxis().set_visible(False)
+        # Redraw the canvas when the GUI is idle
+        self.canvas.draw_idle()
 
-        # Redraw the canvas
-        self.canvas.draw()
+    def update_timeline(self):
+        """
+        Replaces the lines or bars of the timeline with the ones of the visible dates.
+
+        The weekly and monthly counts are computed once, so this only slices the visible bins out of them.
+        """
+        first, last = visible_days(*self.axes.get_xlim(), _DATE_OFFSET)
+        mode = self.timeline.mode(first, last)
+        if self.timeline_view == (mode, first, last):
+            return
+        self.timeline_view = (mode, first, last)
+
+        if self.timeline_artist is not None:
+            self.timeline_artist.remove()
+
+        if mode == "events":
+            segments = [((to_plot_date(day), 0.6), (to_plot_date(day), 1.4)) for day in self.timeline.events(first, last)]
+            self.timeline_artist = LineCollection(segments)
+            self.axes.set_ylim(0, 2)
+            self.axes.get_yaxis().set_visible(False)
+        else:
+            starts, widths, counts = self.timeline.bins(mode, first, last)
+            bars = []
+            for start, width, count in zip(starts, widths, counts):
+                left, right = to_plot_date(start), to_plot_date(start + width)
+                bars.append(((left, 0), (left, count), (right, count), (right, 0)))
+            self.timeline_artist = PolyCollection(bars)
+            self.axes.set_ylim(0, max(counts, default=1) * 1.1)
+            self.axes.get_yaxis().set_visible(True)
+            self.axes.set_ylabel(f"Entries per {mode}")
+
+        self.axes.add_collection(self.timeline_artist, autolim=False)
+
+    def on_xlim_changed(self, axes):
+        """
+        Bins the timeline again after a zoom or pan with the toolbar and draws it when the GUI is idle.
+
+        Parameters:
+            axes (Axes): The axes of the timeline.
+        """
+        self.update_timeline()
+        self.canvas.draw_idle()
 
     def get_current_streak(self):
         """
@@ -202,8 +422,7 @@ class StreakAnalysisPanel(wx.Panel):
         Returns:
             int: The longest streak count.
         """
-        longest_streak, _ = Analyzer.find_longest_streak(self.parent.habit.logs, self.parent.habit.frequency)
-        return longest_streak
+        return self.parent.stats.longest_streak
 
     def calculate_streak_broken(self):
         """
@@ -212,8 +431,7 @@ class StreakAnalysisPanel(wx.Panel):
         Returns:
             int: The count of times the habit streak was broken.
         """
-        _, streak_broken = Analyzer.find_longest_streak(self.parent.habit.logs, self.parent.habit.frequency)
-        return streak_broken
+        return self.parent.stats.times_broken
 
     def calculate_consistentcy_rate(self, rounding=2):
         """
@@ -225,8 +443,7 @@ class StreakAnalysisPanel(wx.Panel):
         Returns:
             float: The consistency rate as a percentage, rounded to the specified precision.
         """
-        consistentcy_rate = Analyzer.calculate_consistency_rate(self.parent.habit.logs, self.parent.habit.frequency)
-        return round(consistentcy_rate, rounding)
+        return round(self.parent.stats.consistency, rounding)
 
     def days_since(self):
         """
@@ -235,7 +452,7 @@ class StreakAnalysisPanel(wx.Panel):
         Returns:
             int: The number of days since the habit was started.
         """
-        given_date = datetime.strptime(self.parent.habit.logs[0], "%Y-%m-%d")
+        given_date = datetime.fromordinal(self.parent.habit.log_days[0])
         current_date = datetime.now()
         difference = current_date - given_date
         return difference.days
@@ -3,8 +3,47 @@ from datetime import datetime
 from AddHabit import AddHabitFrame
 from UserSelection import UserSelectionFrame
 import logging
-import Analyzer
 import HabitAnalyzerGUI
+from CrossUserStatsGUI import CrossUserStatsFrame
+from habitRowModel import HabitRowModel, habit_row
+
+
+class HabitListCtrl(wx.ListCtrl):
+    """
+    A virtual list that shows the rows of a HabitRowModel.
+
+    Only the visible cells are requested, so scrolling and refreshing don't depend on the number of habits.
+
+    Parameters:
+        parent (wx.Window): The parent window.
+        model (HabitRowModel): The rows to show.
+    """
+
+    def __init__(self, parent, model):
+        super(HabitListCtrl, self).__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.model = model
+        for column, heading in enumerate(model.columns):
+            self.InsertColumn(column, heading)
+
+    def OnGetItemText(self, item, column):
+        """Returns the text of a cell from the model."""
+        return self.model.text(item, column)
+
+    def show_model(self):
+        """
+        Shows the current rows of the model and sizes the columns to their longest text.
+        """
+        self.SetItemCount(len(self.model))
+        self.size_columns()
+        self.Refresh()
+
+    def size_columns(self):
+        """
+        Sizes the columns to the longest text of the model.
+        """
+        for column in range(len(self.model.columns)):
+            # A little padding, like the native autosizing.
+            self.SetColumnWidth(column, self.GetTextExtent(self.model.widest(column))[0] + 16)
 
 
 class MainMenuGUIFrame(wx.Frame):
@@ -40,20 +79,14 @@ class MainMenuGUIFrame(wx.Frame):
         date_label = wx.StaticText(panel, label=f"Today: {today}")
         box.Add(date_label, flag=wx.EXPAND | wx.ALL, border=10)
 
+        # Filter of the list, answered by the due index of the Orchestrator.
+        self.overdue_filter = wx.CheckBox(panel, label="Overdue")
+        self.overdue_filter.Bind(wx.EVT_CHECKBOX, self.on_filter)
+        box.Add(self.overdue_filter, flag=wx.LEFT | wx.RIGHT, border=10)
+
         # 3. Reihe: List_Ctrl
-        self.data_view = wx.ListCtrl(panel, style=wx.LC_REPORT)
-        self.data_view.InsertColumn(0, "Habit")
-        self.data_view.InsertColumn(1, "Frequency")
-        self.data_view.InsertColumn(2, "Start Date")
-        self.data_view.InsertColumn(3, "Last Date")
-        self.data_view.InsertColumn(4, "Next Due Date")
-        self.data_view.InsertColumn(5, "Days until Due")
-        self.data_view.InsertColumn(6, "Streak")
-
-        self.data_view.SetColumnWidth(0, 300)
-        self.data_view.SetColumnWidth(2, 100)
-        self.data_view.SetColumnWidth(3, 100)
-        self.data_view.SetColumnWidth(4, 100)
+        self.row_model = HabitRowModel()
+        self.data_view = HabitListCtrl(panel, self.row_model)
 
         box.Add(self.data_view, 1, flag=wx.EXPAND | wx.ALL, border=10)  # Note the "1" here
 
@@ -84,6 +117,10 @@ class MainMenuGUIFrame(wx.Frame):
         analyze_button.Bind(wx.EVT_BUTTON, self.on_analyze)
         button_box.Add(analyze_button, proportion=1)
 
+        leaderboard_button = wx.Button(panel, label="Leaderboard")
+        leaderboard_button.Bind(wx.EVT_BUTTON, self.on_leaderboard)
+        button_box.Add(leaderboard_button, proportion=1)
+
         box.Add(button_box, flag=wx.EXPAND | wx.ALL, border=10)
 
         panel.SetSizer(box)
@@ -93,36 +130,90 @@ class MainMenuGUIFrame(wx.Frame):
         self.Centre()
         # elf.Show(True)
 
-    def add_habit_to_data_view(self, habit):
+    def habit_row(self, habit):
+        """
+        Formats the columns of a habit for the list.
+
+        Parameters:
+            habit (Habit): The habit.
+
+        Returns:
+            tuple[str]: The text of every column.
+        """
+        return habit_row(habit, self.Orchestrator.analyzer_cache.days_until_due(habit))
+
+    def show_habits(self, habit_indices):
+        """
+        Replaces the rows of the list with the given habits.
+
+        Parameters:
+            habit_indices (list[int]): The indices of the habits in Orchestrator.habits, in the order they are shown.
+        """
+        rows = [self.habit_row(self.Orchestrator.habits[index]) for index in habit_indices]
+        self.row_model.set_rows(rows, habit_indices)
+        self.data_view.show_model()
+
+    def on_habit_event(self, event, index):
         """
-        Adds a habit to the DataViewListCtrl.
+        Updates only the row of a changed, added or removed habit.
 
         Parameters:
-            habit (Habit): The habit object containing the details to be added.
-
-        """
-        # Extract the attributes from the habit object.
-        name = habit.name
-        frequency = habit.frequency
-        start_date = habit.start_date
-        last_perfomed = habit.get_last_performed()
-        next_due_date = habit.next_due_date
-        days_until_due = Analyzer.days_until_date(next_due_date)
-        if days_until_due < 0:
-            streak = 0
-            habit.streak = 0
-            self.Orchestrator.save_data()
+            event (str): One of "changed", "added" or "removed", see Orchestrator.add_listener.
+            index (int): The index of the habit in Orchestrator.habits.
+        """
+        if event == "removed":
+            if self.row_model.remove_habit(index) != -1:
+                self.data_view.SetItemCount(len(self.row_model))
+                self.data_view.size_columns()
+                self.data_view.Refresh()
+            return
+
+        habit = self.Orchestrator.habits[index]
+        values = self.habit_row(habit)
+        # With the overdue filter only rows of overdue habits are shown.
+        shown = not self.overdue_only() or self.Orchestrator.analyzer_cache.days_until_due(habit) < 0
+        row = self.row_model.row_of(index)
+        if row == -1 and shown:
+            # New habits are always the last ones, so their rows are too.
+            self.row_model.append_row(values, index)
+            self.data_view.SetItemCount(len(self.row_model))
+        elif row != -1 and shown:
+            self.row_model.set_row(row, values)
+            self.data_view.RefreshItem(row)
+        elif row != -1:
+            self.row_model.remove_row(row)
+            self.data_view.SetItemCount(len(self.row_model))
+            self.data_view.Refresh()
         else:
-            streak = habit.streak
+            return
+        self.data_view.size_columns()
+
+    def overdue_only(self):
+        """
+        Returns whether the list only shows the overdue habits.
+
+        Returns:
+            bool: True if the "Overdue" filter is checked.
+        """
+        return self.overdue_filter.GetValue()
 
-        # Append a new row to the DataViewListCtrl.
-        self.data_view.Append([name, frequency, start_date, last_perfomed, next_due_date, days_until_due, streak])
+    def get_selected_index(self):
+        """
+        Returns the index of the selected habit in Orchestrator.habits.
 
-        self.data_view.SetColumnWidth(0, wx.LIST_AUTOSIZE)
-        self.data_view.SetColumnWidth(1, wx.LIST_AUTOSIZE)  # Assuming you have a second column
-        self.data_view.SetColumnWidth(2, wx.LIST_AUTOSIZE)
-        self.data_view.SetColumnWidth(3, wx.LIST_AUTOSIZE)
-        self.data_view.SetColumnWidth(4, wx.LIST_AUTOSIZE)
+        Returns:
+            int: The index of the habit, or -1 if no row is selected.
+        """
+        return self.row_model.habit_index(self.data_view.GetNextSelected(-1))
+
+    def on_filter(self, event):
+        """
+        Shows all habits or only the overdue ones.
+
+        Parameters:
+            event (wx.Event): The event object.
+        """
+        self.Orchestrator.refresh_main_menu_list()
 
     def on_analyze(self, event):
         """
@@ -132,12 +223,33 @@ class MainMenuGUIFrame(wx.Frame):
         Parameters:
             event (wx.Event): The event object.
         """
-        selection = self.data_view.GetNextSelected(-1)
+        selection = self.get_selected_index()
         if selection == -1:  # Check if no row is selected
             wx.MessageBox("Please select a habit to edit!", "Warning", wx.OK | wx.ICON_WARNING)
             return
         selected_habit = self.Orchestrator.get_habit_by_index(selection)
-        HabitAnalyzerGUI.AnalyzeGUI(selected_habit, title=selected_habit.name)
+        HabitAnalyzerGUI.AnalyzeGUI(selected_habit, title=selected_habit.name,
+                                    analyzer_cache=self.Orchestrator.analyzer_cache)
+
+    def on_leaderboard(self, event):
+        """
+        Opens the leaderboards and percentiles across all users.
+
+        Parameters:
+            event (wx.Event): The event object.
+        """
+        # The frame opens once the statistics of all users are collected in the background.
+        self.Orchestrator.get_cross_user_stats(self.show_leaderboard)
+
+    def show_leaderboard(self, stats):
+        """
+        Opens the leaderboards once the statistics are collected.
+
+        Parameters:
+            stats (CrossUserStats): The collected statistics.
+        """
+        if self:
+            CrossUserStatsFrame(self, stats)
 
     def on_new(self, event):
         """
@@ -155,7 +267,7 @@ class MainMenuGUIFrame(wx.Frame):
         Parameters:
             event (wx.Event): The event object.
         """
-        selection = self.data_view.GetNextSelected(-1)
+        selection = self.get_selected_index()
         if selection == -1:  # Check if no row is selected
             wx.MessageBox("Please select a habit to edit!", "Warning", wx.OK | wx.ICON_WARNING)
             return
@@ -170,7 +282,7 @@ class MainMenuGUIFrame(wx.Frame):
             event (wx.Event): The event object.
         """
         # Get the selected habit
-        selection = self.data_view.GetNextSelected(-1)
+        selection = self.get_selected_index()
         if selection == -1:  # Check if no row is selected
             wx.MessageBox("Please select a habit to remove!", "Warning", wx.OK | wx.ICON_WARNING)
             return
@@ -181,7 +293,6 @@ class MainMenuGUIFrame(wx.Frame):
 
         if dlg.ShowModal() == wx.ID_YES:
 
-            self.data_view.DeleteItem(selection)
             self.Orchestrator.delete_habit(selection)
 
         dlg.Destroy()
@@ -197,10 +308,10 @@ class MainMenuGUIFrame(wx.Frame):
         """
         logging.info("Perform Now button pressed.")
         # Get the selected habit
-        selection = self.data_view.GetNextSelected(-1)
+        selection = self.get_selected_index()
         if selection == -1:  # Check if no row is selected
             wx.MessageBox("Please select a habit to perform now!", "Warning", wx.OK | wx.ICON_WARNING)
             return
 
-        logging.info(f"Performing habit at row: {selection}")
+        logging.info(f"Performing habit at index: {selection}")
         self.Orchestrator.perform_habit_today(selection)
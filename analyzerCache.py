@@ -0,0 +1,216 @@
+import logging
+from collections import OrderedDict
+from datetime import date
+import Analyzer
+
+
+class AnalyzerCache:
+    """
+    A cache of Analyzer results per habit.
+
+    Results are stored under the habit id, the version of the habit, its frequency and the reference
+    date, so a changed habit or a new day never returns an old result. Every change of a habit raises
+    its version; the entries of older versions are dropped as soon as a newer version is looked up.
+    Lookups with an older version, e.g. of a snapshot(), are computed but never replace newer entries.
+
+    The statistics are kept in a bounded LRU. The days until the due date are needed for every row
+    of the main list on every refresh, so they get one slot per habit outside of the LRU instead.
+    A list with more habits than max_entries can't push out the results it needs itself.
+
+    Attributes:
+        max_entries (int): The maximum number of cached statistics.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to be computed.
+        evictions (int): Number of entries dropped because the cache was full.
+    """
+
+    def __init__(self, max_entries=256):
+        """
+        Initializes an empty cache.
+
+        Parameters:
+            max_entries (int, optional): The maximum number of cached statistics. Defaults to 256.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # Mapping of habit ids to the version the cached entries belong to and their keys.
+        self._versions = {}
+        self._keys = {}
+        # Mapping of habit ids to the key and the value of their days until due.
+        self._due = {}
+
+    def _get(self, habit, kind, reference_date, compute):
+        """
+        Returns a cached result or computes and stores it.
+
+        Parameters:
+            habit (Habit): The habit.
+            kind (str): The name of the result.
+            reference_date (str): The date the result refers to in 'YYYY-MM-DD' format.
+            compute (callable): Computes the result if it is not cached.
+
+        Returns:
+            The result.
+        """
+        key = self._lookup(habit, kind, reference_date)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        result = compute()
+        if not self._is_stale(habit):
+            self._store(key, result)
+        return result
+
+    def _is_stale(self, habit):
+        """
+        Checks whether newer results of the habit are cached than the version passed in.
+        """
+        return self._versions.get(habit.uid, habit.version) > habit.version
+
+    def _lookup(self, habit, kind, reference_date):
+        """
+        Drops the entries of older versions of the habit and returns the key of the result.
+        """
+        if self._versions.get(habit.uid, habit.version) < habit.version:
+            self.invalidate(habit)
+        return (habit.uid, habit.version, habit.frequency, reference_date, kind)
+
+    def _store(self, key, result):
+        """
+        Stores a result and evicts the least recently used entries if the cache is full.
+        """
+        uid, version = key[0], key[1]
+        self._entries[key] = result
+        self._versions[uid] = version
+        self._keys.setdefault(uid, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget_key(old_key)
+            self.evictions += 1
+
+    def _forget_key(self, key):
+        """Removes a key from the per habit bookkeeping."""
+        uid = key[0]
+        keys = self._keys.get(uid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[uid]
+                del self._versions[uid]
+
+    def summarize(self, habit, reference_date=None):
+        """
+        Returns the statistics of a habit, see Analyzer.summarize_days.
+
+        Parameters:
+            habit (Habit): The habit.
+            reference_date (str, optional): The date the statistics refer to. Defaults to today.
+
+        Returns:
+            HabitStats: The statistics of the habit.
+        """
+        reference_date = reference_date or date.today().isoformat()
+        return self._get(habit, "summary", reference_date,
+                         lambda: Analyzer.summarize_days(habit.log_days, habit.frequency))
+
+    def cached_summary(self, habit, reference_date=None):
+        """
+        Returns the statistics of a habit only if they are cached, e.g. before computing them in the background.
+
+        Parameters:
+            habit (Habit): The habit.
+            reference_date (str, optional): The date the statistics refer to. Defaults to today.
+
+        Returns:
+            HabitStats or None: The cached statistics, or None if they have to be computed.
+        """
+        key = self._lookup(habit, "summary", reference_date or date.today().isoformat())
+        if key not in self._entries:
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def store_summary(self, habit, stats, reference_date=None):
+        """
+        Stores statistics that were computed elsewhere, e.g. in a background thread.
+
+        Parameters:
+            habit (Habit): The habit, or a snapshot of it, the statistics were computed for.
+            stats (HabitStats): The statistics.
+            reference_date (str, optional): The date the statistics refer to. Defaults to today.
+        """
+        if self._is_stale(habit):
+            # The habit changed while the statistics were computed.
+            return
+        self.misses += 1
+        self._store(self._lookup(habit, "summary", reference_date or date.today().isoformat()), stats)
+
+    def days_until_due(self, habit, reference_date=None):
+        """
+        Returns the number of days until the habit is due.
+
+        Parameters:
+            habit (Habit): The habit.
+            reference_date (str, optional): The date to count from. Defaults to today.
+
+        Returns:
+            int: Number of days until the next due date, negative if the habit is overdue.
+        """
+        reference_date = reference_date or date.today().isoformat()
+        key = (habit.version, habit.next_due_date, reference_date)
+        cached = self._due.get(habit.uid)
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        days = Analyzer.days_until_date(habit.next_due_date, as_of=reference_date)
+        if cached is None or cached[0][0] <= habit.version:
+            self._due[habit.uid] = (key, days)
+        return days
+
+    def invalidate(self, habit):
+        """
+        Drops all cached results of a habit.
+
+        Parameters:
+            habit (Habit): The habit.
+        """
+        for key in self._keys.pop(habit.uid, ()):
+            del self._entries[key]
+        self._versions.pop(habit.uid, None)
+        self._due.pop(habit.uid, None)
+
+    def clear(self):
+        """
+        Drops all cached results. The counters are kept.
+        """
+        self._entries.clear()
+        self._versions.clear()
+        self._keys.clear()
+        self._due.clear()
+
+    def metrics(self):
+        """
+        Collects the size and the counters of the cache.
+
+        Returns:
+            dict: The number of entries, hits, misses and evictions.
+        """
+        metrics = {
+            'entries': len(self._entries),
+            'due_entries': len(self._due),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+        logging.debug(f"Analyzer cache metrics: {metrics}")
+        return metrics
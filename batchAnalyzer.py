@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Headless analytics over every habit of every user in a savefile.
+
+The habits are sent in chunks to a process pool, every worker computes the full statistics of its
+habits with Analyzer.summarize and the rows are written as NDJSON or CSV in savefile order.
+
+Run with:
+    python batchAnalyzer.py habithero_savefile.json --workers 8 --format csv --output report.csv
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import Analyzer
+from savefileStreamReader import iter_users
+
+# Columns of a result row. The month counts are only part of the NDJSON output.
+FIELDS = ["user", "habit", "frequency", "start_date", "log_count", "current_streak", "longest_streak",
+          "times_broken", "consistency", "average_gap", "longest_gap", "first_date", "last_date", "next_due_date"]
+
+
+def iter_habits(savefile_path, storage_format="json"):
+    """
+    Yields every habit of every user.
+
+    A JSON savefile is streamed one user at a time. The other storage formats are read through their
+    save file manager.
+
+    Parameters:
+        savefile_path (str): The path of the savefile or directory.
+        storage_format (str, optional): The storage format, see create_save_file_manager. Defaults to "json".
+
+    Yields:
+        tuple: The username and the habit dictionary.
+    """
+    if storage_format == "json":
+        for user_name, habits_dict_list in iter_users(savefile_path):
+            for habit_dict in habits_dict_list:
+                yield user_name, habit_dict
+        return
+
+    from saveFileManager import create_save_file_manager
+    manager = create_save_file_manager(storage_format, savefile_path)
+    for user_name in manager.get_all_users():
+        for habit in manager.load_data(user_name):
+            yield user_name, habit.to_dict()
+
+
+def analyze_habit(user_name, habit_dict):
+    """
+    Computes the statistics of one habit.
+
+    Parameters:
+        user_name (str): The name of the user owning the habit.
+        habit_dict (dict): The habit as stored in the savefile.
+
+    Returns:
+        dict or None: The result row, or None if the habit can't be analyzed.
+    """
+    try:
+        logs = sorted(habit_dict.get("logs") or [habit_dict["start_date"]])
+        stats = Analyzer.summarize(logs, habit_dict["frequency"])
+        row = {
+            "user": user_name,
+            "habit": habit_dict["name"],
+            "frequency": habit_dict["frequency"],
+            "start_date": habit_dict.get("start_date"),
+            "log_count": len(logs),
+            "next_due_date": Analyzer.next_habit_due(stats.last_date, habit_dict["frequency"])
+        }
+        for field in ("current_streak", "longest_streak", "times_broken", "consistency", "average_gap",
+                      "longest_gap", "first_date", "last_date"):
+            row[field] = getattr(stats, field)
+        row["month_counts"] = {f"{year:04d}-{month:02d}": count for (year, month), count in stats.month_counts}
+        return row
+    except Exception as e:
+        logging.error(f"Error while analyzing habit {habit_dict.get('name')} of user {user_name}: {str(e)}")
+        return None
+
+
+def analyze_chunk(chunk):
+    """
+    Computes the statistics of a chunk of habits. Runs inside the worker processes.
+
+    Parameters:
+        chunk (list[tuple]): Pairs of username and habit dictionary.
+
+    Returns:
+        list[dict]: The result rows in the order of the chunk, habits that failed are left out.
+    """
+    rows = (analyze_habit(user_name, habit_dict) for user_name, habit_dict in chunk)
+    return [row for row in rows if row is not None]
+
+
+def _chunks(iterable, chunk_size):
+    """Splits an iterable into lists of chunk_size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_savefile(savefile_path, workers=None, chunk_size=200, storage_format="json"):
+    """
+    Computes the statistics of every habit of every user.
+
+    The chunks are processed in parallel but the rows are yielded in savefile order, so the output
+    is the same for any number of workers. Only a few chunks per worker are in flight at a time,
+    which keeps the memory use flat for big savefiles.
+
+    Parameters:
+        savefile_path (str): The path of the savefile or directory.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+                                 With 1 everything runs in the current process.
+        chunk_size (int, optional): Number of habits sent to a worker at once. Defaults to 200.
+        storage_format (str, optional): The storage format, see create_save_file_manager. Defaults to "json".
+
+    Yields:
+        dict: One result row per habit.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(iter_habits(savefile_path, storage_format), chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from analyze_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(analyze_chunk, chunk))
+            # Results are taken in submit order, which keeps the output deterministic.
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_ndjson(rows, f):
+    """
+    Writes the rows as one JSON object per line.
+
+    Parameters:
+        rows (iterable of dict): The result rows.
+        f: A text file.
+
+    Returns:
+        int: The number of written rows.
+    """
+    count = 0
+    for row in rows:
+        f.write(json.dumps(row) + "\n")
+        count += 1
+    return count
+
+
+def write_csv(rows, f):
+    """
+    Writes the rows as CSV with a header line. The month counts are left out.
+
+    Parameters:
+        rows (iterable of dict): The result rows.
+        f: A text file opened with newline="".
+
+    Returns:
+        int: The number of written rows.
+    """
+    writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Parameters:
+        argv (list[str], optional): The arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: The number of analyzed habits.
+    """
+    parser = argparse.ArgumentParser(description="Compute the statistics of every habit of every user.")
+    parser.add_argument("savefile", nargs="?", default="habithero_savefile.json", help="The savefile or directory to analyze.")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite", "sharded"],
+                        help="The storage format of the savefile.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Number of habits per work package.")
+    parser.add_argument("--format", default="ndjson", choices=["ndjson", "csv"], help="The output format.")
+    parser.add_argument("--output", default=None, help="The output file. Defaults to stdout.")
+    args = parser.parse_args(argv)
+
+    rows = analyze_savefile(args.savefile, args.workers, args.chunk_size, args.storage)
+    writer = write_csv if args.format == "csv" else write_ndjson
+
+    if args.output is None:
+        return writer(rows, sys.stdout)
+    with open(args.output, "w", newline="") as f:
+        count = writer(rows, f)
+    logging.info(f"Wrote {count} rows to {args.output}.")
+    return count
+
+
+if __name__ == "__main__":
+    main()
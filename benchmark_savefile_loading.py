@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark for loading a single user from a large savefile.
+
+Compares the full json.load of the savefile with the streaming reader that only parses the
+requested user. The savefile is generated first with many users that each have several
+multi-year habits.
+
+Run with:
+    python benchmark_savefile_loading.py --size-mb 300
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from savefileStreamReader import load_user_habits
+
+
+def generate_savefile(path, size_mb, days_per_habit=1500, habits_per_user=7):
+    """
+    Writes a savefile of roughly the given size and returns the name of the last user.
+
+    Parameters:
+        path (str): Where to write the savefile.
+        size_mb (int): The approximate size of the savefile in megabytes.
+        days_per_habit (int, optional): Number of log entries per habit. Defaults to 1500.
+        habits_per_user (int, optional): Number of habits per user. Defaults to 7.
+
+    Returns:
+        str: The username of the last user in the file.
+    """
+    start = date(2020, 1, 1)
+    logs = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days_per_habit)]
+    habits = [{"name": f"Habit {i}", "goal": f"Goal for habit {i}", "frequency": "Daily",
+               "start_date": logs[0], "streak": 1, "logs": logs} for i in range(habits_per_user)]
+    user_json = json.dumps(habits)
+
+    target_size = size_mb * 1024 * 1024
+    written = 0
+    user_number = 0
+    with open(path, "w") as f:
+        f.write("{")
+        while written < target_size:
+            if user_number:
+                f.write(", ")
+            username = f"User_{user_number:06d}"
+            entry = json.dumps(username) + ": " + user_json
+            f.write(entry)
+            written += len(entry)
+            user_number += 1
+        f.write("}")
+    return username
+
+
+def load_with_json(path, username):
+    """The previous path: parse the whole savefile and pick the user."""
+    with open(path, "r") as f:
+        return json.load(f).get(username)
+
+
+def measure(function, path, username):
+    """
+    Measures the run time and the peak of traced memory of a loader.
+
+    Returns:
+        tuple: The run time in seconds and the memory peak in megabytes.
+    """
+    started = time.perf_counter()
+    function(path, username)
+    elapsed = time.perf_counter() - started
+
+    # Tracing memory slows everything down, so it runs separately from the timing.
+    tracemalloc.start()
+    function(path, username)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading one user from a large savefile.")
+    parser.add_argument("--size-mb", type=int, default=300, help="Size of the generated savefile in MB.")
+    parser.add_argument("--path", default="benchmark_savefile.json", help="Where to write the generated savefile.")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated savefile afterwards.")
+    args = parser.parse_args()
+
+    print(f"Generating a {args.size_mb} MB savefile at {args.path} ...")
+    last_user = generate_savefile(args.path, args.size_mb)
+    print(f"Savefile size: {os.path.getsize(args.path) / (1024 * 1024):.1f} MB, loading {last_user}")
+
+    try:
+        assert load_with_json(args.path, last_user) == load_user_habits(args.path, last_user)
+        for label, loader in (("json.load", load_with_json), ("streaming", load_user_habits)):
+            elapsed, peak = measure(loader, args.path, last_user)
+            print(f"{label:>10}: {elapsed:8.3f} s, peak memory {peak:10.1f} MB")
+    finally:
+        if not args.keep:
+            os.remove(args.path)
@@ -0,0 +1,181 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+
+class CalendarIndex:
+    """
+    Counts the log entries of a habit per month and answers period queries without scanning the logs.
+
+    The index keeps one count per month from the first to the last logged month together with their
+    prefix sums, so counting the entries of a month, a range of months or a year is O(1). Counts for
+    weeks and arbitrary date ranges use binary search on the sorted day ordinals of the habit.
+
+    The days are not copied. Whoever inserts a day into them has to call add() afterwards.
+
+    Attributes:
+        days (array): The sorted day ordinals of the habit, see Habit.log_days.
+    """
+
+    def __init__(self, days):
+        """
+        Builds the index from the logged days.
+
+        Parameters:
+            days (array): The sorted day ordinals of the habit.
+        """
+        self.days = days
+        self._first_month = 0
+        self._counts = array('i')
+        # _prefix[i] is the number of entries in the months before _first_month + i.
+        self._prefix = array('i', [0])
+
+        if days:
+            self._grow(_month_number(days[0]))
+            self._grow(_month_number(days[-1]))
+            for day in days:
+                self._counts[_month_number(day) - self._first_month] += 1
+            for i, count in enumerate(self._counts):
+                self._prefix[i + 1] = self._prefix[i] + count
+
+    def _grow(self, month):
+        """
+        Extends the month range so it contains a month.
+
+        Parameters:
+            month (int): The month number, see _month_number.
+        """
+        if not self._counts:
+            self._first_month = month
+        elif month < self._first_month:
+            # Back-dated entries before the first month are rare, the arrays are rebuilt.
+            missing = self._first_month - month
+            self._counts = array('i', [0]) * missing + self._counts
+            self._prefix = array('i', [0]) * missing + self._prefix
+            self._first_month = month
+            return
+
+        missing = month - self._first_month + 1 - len(self._counts)
+        if missing > 0:
+            self._counts.extend([0] * missing)
+            self._prefix.extend([self._prefix[-1]] * missing)
+
+    def add(self, day):
+        """
+        Counts a day that was just inserted into the days.
+
+        Adding a day in the last month only updates one prefix sum. A back-dated day updates the
+        prefix sums of the months behind it.
+
+        Parameters:
+            day (int): The day ordinal.
+        """
+        month = _month_number(day)
+        self._grow(month)
+        index = month - self._first_month
+        self._counts[index] += 1
+        for i in range(index + 1, len(self._prefix)):
+            self._prefix[i] += 1
+
+    def _count_months(self, first_month, last_month):
+        """
+        Counts the entries of a range of months, both included.
+
+        Parameters:
+            first_month (int): The first month number.
+            last_month (int): The last month number.
+
+        Returns:
+            int: The number of entries.
+        """
+        start = max(first_month - self._first_month, 0)
+        end = min(last_month - self._first_month + 1, len(self._counts))
+        if start >= end:
+            return 0
+        return self._prefix[end] - self._prefix[start]
+
+    def count_in_month(self, month, year):
+        """
+        Counts the entries of a month.
+
+        Parameters:
+            month (int): The month (1-12).
+            year (int): The year.
+
+        Returns:
+            int: The number of entries in that month.
+        """
+        month_number = year * 12 + month - 1
+        return self._count_months(month_number, month_number)
+
+    def count_in_year(self, year):
+        """
+        Counts the entries of a year.
+
+        Parameters:
+            year (int): The year.
+
+        Returns:
+            int: The number of entries in that year.
+        """
+        return self._count_months(year * 12, year * 12 + 11)
+
+    def count_in_week(self, day):
+        """
+        Counts the entries of the Monday to Sunday week containing a day.
+
+        Parameters:
+            day (int): A day ordinal in the week.
+
+        Returns:
+            int: The number of entries in that week.
+        """
+        # Day ordinal 1 is a Monday, so (day - 1) % 7 is the weekday.
+        monday = day - (day - 1) % 7
+        return self.count_between(monday, monday + 6)
+
+    def count_between(self, first_day, last_day):
+        """
+        Counts the entries between two days, both included.
+
+        Parameters:
+            first_day (int): The first day ordinal.
+            last_day (int): The last day ordinal.
+
+        Returns:
+            int: The number of entries.
+        """
+        return max(bisect_right(self.days, last_day) - bisect_left(self.days, first_day), 0)
+
+    def year_over_year(self, year):
+        """
+        Compares the monthly counts of a year with the year before.
+
+        Parameters:
+            year (int): The year.
+
+        Returns:
+            list[tuple]: Twelve tuples of the month, its count in the year and its count in the year before.
+        """
+        return [(month, self.count_in_month(month, year), self.count_in_month(month, year - 1))
+                for month in range(1, 13)]
+
+    def month_counts(self):
+        """
+        Returns the counts of all months with entries.
+
+        Returns:
+            dict: Mapping of (year, month) to the count, oldest month first.
+        """
+        month_counts = {}
+        for i, count in enumerate(self._counts):
+            if count:
+                year, month = divmod(self._first_month + i, 12)
+                month_counts[(year, month + 1)] = count
+        return month_counts
+
+
+def _month_number(day):
+    """Returns the number of months since year 0 of a day ordinal, January of year 0 being 0."""
+    day_date = date.fromordinal(day)
+    return day_date.year * 12 + day_date.month - 1
@@ -0,0 +1,216 @@
+import heapq
+import logging
+import math
+import random
+from datetime import date
+
+import Analyzer
+from frequencyRules import compile_frequency, DailyRule, WeeklyRule, MonthlyRule, EveryNDaysRule, WeekdayRule
+from saveFileManager import SaveFileManager
+from savefileStreamReader import iter_users
+
+# Display names of the frequency types the percentiles are grouped by.
+FREQUENCY_TYPES = {
+    DailyRule: "Daily",
+    WeeklyRule: "Weekly",
+    MonthlyRule: "Monthly",
+    EveryNDaysRule: "Every N Days",
+    WeekdayRule: "Weekday"
+}
+
+
+def frequency_type(frequency):
+    """
+    Returns the frequency type of a frequency, e.g. "Every N Days" for "Every 3 Days".
+
+    Parameters:
+        frequency (str): The frequency of a habit.
+
+    Returns:
+        str: The frequency type.
+    """
+    return FREQUENCY_TYPES[type(compile_frequency(frequency))]
+
+
+class CrossUserStats:
+    """
+    Statistics across all users, collected habit by habit with bounded memory.
+
+    The longest and the current streaks are ranked in two heaps that never hold more than top_k
+    entries. The consistency rates are kept as a reservoir sample of at most sample_size values per
+    frequency type, which the percentiles are calculated from. The memory use is the same for ten
+    users or ten million.
+
+    Attributes:
+        top_k (int): The number of ranked habits.
+        sample_size (int): The maximum number of consistency rates kept per frequency type.
+        users (int): Number of users with habits added so far.
+        habits (int): Number of habits added so far.
+    """
+
+    def __init__(self, top_k=10, sample_size=1000, seed=None):
+        """
+        Initializes empty statistics.
+
+        Parameters:
+            top_k (int, optional): The number of ranked habits. Defaults to 10.
+            sample_size (int, optional): The maximum number of consistency rates kept per frequency type. Defaults to 1000.
+            seed (int, optional): Seed of the random sampling, for reproducible percentiles. Defaults to None.
+        """
+        self.top_k = top_k
+        self.sample_size = sample_size
+        self.users = 0
+        self.habits = 0
+        self._random = random.Random(seed)
+        self._longest = []
+        self._current = []
+        # Mapping of frequency types to the number of seen habits and the sampled consistency rates.
+        self._seen = {}
+        self._samples = {}
+        self._last_user = None
+
+    def _rank(self, heap, value, user_name, habit_name):
+        """
+        Keeps the top_k highest values in a min-heap. On ties the habit seen first stays.
+        """
+        entry = (value, -self.habits, user_name, habit_name)
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    def _sample(self, kind, value):
+        """
+        Adds a value to the reservoir of a frequency type (Algorithm R).
+        """
+        seen = self._seen.get(kind, 0) + 1
+        self._seen[kind] = seen
+        sample = self._samples.setdefault(kind, [])
+        if len(sample) < self.sample_size:
+            sample.append(value)
+        else:
+            slot = self._random.randrange(seen)
+            if slot < self.sample_size:
+                sample[slot] = value
+
+    def add_habit(self, user_name, habit_dict, today=None):
+        """
+        Adds one habit to the statistics.
+
+        Parameters:
+            user_name (str): The name of the user owning the habit.
+            habit_dict (dict): The habit as stored in the savefile.
+            today (int, optional): The day ordinal overdue habits are checked against. Defaults to today.
+        """
+        try:
+            logs = sorted(habit_dict.get("logs") or [habit_dict["start_date"]])
+            rule = compile_frequency(habit_dict["frequency"])
+            stats = Analyzer.summarize(logs, habit_dict["frequency"])
+        except Exception as e:
+            logging.error(f"Skipping habit {habit_dict.get('name')} of user {user_name}: {str(e)}")
+            return
+
+        if user_name != self._last_user:
+            self.users += 1
+            self._last_user = user_name
+        self.habits += 1
+
+        # Like in the main list an overdue habit has no current streak.
+        today = today or date.today().toordinal()
+        overdue = rule.next_due(date.fromisoformat(stats.last_date).toordinal()) < today
+        current_streak = 0 if overdue else stats.current_streak
+
+        self._rank(self._longest, stats.longest_streak, user_name, habit_dict["name"])
+        self._rank(self._current, current_streak, user_name, habit_dict["name"])
+        self._sample(FREQUENCY_TYPES[type(rule)], stats.consistency)
+
+    def top_longest_streaks(self):
+        """
+        Returns the habits with the longest streaks.
+
+        Returns:
+            list[tuple]: Up to top_k tuples of streak, username and habit name, highest first.
+        """
+        return [(value, user, habit) for value, _, user, habit in sorted(self._longest, reverse=True)]
+
+    def top_current_streaks(self):
+        """
+        Returns the habits with the highest current streaks.
+
+        Returns:
+            list[tuple]: Up to top_k tuples of streak, username and habit name, highest first.
+        """
+        return [(value, user, habit) for value, _, user, habit in sorted(self._current, reverse=True)]
+
+    def frequency_types(self):
+        """
+        Returns the frequency types that have habits.
+
+        Returns:
+            dict: Mapping of the frequency types to the number of habits of that type.
+        """
+        return dict(self._seen)
+
+    def percentiles(self, kind, percents=(50, 90, 99)):
+        """
+        Estimates percentiles of the consistency rates of a frequency type from the sample.
+
+        The values are exact as long as no more than sample_size habits of the type were added.
+
+        Parameters:
+            kind (str): The frequency type, see FREQUENCY_TYPES.
+            percents (tuple[int], optional): The percentiles to calculate. Defaults to (50, 90, 99).
+
+        Returns:
+            dict: Mapping of the percentiles to the consistency rates, empty if there are no habits of the type.
+        """
+        sample = sorted(self._samples.get(kind, []))
+        if not sample:
+            return {}
+        # Nearest rank method.
+        return {percent: sample[max(math.ceil(percent / 100 * len(sample)), 1) - 1] for percent in percents}
+
+
+def iter_manager_habits(save_file_manager):
+    """
+    Yields every habit of every user of a save file manager, one user at a time.
+
+    A JSON savefile is streamed directly, the other formats load one user after another.
+
+    Parameters:
+        save_file_manager: Any of the save file managers.
+
+    Yields:
+        tuple: The username and the habit dictionary.
+    """
+    if isinstance(save_file_manager, SaveFileManager):
+        for user_name, habits_dict_list in iter_users(save_file_manager.savefile_path):
+            for habit_dict in habits_dict_list:
+                yield user_name, habit_dict
+        return
+
+    for user_name in save_file_manager.get_all_users():
+        for habit in save_file_manager.load_data(user_name):
+            yield user_name, habit.to_dict()
+
+
+def collect_cross_user_stats(habits, top_k=10, sample_size=1000, seed=None):
+    """
+    Collects the statistics of a stream of habits.
+
+    Parameters:
+        habits (iterable of tuple): Pairs of username and habit dictionary, e.g. from iter_manager_habits or
+                                    batchAnalyzer.iter_habits.
+        top_k (int, optional): The number of ranked habits. Defaults to 10.
+        sample_size (int, optional): The maximum number of consistency rates kept per frequency type. Defaults to 1000.
+        seed (int, optional): Seed of the random sampling. Defaults to None.
+
+    Returns:
+        CrossUserStats: The collected statistics.
+    """
+    stats = CrossUserStats(top_k, sample_size, seed)
+    today = date.today().toordinal()
+    for user_name, habit_dict in habits:
+        stats.add_habit(user_name, habit_dict, today)
+    logging.info(f"Collected cross user statistics of {stats.habits} habits of {stats.users} users.")
+    return stats
@@ -0,0 +1,267 @@
+import logging
+from bisect import bisect_left, insort
+from datetime import date
+from typing import NamedTuple
+
+from frequencyRules import compile_frequency
+
+
+class DueEntry(NamedTuple):
+    """
+    A habit in the DueIndex.
+
+    Attributes:
+        due_date (str): The next due date in 'YYYY-MM-DD' format.
+        user (str): The name of the user owning the habit.
+        habit (str): The name of the habit.
+        key (tuple): The key of the habit in the index, the username followed by an id.
+    """
+    due_date: str
+    user: str
+    habit: str
+    key: tuple
+
+
+class _SortedList:
+    """
+    A sorted list split into short sublists, so inserting and removing don't move the whole list.
+
+    Finding the sublist is a binary search over the last item of every sublist, inserting or removing
+    inside it only moves up to LOAD items. Sublists are split when they grow to twice that size.
+    """
+
+    LOAD = 256
+
+    def __init__(self):
+        self._lists = []
+        self._maxes = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, item):
+        """Inserts an item at its sorted position."""
+        self._len += 1
+        if not self._lists:
+            self._lists.append([item])
+            self._maxes.append(item)
+            return
+        position = min(bisect_left(self._maxes, item), len(self._lists) - 1)
+        sublist = self._lists[position]
+        insort(sublist, item)
+        self._maxes[position] = sublist[-1]
+        if len(sublist) > 2 * self.LOAD:
+            self._lists.insert(position + 1, sublist[self.LOAD:])
+            del sublist[self.LOAD:]
+            self._maxes.insert(position, sublist[-1])
+
+    def remove(self, item):
+        """Removes an item that is in the list."""
+        position = bisect_left(self._maxes, item)
+        sublist = self._lists[position]
+        del sublist[bisect_left(sublist, item)]
+        self._len -= 1
+        if sublist:
+            self._maxes[position] = sublist[-1]
+        else:
+            del self._lists[position]
+            del self._maxes[position]
+
+    def irange(self, low, high):
+        """
+        Yields the items from the first one not below low up to the last one below high, in order.
+        """
+        position = bisect_left(self._maxes, low)
+        if position == len(self._lists):
+            return
+        start = bisect_left(self._lists[position], low)
+        for sublist in self._lists[position:]:
+            for i in range(start, len(sublist)):
+                if sublist[i] >= high:
+                    return
+                yield sublist[i]
+            start = 0
+
+
+class DueIndex:
+    """
+    All habits ordered by their next due date, across all users and for every user on its own.
+
+    The habits are kept in sorted lists of (due day, sequence number, key) tuples, one for all users
+    and one per user. A query is a binary search for the start of the requested range followed by the
+    k matching habits, and changing the due date of a habit removes and inserts one tuple per list,
+    both in about O(log n).
+
+    Keys are tuples starting with the username, so all habits of a user can be replaced at once.
+    """
+
+    def __init__(self):
+        # The sequence number keeps keys of different types from being compared and orders habits
+        # with the same due day by insertion.
+        self._order = _SortedList()
+        self._user_order = {}
+        # Mapping of keys to their sort tuple and entry.
+        self._entries = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def update(self, key, due_date, habit_name):
+        """
+        Adds a habit or moves it to its new due date.
+
+        Parameters:
+            key (tuple): The key of the habit, starting with the username.
+            due_date (str): The next due date in 'YYYY-MM-DD' format.
+            habit_name (str): The name of the habit.
+        """
+        self.remove(key)
+        self._sequence += 1
+        position = (date.fromisoformat(due_date).toordinal(), self._sequence, key)
+        self._order.add(position)
+        self._user_order.setdefault(key[0], _SortedList()).add(position)
+        self._entries[key] = (position, DueEntry(due_date, key[0], habit_name, key))
+
+    def remove(self, key):
+        """
+        Removes a habit. Unknown keys are ignored.
+
+        Parameters:
+            key (tuple): The key of the habit.
+        """
+        stored = self._entries.pop(key, None)
+        if stored is None:
+            return
+        position = stored[0]
+        self._order.remove(position)
+        user_order = self._user_order[key[0]]
+        user_order.remove(position)
+        if not user_order:
+            del self._user_order[key[0]]
+
+    def remove_user(self, user_name):
+        """
+        Removes all habits of a user.
+
+        Parameters:
+            user_name (str): The name of the user.
+        """
+        user_order = self._user_order.get(user_name)
+        if user_order is None:
+            return
+        for position in list(user_order.irange((0,), (float("inf"),))):
+            self.remove(position[2])
+
+    def users(self):
+        """
+        Returns the users with habits in the index.
+
+        Returns:
+            list[str]: The usernames.
+        """
+        return list(self._user_order)
+
+    def get(self, key):
+        """
+        Returns the entry of a habit.
+
+        Parameters:
+            key (tuple): The key of the habit.
+
+        Returns:
+            DueEntry or None: The entry, or None if the habit is not in the index.
+        """
+        stored = self._entries.get(key)
+        return stored[1] if stored else None
+
+    def due_between(self, first_day, last_day, user=None):
+        """
+        Returns the habits due between two days, both included.
+
+        Parameters:
+            first_day (int): The first day ordinal.
+            last_day (int): The last day ordinal.
+            user (str, optional): Only return the habits of this user. Defaults to all users.
+
+        Returns:
+            list[DueEntry]: The habits ordered by due date.
+        """
+        if user is None:
+            order = self._order
+        else:
+            order = self._user_order.get(user)
+            if order is None:
+                return []
+        return [self._entries[key][1] for _, _, key in order.irange((first_day,), (last_day + 1,))]
+
+    def due_on(self, day, user=None):
+        """
+        Returns the habits due on a day, e.g. today.
+
+        Parameters:
+            day (int): The day ordinal.
+            user (str, optional): Only return the habits of this user. Defaults to all users.
+
+        Returns:
+            list[DueEntry]: The habits due that day.
+        """
+        return self.due_between(day, day, user)
+
+    def overdue(self, today, min_days=0, user=None):
+        """
+        Returns the habits that are overdue by more than min_days.
+
+        Parameters:
+            today (int): The day ordinal of today.
+            min_days (int, optional): The number of days a habit has to be overdue at least. Defaults to 0.
+            user (str, optional): Only return the habits of this user. Defaults to all users.
+
+        Returns:
+            list[DueEntry]: The overdue habits, the longest overdue first.
+        """
+        return self.due_between(0, today - min_days - 1, user)
+
+    def due_within(self, today, days=7, user=None):
+        """
+        Returns the habits due from today on within the given number of days.
+
+        Parameters:
+            today (int): The day ordinal of today.
+            days (int, optional): The number of days to look ahead. Defaults to 7.
+            user (str, optional): Only return the habits of this user. Defaults to all users.
+
+        Returns:
+            list[DueEntry]: The habits ordered by due date.
+        """
+        return self.due_between(today, today + days, user)
+
+
+def build_due_index(habits):
+    """
+    Builds the index from a stream of saved habits.
+
+    The habits get the key (username, "saved", position), since saved habits have no id of their own.
+
+    Parameters:
+        habits (iterable of tuple): Pairs of username and habit dictionary, e.g. from crossUserStats.iter_manager_habits.
+
+    Returns:
+        DueIndex: The index of all habits.
+    """
+    index = DueIndex()
+    positions = {}
+    for user_name, habit_dict in habits:
+        position = positions.get(user_name, 0)
+        positions[user_name] = position + 1
+        try:
+            last_performed = max(habit_dict.get("logs") or [habit_dict["start_date"]])
+            last_day = date.fromisoformat(last_performed).toordinal()
+            due_day = compile_frequency(habit_dict["frequency"]).next_due(last_day)
+        except Exception as e:
+            logging.error(f"Skipping habit {habit_dict.get('name')} of user {user_name} in the due index: {str(e)}")
+            continue
+        index.update((user_name, "saved", position), date.fromordinal(due_day).isoformat(), habit_dict["name"])
+    logging.info(f"Built due index with {len(index)} habits.")
+    return index
@@ -0,0 +1,286 @@
+import functools
+import logging
+import math
+from abc import ABC, abstractmethod
+from datetime import date
+
+# Weekday names as used in frequencies like "Every Monday", in the order of date.weekday().
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class FrequencyRule(ABC):
+    """
+    Base class of the compiled frequencies. Subclasses implement in_range and next_due.
+
+    A rule answers the questions the Analyzer asks about a frequency without parsing the frequency
+    string again. All dates are day ordinals as returned by date.toordinal().
+
+    Attributes:
+        frequency (str): The frequency string the rule was compiled from.
+        period (float): The average number of days between two expected performances.
+    """
+
+    period = 1
+
+    def __init__(self, frequency):
+        self.frequency = frequency
+
+    @abstractmethod
+    def in_range(self, prev_day, curr_day, strict=False):
+        """
+        Checks if the timespan between two days matches the frequency.
+
+        Parameters:
+            prev_day (int): The earlier day ordinal.
+            curr_day (int): The later day ordinal.
+            strict (bool, optional): Whether the check should be strict. Doesn't apply to all rules.
+
+        Returns:
+            bool: True if the two days are in the desired range.
+        """
+
+    def in_range_on(self, prev_day, curr_day, today, strict=False):
+        """
+        Like in_range, but as if the check was done on another day than today.
+
+        Only rules that depend on the current day need to override it.
+
+        Parameters:
+            prev_day (int): The earlier day ordinal.
+            curr_day (int): The later day ordinal.
+            today (int): The day ordinal the check is done on.
+            strict (bool, optional): Whether the check should be strict. Doesn't apply to all rules.
+
+        Returns:
+            bool: True if the two days are in the desired range.
+        """
+        return self.in_range(prev_day, curr_day, strict)
+
+    @abstractmethod
+    def next_due(self, last_day):
+        """
+        Calculates the day the habit is due next.
+
+        Parameters:
+            last_day (int): The day ordinal the habit was last performed.
+
+        Returns:
+            int: The day ordinal of the next due date.
+        """
+
+    def in_range_many(self, days, strict=False):
+        """
+        Checks every pair of consecutive days of a list.
+
+        Parameters:
+            days (sequence of int): Day ordinals in ascending order.
+            strict (bool, optional): Whether the check should be strict. Doesn't apply to all rules.
+
+        Returns:
+            list[bool]: One entry per pair, entry i belongs to days[i] and days[i + 1].
+        """
+        return [self.in_range(days[i - 1], days[i], strict) for i in range(1, len(days))]
+
+    def next_due_many(self, last_days):
+        """
+        Calculates the next due date for many last performed days.
+
+        Parameters:
+            last_days (sequence of int): Day ordinals the habit was last performed.
+
+        Returns:
+            list[int]: The day ordinals of the next due dates.
+        """
+        return [self.next_due(day) for day in last_days]
+
+    def expected_between(self, first_day, last_day):
+        """
+        Counts the performances expected between two days, both included.
+
+        By default this is the number of started periods. Rules bound to the calendar count the
+        weeks, months or weekdays that end inside the days instead.
+
+        Parameters:
+            first_day (int): The first day ordinal.
+            last_day (int): The last day ordinal.
+
+        Returns:
+            int: The number of expected performances.
+        """
+        return math.ceil((last_day - first_day + 1) / self.period)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.frequency!r})"
+
+
+class DailyRule(FrequencyRule):
+    """Performed every day."""
+
+    def in_range(self, prev_day, curr_day, strict=False):
+        return abs(curr_day - prev_day) == 1
+
+    def next_due(self, last_day):
+        return last_day + 1
+
+    def in_range_many(self, days, strict=False):
+        return [abs(curr - prev) == 1 for prev, curr in zip(days, days[1:])]
+
+
+class WeeklyRule(FrequencyRule):
+    """Performed once in every ISO calendar week."""
+
+    period = 7
+
+    def in_range(self, prev_day, curr_day, strict=False):
+        return self._weeks_in_range(_iso_week(prev_day), _iso_week(curr_day))
+
+    @staticmethod
+    def _weeks_in_range(prev_week, curr_week):
+        # Some years have 52 weeks and some 53.
+        # For years with 53 weeks user wont get penelized for not loggig an action in the last week.
+        # <= 1 because doing it twice in the same week should not provide a negative
+        return curr_week - prev_week <= 1 or (curr_week == 1 and (prev_week == 52 or prev_week == 53))
+
+    def next_due(self, last_day):
+        # The Sunday of the following week. Day ordinal 1 is a Monday, so (day - 1) % 7 is the weekday.
+        return last_day + (6 - (last_day - 1) % 7) + 7
+
+    def in_range_many(self, days, strict=False):
+        # Every week number is only calculated once instead of once per pair.
+        weeks = [_iso_week(day) for day in days]
+        return [self._weeks_in_range(prev, curr) for prev, curr in zip(weeks, weeks[1:])]
+
+    def expected_between(self, first_day, last_day):
+        # One performance per week ending inside the days, a week ends on Sunday.
+        return _count_weekday(first_day, last_day, 6)
+
+
+class MonthlyRule(FrequencyRule):
+    """Performed once in every calendar month."""
+
+    period = 365.25 / 12
+
+    def in_range(self, prev_day, curr_day, strict=False):
+        return _month_number(curr_day) - _month_number(prev_day) <= 1
+
+    def next_due(self, last_day):
+        # The last day of the following month is the day before the first of the month after it.
+        last_date = date.fromordinal(last_day)
+        months = last_date.year * 12 + last_date.month + 1
+        return date(months // 12, months % 12 + 1, 1).toordinal() - 1
+
+    def in_range_many(self, days, strict=False):
+        months = [_month_number(day) for day in days]
+        return [curr - prev <= 1 for prev, curr in zip(months, months[1:])]
+
+    def expected_between(self, first_day, last_day):
+        # One performance per month ending inside the days. A month ends there if the next day is in another month.
+        return _month_number(last_day + 1) - _month_number(first_day)
+
+
+class EveryNDaysRule(FrequencyRule):
+    """
+    Performed every N days. Strict means it needs to be exactly N days.
+
+    Attributes:
+        days (int): The number of days between two performances.
+    """
+
+    def __init__(self, frequency, days):
+        super().__init__(frequency)
+        self.days = days
+        self.period = days
+
+    def in_range(self, prev_day, curr_day, strict=False):
+        if strict:
+            return curr_day - prev_day == self.days
+        return curr_day - prev_day <= self.days
+
+    def next_due(self, last_day):
+        return last_day + self.days
+
+    def in_range_many(self, days, strict=False):
+        if strict:
+            return [curr - prev == self.days for prev, curr in zip(days, days[1:])]
+        return [curr - prev <= self.days for prev, curr in zip(days, days[1:])]
+
+
+class WeekdayRule(FrequencyRule):
+    """
+    Performed on one day of the week.
+
+    Attributes:
+        weekday (int): The weekday as returned by date.weekday(), Monday is 0.
+    """
+
+    period = 7
+
+    def __init__(self, frequency, weekday):
+        super().__init__(frequency)
+        self.weekday = weekday
+
+    def in_range(self, prev_day, curr_day, strict=False):
+        return self.in_range_on(prev_day, curr_day, date.today().toordinal(), strict)
+
+    def in_range_on(self, prev_day, curr_day, today, strict=False):
+        if curr_day - prev_day > 7:
+            return False
+        # Day ordinal 1 is a Monday, so (day - 1) % 7 is the weekday.
+        return (today - 1) % 7 == self.weekday
+
+    def next_due(self, last_day):
+        # Day ordinal 1 is a Monday, so (day - 1) % 7 is the weekday.
+        return last_day + (self.weekday - (last_day - 1) % 7 - 1) % 7 + 1
+
+    def expected_between(self, first_day, last_day):
+        return _count_weekday(first_day, last_day, self.weekday)
+
+
+def _iso_week(day):
+    """Returns the ISO week number of a day ordinal."""
+    return date.fromordinal(day).isocalendar()[1]
+
+
+def _count_weekday(first_day, last_day, weekday):
+    """Counts the days of a weekday between two day ordinals, both included. Monday is 0."""
+    # Day ordinal 1 is a Monday, so (day - 1 - weekday) // 7 counts the matching days up to a day.
+    return (last_day - 1 - weekday) // 7 - (first_day - 2 - weekday) // 7
+
+
+def _month_number(day):
+    """Returns the number of months since year 0 of a day ordinal."""
+    day_date = date.fromordinal(day)
+    return day_date.year * 12 + day_date.month
+
+
+@functools.lru_cache(maxsize=256)
+def compile_frequency(frequency):
+    """
+    Turns a frequency string into a rule object.
+
+    The rules are cached, so every distinct frequency string is only parsed once.
+
+    Parameters:
+        frequency (str): "Daily", "Weekly", "Monthly", "Every N Days" or "Every <Weekday>".
+
+    Returns:
+        FrequencyRule: The compiled rule.
+
+    Raises:
+        ValueError: If the frequency is not supported.
+    """
+    if frequency == "Daily":
+        return DailyRule(frequency)
+    elif frequency == "Weekly":
+        return WeeklyRule(frequency)
+    elif frequency == "Monthly":
+        return MonthlyRule(frequency)
+    elif "Days" in frequency:
+        return EveryNDaysRule(frequency, int(frequency.split(" ")[1]))
+    elif "Every" in frequency:
+        words = frequency.split(" ")
+        if len(words) > 1 and words[1] in WEEKDAYS:
+            return WeekdayRule(frequency, WEEKDAYS.index(words[1]))
+
+    logging.error(f"Frequency Value Error: {frequency}")
+    raise ValueError("No matching frequency found.")
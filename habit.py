@@ -1,6 +1,16 @@
-from datetime import datetime
-import Analyzer
+from datetime import datetime, date
+from array import array
+from bisect import bisect_left
+import copy
+import itertools
+import json
 import logging
+from frequencyRules import compile_frequency
+from calendarIndex import CalendarIndex
+from rollingAdherence import RollingAdherence
+
+# Hands out a unique id to every habit, e.g. to cache results per habit. Copies keep the id.
+_habit_ids = itertools.count(1)
 
 
 class Habit:
@@ -15,27 +25,52 @@ class Habit:
         name (str): Name of the habit.
         goal (str): Goal or description of the habit.
         frequency (str): Frequency of the habit.
-        streak (int, optional): Current streak count. Defaults to 0.
+        streak (int, optional): The saved streak count. The streak is calculated from the logs, only a saved
+                                zero of an overdue habit is kept. Defaults to None.
         start_date (str, optional): The starting date of the habit. Defaults to the current date.
         strict (bool, optional): If True, the habit must be performed exactly on the due date. Defaults to False.
         logs (list of str, optional): Initial log entries. Defaults to an empty list.
     """
 
-    def __init__(self, name, goal, frequency, streak=0, start_date=None, strict=False, logs=None):
+    def __init__(self, name, goal, frequency, streak=None, start_date=None, strict=False, logs=None):
         value_string = f"Init: name: {name}, goal: {goal}, frequency: {frequency}, streak: {streak}, start_date: {start_date}, strict: {strict}, logs: {logs}"
         logging.debug(value_string)
         self.name = name  # The name of the habit
         self.strict = strict
         self.goal = goal  # The goal or description
         self.frequency = frequency  # Daily, Weekly (Once a week), Monthly, or a specific day like 'Monday'
+        self.rule = compile_frequency(frequency)  # The parsed frequency, see frequencyRules
         self.start_date = start_date if start_date else datetime.now().strftime("%Y-%m-%d")  # The date when the habit starts
         self.streak = 0  # The current streak for the habit
-        self.logs = logs if logs else []  # A list to keep track of when the habit was performed
-        if len(self.logs) < 1:
-            self.logs.append(start_date)
+
+        # The dates the habit was performed, kept as sorted day ordinals (date.toordinal()).
+        # The 'YYYY-MM-DD' strings are only built for saving and displaying, see the logs property.
+        self._days = array('i', sorted(date_to_ordinal(log) for log in (logs or [self.start_date])))
 
         self.next_due_date = self.calculate_next_due_date()
-        self.streak = self.calculate_streak()
+
+        # The current streak only needs a scan back to the last break. The streak length at every
+        # log entry is only built once the longest streak or the number of breaks is needed,
+        # afterwards it is kept up to date entry by entry.
+        self._current_run = self.calculate_streak()
+        self.streak = self._current_run
+        # A habit saved after its streak was reset for being overdue keeps the saved zero, so loading
+        # it doesn't count as a change, see reset_overdue_streaks.
+        if streak == 0 and self.is_overdue():
+            self.streak = 0
+        self._runs = None
+        self._longest_streak = 0
+        self._times_broken = 0
+        # Per-month counts of the logs and the completion rates of the last days,
+        # built on first use and updated with every new entry.
+        self._calendar = None
+        self._adherence = None
+
+        # The version is raised by every change, the JSON of the habit is cached for one version.
+        # The cache is a list so copies made by snapshot() share it with the original.
+        self.version = 0
+        self._json_cache = [None]
+        self.uid = next(_habit_ids)
 
     @classmethod
     def from_dict(cls, habit_dict):
@@ -54,18 +89,126 @@ class Habit:
         }
         return habit_dict
 
+    def to_json(self):
+        """
+        Convert the Habit object to its JSON text.
+
+        The text is cached and only rebuilt after the habit was changed.
+
+        Returns:
+            str: The habit dictionary as JSON.
+        """
+        return self._cached_dict_and_json()[1]
+
+    def saved_dict(self):
+        """
+        Returns the dictionary of the habit as it is saved, see to_dict.
+
+        Like the JSON text the dictionary is cached and only rebuilt after the habit was changed,
+        so saving unchanged habits doesn't format their logs again. The dictionary must not be changed.
+
+        Returns:
+            dict: The habit dictionary.
+        """
+        return self._cached_dict_and_json()[0]
+
+    def _cached_dict_and_json(self):
+        """Returns the cached dictionary and JSON text of the current version, building them if needed."""
+        cached = self._json_cache[0]
+        if cached is not None and cached[0] == self.version:
+            return cached[1], cached[2]
+        habit_dict = self.to_dict()
+        habit_json = json.dumps(habit_dict)
+        self._json_cache[0] = (self.version, habit_dict, habit_json)
+        return habit_dict, habit_json
+
+    @property
+    def dirty(self):
+        """
+        bool: True if the habit was changed since its JSON was built the last time.
+        """
+        cached = self._json_cache[0]
+        return cached is None or cached[0] != self.version
+
+    def _touch(self):
+        """Marks the habit as changed."""
+        self.version += 1
+
+    @property
+    def logs(self):
+        """
+        list[str]: The dates the habit was performed in 'YYYY-MM-DD' format, oldest first.
+
+        The list is built on every access and changing it doesn't change the habit.
+        """
+        return [date.fromordinal(day).isoformat() for day in self._days]
+
+    @property
+    def log_days(self):
+        """
+        array: The dates the habit was performed as sorted day ordinals. Must not be changed.
+        """
+        return self._days
+
+    @property
+    def calendar(self):
+        """
+        CalendarIndex: Counts of the logs per month, week and date range, see calendarIndex.
+        """
+        if self._calendar is None:
+            self._calendar = CalendarIndex(self._days)
+        return self._calendar
+
+    @property
+    def adherence(self):
+        """
+        RollingAdherence: Completion rates over the last 7, 30, 90 and 365 days, see rollingAdherence.
+        """
+        if self._adherence is None:
+            self._adherence = RollingAdherence(self._days, self.rule)
+        return self._adherence
+
+    def is_logged(self, day):
+        """
+        Checks if the habit was performed on a day.
+
+        Parameters:
+            day (int): The day ordinal.
+
+        Returns:
+            bool: True if the day is logged.
+        """
+        index = bisect_left(self._days, day)
+        return index < len(self._days) and self._days[index] == day
+
+    def snapshot(self):
+        """
+        Creates a copy of the habit that is not affected by later changes to this habit.
+
+        Returns:
+            Habit: The copy of the habit.
+        """
+        habit_copy = copy.copy(self)
+        habit_copy._days = array('i', self._days)
+        if self._runs is not None:
+            habit_copy._runs = array('i', self._runs)
+        # The index refers to the days of this habit, the copy builds its own when needed.
+        habit_copy._calendar = None
+        habit_copy._adherence = None
+        return habit_copy
+
     def calculate_next_due_date(self):
         """
         Calculates the next due date for the habit based on the last performed date and its frequency.
 
-        This method uses the Analyzer class to determine the next due date. It takes into account
+        This method uses the compiled frequency rule to determine the next due date. It takes into account
         the habit's current frequency and the date it was last performed. 
 
         Returns:
             datetime.date: The calculated next due date for the habit.
         """
 
-        return Analyzer.next_habit_due(self.get_last_performed(), self.frequency)
+        return date.fromordinal(self.rule.next_due(self._days[-1])).isoformat()
 
     def get_last_performed(self):
         """
@@ -75,34 +218,117 @@ class Habit:
             str: The date of the last performance of the habit.
         """
 
-        return self.logs[-1]
+        return date.fromordinal(self._days[-1]).isoformat()
 
     def calculate_streak(self):
         """
         Calculates the current streak of habit performance.
 
         This method computes the number of consecutive times the habit has been performed according to 
-        the defined frequency. The streak is calculated based on the dates logged in 'self.logs', starting from 
+        the defined frequency. The streak is calculated based on the logged dates, starting from 
         the most recent log entry and moving backwards in time. If the dates meet the frequency criteria 
-        (as determined by the Analyzer's 'verify_frequency_in_range' method), the streak count increases.
+        (as determined by the compiled frequency rule, see frequencyRules), the streak count increases.
 
         Returns:
             int: The number of times the habit has been consecutively performed as per its frequency.
         """
 
-        if len(self.logs) < 2:
+        days = self._days
+        if len(days) < 2:
             return 1
         else:
             streak = 1
-            for i in reversed(range(len(self.logs)-1)):
+            for i in reversed(range(len(days)-1)):
 
-                if Analyzer.verify_frequency_in_range(datetime.strptime(self.logs[i+1], '%Y-%m-%d'),
-                                                      datetime.strptime(self.logs[i], '%Y-%m-%d'), self.frequency):
+                if self._in_range(days[i], days[i+1]):
                     streak += 1
                 else:
                     break
             return streak
 
+    def _in_range(self, prev_day, curr_day):
+        """
+        Checks if two day ordinals are close enough to continue a streak.
+
+        Parameters:
+            prev_day (int): The earlier day ordinal.
+            curr_day (int): The later day ordinal.
+
+        Returns:
+            bool: True if the days fit the frequency of the habit.
+        """
+        return self.rule.in_range(prev_day, curr_day)
+
+    def _build_runs(self):
+        """
+        Computes the streak length at every log entry in one forward pass.
+        """
+        days = self._days
+        runs = array('i', [1]) * len(days)
+        for i in range(1, len(days)):
+            if self._in_range(days[i-1], days[i]):
+                runs[i] = runs[i-1] + 1
+        self._runs = runs
+        self._longest_streak = max(runs)
+        self._times_broken = runs.count(1) - 1
+
+    @property
+    def longest_streak(self):
+        """int: The longest streak the habit ever had."""
+        if self._runs is None:
+            self._build_runs()
+        return self._longest_streak
+
+    @property
+    def times_broken(self):
+        """int: How often a streak of the habit was broken."""
+        if self._runs is None:
+            self._build_runs()
+        return self._times_broken
+
+    def _insert_day(self, day):
+        """
+        Adds a day to the logs and updates the streaks.
+
+        Appending a day after the last entry only looks at the last pair of days. A back-dated day
+        recalculates the streak lengths from the inserted day on, until they match the old ones again.
+
+        Parameters:
+            day (int): The day ordinal. Must not be logged yet.
+        """
+        days = self._days
+        index = bisect_left(days, day)
+        days.insert(index, day)
+        if self._calendar is not None:
+            self._calendar.add(day)
+        if self._adherence is not None:
+            self._adherence.add(day)
+
+        if index == len(days) - 1:
+            run = self._current_run + 1 if index and self._in_range(days[index-1], day) else 1
+            self._current_run = run
+            if self._runs is not None:
+                self._runs.append(run)
+                self._longest_streak = max(self._longest_streak, run)
+                self._times_broken += run == 1 and index > 0
+        elif self._runs is None:
+            self._build_runs()
+            self._current_run = self._runs[-1]
+        else:
+            runs = self._runs
+            runs.insert(index, 0)
+            for i in range(index, len(days)):
+                run = runs[i-1] + 1 if i and self._in_range(days[i-1], days[i]) else 1
+                # Behind the two changed pairs the streaks stay the same as soon as one matches again.
+                if i > index + 1 and run == runs[i]:
+                    break
+                self._times_broken += (run == 1 and i > 0) - (runs[i] == 1 and i > index and i > 1)
+                runs[i] = run
+            self._longest_streak = max(runs)
+            self._current_run = runs[-1]
+
+        self.streak = self._current_run
+
     def perform_habit_today(self):
         """
         Logs the habit as performed for the current day or a specified date and updates the streak count.
@@ -119,28 +345,28 @@ class Habit:
         """
 
         logging.debug("habit.perform_habit_today called")
-        today = datetime.now()
-        today_str = today.strftime("%Y-%m-%d")
-        self.calculate_streak()
-        if today_str not in self.logs:
+        today = date.today()
+        today_str = today.isoformat()
+        if not self.is_logged(today.toordinal()):
             if self.strict:
                 logging.debug("Strict ist set.")
                 if self.next_due_date != today_str:
                     logging.debug("Date is not right. Skipping the adding.")
                     return False, "Strict option is set. Today is not the right day to log this activity."
-            self.logs.append(today_str)
-            self.streak += 1
-            self.next_due_date = Analyzer.next_habit_due(today_str, self.frequency)
+            self._insert_day(today.toordinal())
+            self.next_due_date = date.fromordinal(self.rule.next_due(today.toordinal())).isoformat()
+            self._touch()
             return True, ""
         else:
             logging.debug("Date is allready logged so we will skip it")
             return False, "This activity was allready logged today."
 
     def perform_habit_on_date(self, date):
-        """Logs the habit for a specific date and sorts the logs list"""
-        if date not in self.logs:
-            self.logs.append(date)
-            self.logs.sort()  # Sort the logs to maintain order
+        """Logs the habit for a specific date in 'YYYY-MM-DD' format, keeping the logs in order"""
+        day = date_to_ordinal(date)
+        if not self.is_logged(day):
+            self._insert_day(day)
+            self._touch()
 
     def edit_habit(self, new_name=None, new_goal=None, new_frequency=None):
         """Edits the habit's name, goal, or frequency"""
@@ -148,8 +374,33 @@ class Habit:
             self.name = new_name
         if new_goal:
             self.goal = new_goal
-        if new_frequency:
+        if new_frequency and new_frequency != self.frequency:
             self.frequency = new_frequency
+            self.rule = compile_frequency(new_frequency)
+            self._adherence = None
+            # The streaks depend on the frequency and need to be calculated again.
+            self._current_run = self.calculate_streak()
+            self.streak = self._current_run
+            self._runs = None
+        self._touch()
+
+    def is_overdue(self, today=None):
+        """
+        Checks whether the next due date has passed.
+
+        Parameters:
+            today (int, optional): The day ordinal of today. Defaults to today.
+
+        Returns:
+            bool: True if the habit is overdue.
+        """
+        return date_to_ordinal(self.next_due_date) < (today or date.today().toordinal())
+
+    def reset_streak(self):
+        """Sets the current streak back to zero, e.g. when the habit is overdue"""
+        if self.streak != 0:
+            self.streak = 0
+            self._touch()
 
     def display_info(self):
         """Displays habit information"""
@@ -158,3 +409,39 @@ class Habit:
         print(f"Frequency: {self.frequency}")
         print(f"Start Date: {self.start_date}")
         print(f"Current Streak: {self.streak} days")
+
+
+def date_to_ordinal(date_str):
+    """
+    Converts a date in 'YYYY-MM-DD' format to its day ordinal.
+
+    Parameters:
+        date_str (str): The date.
+
+    Returns:
+        int: The proleptic Gregorian ordinal of the date, see date.toordinal().
+    """
+    return date.fromisoformat(date_str).toordinal()
+
+
+def reset_overdue_streaks(habits, today=None):
+    """
+    Sets the current streak of all overdue habits to zero.
+
+    This runs before the habits are shown, so showing them never changes anything. Saving the changed
+    habits is up to the caller, in one write for all of them.
+
+    Parameters:
+        habits (list[Habit]): The habits to check.
+        today (int, optional): The day ordinal of today. Defaults to today.
+
+    Returns:
+        list[Habit]: The habits whose streak was reset.
+    """
+    today = today or date.today().toordinal()
+    reset = [habit for habit in habits if habit.streak != 0 and habit.is_overdue(today)]
+    for habit in reset:
+        habit.reset_streak()
+    if reset:
+        logging.info(f"Reset the streak of {len(reset)} overdue habits.")
+    return reset
@@ -0,0 +1,183 @@
+from rollingAdherence import WINDOWS
+
+# The columns of the main list. The completion rates over the last days follow the streak, see rollingAdherence.
+COLUMNS = ["Habit", "Frequency", "Start Date", "Last Date", "Next Due Date", "Days until Due", "Streak"] + \
+          [f"{window} Days" for window in WINDOWS]
+
+
+def habit_row(habit, days_until_due):
+    """
+    Formats the columns of a habit for the main list.
+
+    Parameters:
+        habit (Habit): The habit.
+        days_until_due (int): Number of days until the habit is due, negative if it is overdue.
+
+    Returns:
+        tuple[str]: The text of every column.
+    """
+    # An overdue habit has no current streak.
+    streak = 0 if days_until_due < 0 else habit.streak
+    # The rates are kept up to date by the habit, so they don't need a scan of the logs.
+    # Windows shorter than the frequency, e.g. 7 days of a monthly habit, have no rate.
+    rates = habit.adherence.rates()
+    return (habit.name, habit.frequency, habit.start_date, habit.get_last_performed(), habit.next_due_date,
+            str(days_until_due), str(streak)) + \
+        tuple("n/a" if rates[window] is None else f"{rates[window]:.0f}%" for window in WINDOWS)
+
+
+class HabitRowModel:
+    """
+    The formatted rows of the main list.
+
+    The list only asks for the text of the visible cells, so the rows are formatted once per change
+    instead of on every paint. The longest text of every column is tracked with the rows, so the
+    columns can be sized once per refresh without measuring every cell.
+
+    Attributes:
+        columns (list[str]): The column headings.
+        rows (list[tuple[str]]): The text of every cell, row by row.
+        habit_indices (list[int]): The index of the habit of every row in Orchestrator.habits.
+    """
+
+    def __init__(self, columns=COLUMNS):
+        """
+        Initializes an empty model.
+
+        Parameters:
+            columns (list[str], optional): The column headings. Defaults to COLUMNS.
+        """
+        self.columns = list(columns)
+        self.rows = []
+        self.habit_indices = []
+        self._widest = list(self.columns)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def set_rows(self, rows, habit_indices):
+        """
+        Replaces all rows.
+
+        Parameters:
+            rows (list[tuple[str]]): The text of every cell, row by row.
+            habit_indices (list[int]): The index of the habit of every row.
+        """
+        self.rows = list(rows)
+        self.habit_indices = list(habit_indices)
+        self._widest = [max([heading] + [row[column] for row in self.rows], key=len)
+                        for column, heading in enumerate(self.columns)]
+
+    def set_row(self, row, values):
+        """
+        Replaces the text of one row.
+
+        Parameters:
+            row (int): The row.
+            values (tuple[str]): The text of every cell.
+        """
+        old_values = self.rows[row]
+        self.rows[row] = values
+        for column, text in enumerate(values):
+            if len(text) > len(self._widest[column]):
+                self._widest[column] = text
+            elif old_values[column] == self._widest[column] and len(text) < len(old_values[column]):
+                # The widest text got shorter, only this column is measured again.
+                self._widest[column] = max([self.columns[column]] + [cells[column] for cells in self.rows], key=len)
+
+    def append_row(self, values, habit_index):
+        """
+        Adds a row at the end.
+
+        Parameters:
+            values (tuple[str]): The text of every cell.
+            habit_index (int): The index of the habit of the row.
+        """
+        self.rows.append(values)
+        self.habit_indices.append(habit_index)
+        for column, text in enumerate(values):
+            if len(text) > len(self._widest[column]):
+                self._widest[column] = text
+
+    def remove_row(self, row):
+        """
+        Removes a row.
+
+        Parameters:
+            row (int): The row.
+        """
+        old_values = self.rows.pop(row)
+        del self.habit_indices[row]
+        for column, text in enumerate(old_values):
+            if text == self._widest[column]:
+                self._widest[column] = max([self.columns[column]] + [cells[column] for cells in self.rows], key=len)
+
+    def remove_habit(self, habit_index):
+        """
+        Removes the row of a deleted habit and moves the indices of the following habits up.
+
+        Parameters:
+            habit_index (int): The index the deleted habit had.
+
+        Returns:
+            int: The removed row, or -1 if the habit wasn't shown.
+        """
+        row = self.row_of(habit_index)
+        if row != -1:
+            self.remove_row(row)
+        self.habit_indices = [index - 1 if index > habit_index else index for index in self.habit_indices]
+        return row
+
+    def row_of(self, habit_index):
+        """
+        Returns the row showing a habit.
+
+        Parameters:
+            habit_index (int): The index of the habit in Orchestrator.habits.
+
+        Returns:
+            int: The row, or -1 if the habit isn't shown.
+        """
+        try:
+            return self.habit_indices.index(habit_index)
+        except ValueError:
+            return -1
+
+    def text(self, row, column):
+        """
+        Returns the text of a cell.
+
+        Parameters:
+            row (int): The row.
+            column (int): The column.
+
+        Returns:
+            str: The text of the cell.
+        """
+        return self.rows[row][column]
+
+    def widest(self, column):
+        """
+        Returns the longest text of a column, including the heading.
+
+        Parameters:
+            column (int): The column.
+
+        Returns:
+            str: The longest text.
+        """
+        return self._widest[column]
+
+    def habit_index(self, row):
+        """
+        Returns the index of the habit shown in a row.
+
+        Parameters:
+            row (int): The row, e.g. the selection of the list.
+
+        Returns:
+            int: The index of the habit in Orchestrator.habits, or -1 if the row doesn't exist.
+        """
+        if 0 <= row < len(self.habit_indices):
+            return self.habit_indices[row]
+        return -1
@@ -0,0 +1,241 @@
+import json
+import os
+import logging
+from habit import Habit
+
+
+class JournalSaveFileManager:
+    """
+    A save file manager that appends every habit change to a journal instead of rewriting the savefile.
+
+    The data lives in two files next to the savefile path: a snapshot holding the full data and a
+    journal with one small JSON record per change. On startup the snapshot is loaded and only the
+    journal records written after it are replayed. Once enough records have piled up, the journal is
+    folded into a new snapshot and truncated.
+
+    If no snapshot exists yet, the regular JSON savefile is used as the starting point, so an existing
+    savefile is picked up automatically.
+
+    Attributes:
+        savefile_path (str): The JSON savefile used to seed the first snapshot.
+        snapshot_path (str): The path of the snapshot file.
+        journal_path (str): The path of the journal file.
+        compact_every (int): Number of journal records after which the journal is compacted.
+    """
+
+    def __init__(self, savefile_path="habithero_savefile.json", compact_every=500):
+        """
+        Initializes the JournalSaveFileManager and restores the data from the snapshot and the journal.
+
+        Parameters:
+            savefile_path (str, optional): The JSON savefile. Defaults to "habithero_savefile.json".
+            compact_every (int, optional): Number of records after which the journal is compacted. Defaults to 500.
+        """
+        self.savefile_path = savefile_path
+        base_path = os.path.splitext(savefile_path)[0]
+        self.snapshot_path = base_path + ".snapshot.json"
+        self.journal_path = base_path + ".journal"
+        self.compact_every = compact_every
+
+        self._data = {}
+        self._seq = 0
+        self._records_since_snapshot = 0
+        self._restore()
+
+    def _restore(self):
+        """
+        Internal helper that loads the snapshot and replays the tail of the journal.
+        """
+        snapshot_seq = 0
+        try:
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r") as f:
+                    snapshot = json.load(f)
+                self._data = snapshot["users"]
+                snapshot_seq = snapshot["seq"]
+            elif os.path.exists(self.savefile_path):
+                with open(self.savefile_path, "r") as f:
+                    self._data = json.load(f)
+                logging.info(f"Seeded journal snapshot from {self.savefile_path}")
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            logging.error(f"Error reading snapshot {self.snapshot_path}: {str(e)}")
+            self._data = {}
+
+        self._seq = snapshot_seq
+        if not os.path.exists(self.journal_path):
+            return
+
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn line can only be the last one and stems from an interrupted write.
+                        logging.warning(f"Skipping unreadable record in journal {self.journal_path}.")
+                        continue
+                    # Records up to the snapshot seq are already contained in the snapshot.
+                    if record["seq"] <= snapshot_seq:
+                        continue
+                    _apply_record(self._data, record)
+                    self._seq = record["seq"]
+                    self._records_since_snapshot += 1
+        except OSError as e:
+            logging.error(f"Error reading journal {self.journal_path}: {str(e)}")
+
+        logging.info(f"Replayed {self._records_since_snapshot} journal records from {self.journal_path}")
+
+    def _append(self, record):
+        """
+        Internal helper that writes one record to the journal and applies it to the in memory data.
+
+        Parameters:
+            record (dict): The change record without sequence number.
+        """
+        record["seq"] = self._seq + 1
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._seq = record["seq"]
+        _apply_record(self._data, record)
+
+        self._records_since_snapshot += 1
+        if self._records_since_snapshot >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """
+        Folds the journal into a new snapshot and truncates the journal.
+
+        The snapshot is written to a temporary file first and then moved into place, so a crash never
+        leaves a half written snapshot behind. Records that are still in the journal after a crash are
+        skipped on the next start because of their sequence number.
+        """
+        try:
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump({"seq": self._seq, "users": self._data}, f)
+            os.replace(temp_path, self.snapshot_path)
+            open(self.journal_path, "w").close()
+            self._records_since_snapshot = 0
+            logging.info(f"Compacted journal into {self.snapshot_path}")
+        except Exception as e:
+            logging.error(f"Error while compacting journal {self.journal_path}: {str(e)}")
+
+    def append_change(self, user_name, action, index, habit=None):
+        """
+        Appends a single habit change of a user to the journal.
+
+        Parameters:
+            user_name (str): Name of the user.
+            action (str): One of "performed", "created", "edited" or "deleted".
+            index (int): The index of the habit in the habit list of the user.
+            habit (Habit, optional): The changed habit. Not needed for "deleted".
+
+        Raises:
+            ValueError: If the action is unknown.
+        """
+        if action == "performed":
+            record = {"op": "log", "user": user_name, "index": index, "date": habit.get_last_performed()}
+        elif action == "created":
+            record = {"op": "create", "user": user_name, "habit": habit.to_dict()}
+        elif action == "edited":
+            record = {"op": "edit", "user": user_name, "index": index,
+                      "fields": {"name": habit.name, "goal": habit.goal, "frequency": habit.frequency}}
+        elif action == "deleted":
+            record = {"op": "delete", "user": user_name, "index": index}
+        else:
+            raise ValueError(f"Unknown change action: {action}")
+
+        try:
+            self._append(record)
+            logging.info(f"Journaled {action} habit {index} for user {user_name}.")
+        except Exception as e:
+            logging.error(f"Error while journaling {action} for user {user_name}: {str(e)}")
+
+    def save_data(self, user_name, habits_list):
+        """
+        Saves the complete habit list of a user as one journal record.
+
+        Parameters:
+        - user_name (str): Name of the user.
+        - habits_list (list): List of Habit objects to be saved.
+        """
+        try:
+            self._append({"op": "replace", "user": user_name, "habits": [habit.saved_dict() for habit in habits_list]})
+            logging.info(f"Data for user {user_name} has been successfully saved.")
+        except Exception as e:
+            logging.error(f"Error while saving data for user {user_name}: {str(e)}")
+
+    def load_data(self, username):
+        """
+        Converts the habits of a user to Habit objects.
+
+        Parameters:
+            username (str): The name of the user whose data needs to be loaded.
+
+        Returns:
+            list: A list of Habit objects for the specified user, or an empty list if the user does not exist.
+        """
+        if username not in self._data:
+            logging.warning(f"User {username} not found in the data.")
+            return []
+
+        # The logs are copied so changes to the Habit objects only reach the data through the journal.
+        habits_obj_list = [Habit.from_dict(dict(habit_dict, logs=list(habit_dict.get("logs") or [])))
+                           for habit_dict in self._data[username]]
+        logging.info(f"Loaded data for user {username} successfully.")
+        return habits_obj_list
+
+    def get_all_users(self):
+        """
+        Retrieves all the usernames.
+
+        Returns:
+            list[str]: A list containing all the usernames.
+        """
+        return list(self._data.keys())
+
+    def user_exists(self, username):
+        """
+        Checks if a user exists.
+
+        Args:
+            username (str): The name of the user.
+
+        Returns:
+            bool: True if the user exists, False otherwise.
+        """
+        return username in self._data
+
+
+def _apply_record(data, record):
+    """
+    Applies a journal record to the savefile data.
+
+    Parameters:
+        data (dict): The savefile data mapping user names to lists of habit dictionaries.
+        record (dict): The journal record.
+    """
+    op = record["op"]
+    if op == "replace":
+        # The habits may be the cached dictionaries of Habit.saved_dict, which the later records
+        # must not change. They are copied together with their logs.
+        data[record["user"]] = [dict(habit, logs=list(habit.get("logs") or [])) for habit in record["habits"]]
+        return
+
+    habits = data.setdefault(record["user"], [])
+    if op == "log":
+        logs = habits[record["index"]].setdefault("logs", [])
+        if record["date"] not in logs:
+            logs.append(record["date"])
+            # Same ordering rule as the Habit class: logs stay sorted.
+            if len(logs) > 1 and logs[-2] > logs[-1]:
+                logs.sort()
+    elif op == "create":
+        habits.append(record["habit"])
+    elif op == "edit":
+        habits[record["index"]].update(record["fields"])
+    elif op == "delete":
+        del habits[record["index"]]
+    else:
+        logging.error(f"Unknown journal record {op}.")
@@ -1,8 +1,23 @@
 from MainMenuGUI import MainMenuGUIFrame
-from saveFileManager import SaveFileManager
-from habit import Habit
+from saveFileManager import create_save_file_manager
+from writeBehindSaver import WriteBehindSaver
+from analyzerCache import AnalyzerCache
+from crossUserStats import collect_cross_user_stats, iter_manager_habits
+from dueIndex import DueIndex, build_due_index
+from habit import Habit, reset_overdue_streaks
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 import wx
 import logging
+import argparse
+
+# The events sent to the listeners for the actions of update_data.
+HABIT_EVENTS = {
+    "performed": "changed",
+    "edited": "changed",
+    "created": "added",
+    "deleted": "removed"
+}
 
 
 class Orchestrator:
@@ -16,19 +31,66 @@ class Orchestrator:
     methods to manage habits and user data.
     """
 
-    def __init__(self):
+    def __init__(self, storage_format="json"):
         """
         Initializes the Orchestrator, setting up the list of habits, FileManager, and starting the GUI loop.
+
+        Parameters:
+            storage_format (str, optional): The storage format of the savefile, "json", "journal", "sqlite"
+                                            or "sharded". Defaults to "json".
         """
         logging.info("Initializing Orchestrator.")
         self.habits = []
-        self.SaveFileManager = SaveFileManager()
+        self.SaveFileManager = create_save_file_manager(storage_format)
         self.UserName = ""
+        # Analyzer results of the habits, reused as long as a habit doesn't change.
+        self.analyzer_cache = AnalyzerCache()
+        # Work that reads the whole savefile runs here instead of on the GUI thread.
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="habithero")
+        # Habits ordered by due date. The habits of the loaded user are always in it, the ones of
+        # all other users once the index was built from the savefile in the background.
+        self.due_index = DueIndex()
+        self.due_index_complete = False
+        self._due_index_build = None
+        # Users indexed from memory while the background build runs.
+        self._due_index_users = set()
+        # Callbacks notified about changes of single habits, see add_listener.
+        self.listeners = []
+
+        # Saving the whole user is moved off the GUI thread. Journaled formats only append small
+        # records, so they keep writing directly to preserve the order of the records.
+        if hasattr(self.SaveFileManager, "append_change"):
+            self.saver = None
+        else:
+            self.saver = WriteBehindSaver(self.SaveFileManager)
 
         # Launching the wx App to handle GUI operations
         self.app = wx.App(False)
         self.main_menu = MainMenuGUIFrame(None, "Habit Hero", self)
-        self.app.MainLoop()
+        self.add_listener(self.main_menu.on_habit_event)
+        try:
+            self.app.MainLoop()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Writes all pending data to disk. Called when the GUI loop ends.
+
+        Background work that already started is finished first, so it doesn't use the saver while it closes.
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.saver:
+            logging.info("Flushing pending saves.")
+            self.saver.close()
+            self.saver = None
+
+    def flush_pending_saves(self):
+        """
+        Writes the saves queued in the write-behind saver, so reading the savefile returns the latest data.
+        """
+        if self.saver:
+            self.saver.flush()
 
     def set_username(self, Username):
         """
@@ -49,8 +111,9 @@ class Orchestrator:
         """
 
         logging.info(f"Deleting habit at index {index}.")
+        self.due_index.remove((self.UserName, self.habits[index].uid))
         del self.habits[index]
-        self.update_data()
+        self.update_data("deleted", index)
 
     def get_users(self):
         """
@@ -61,6 +124,8 @@ class Orchestrator:
         """
 
         logging.info("Fetching all users.")
+        # A user that was just created may only be queued in the write-behind saver.
+        self.flush_pending_saves()
         return self.SaveFileManager.get_all_users()
 
     def create_new_user(self, user):
@@ -73,7 +138,9 @@ class Orchestrator:
 
         logging.info(f"Creating new user: {user}.")
         self.UserName = user
-        self.SaveFileManager.save_data(user, [])
+        self.habits = []
+        self.index_user_habits()
+        self.save_data()
 
     def load_user_data(self, user):
         """
@@ -84,18 +151,27 @@ class Orchestrator:
         """
         logging.debug("Called load_user_data")
         logging.info(f"Loading data for user: {user}.")
+        # Changes still queued in the write-behind saver would be missing from the loaded data.
+        self.flush_pending_saves()
         self.UserName = user
         self.habits = self.SaveFileManager.load_data(user)
+        self.index_user_habits()
         self.refresh_main_menu_list()
 
     def save_data(self):
         """
         Saves the current data of habits for the user.
+
+        If a background writer is running the data is only queued and written shortly after.
         """
         logging.info(f"Saving data for user: {self.UserName}.")
         try:
-            self.SaveFileManager.save_data(self.UserName, self.habits)
-            logging.info(f"Data saved successfully for user: {self.UserName}")
+            if self.saver:
+                self.saver.submit(self.UserName, self.habits)
+                logging.debug(f"Write-behind metrics: {self.saver.metrics()}")
+            else:
+                self.SaveFileManager.save_data(self.UserName, self.habits)
+                logging.info(f"Data saved successfully for user: {self.UserName}")
         except Exception as e:
             logging.error(f"Error occurred while saving data for user: {self.UserName}. Error: {str(e)}")
 
@@ -116,16 +192,22 @@ class Orchestrator:
         logging.info(f"Creating new habit: {name}. Goal: {goal}. Frequency: {frequency}. Start Date: {start_date}. Strict: {strict}.")
         new_habit = Habit(name=name, goal=goal, frequency=frequency, start_date=start_date, strict=strict)
         self.habits.append(new_habit)
-        self.update_data()
+        self.update_data("created", len(self.habits) - 1)
 
     def refresh_main_menu_list(self):
         """
-        Refreshes the ListCtrl in MainMenuGUI by deleting all entries and repopulating with data from self.habits.
+        Refreshes the list in MainMenuGUI with the data from self.habits.
         """
         logging.info("Refreshing main menu list.")
-        self.main_menu.data_view.DeleteAllItems()
-        for habit in self.habits:
-            self.main_menu.add_habit_to_data_view(habit)
+        # All overdue habits are reset before the list is shown and saved in one write.
+        if reset_overdue_streaks(self.habits):
+            self.save_data()
+        if self.main_menu.overdue_only():
+            overdue_ids = {habit.uid for habit in self.get_overdue_habits()}
+            rows = [index for index, habit in enumerate(self.habits) if habit.uid in overdue_ids]
+        else:
+            rows = list(range(len(self.habits)))
+        self.main_menu.show_habits(rows)
 
     def perform_habit_today(self, index):
         """
@@ -141,14 +223,203 @@ class Orchestrator:
         if not result:
             wx.MessageBox(errortext, "Warning", wx.OK | wx.ICON_WARNING)
         else:
-            self.update_data()
+            self.update_data("performed", index)
 
-    def update_data(self):
+    def habit_edited(self, habit):
         """
-        Saves the current data and refreshes the main menu list with updated habit information.
+        Saves an edited habit and updates its row in the main menu list.
+
+        Parameters:
+            habit (Habit): The habit that was edited.
         """
-        self.save_data()
-        self.refresh_main_menu_list()
+        self.update_data("edited", self.habits.index(habit))
+
+    def save_change(self, action, index):
+        """
+        Saves a single change of a habit.
+
+        Storage formats with a journal only append the change. All other formats save the whole habit list of the user.
+
+        Parameters:
+            action (str): One of "performed", "created", "edited" or "deleted".
+            index (int): The index of the changed habit.
+        """
+        if not hasattr(self.SaveFileManager, "append_change"):
+            self.save_data()
+            return
+
+        logging.info(f"Saving {action} habit {index} for user: {self.UserName}.")
+        habit = self.habits[index] if action != "deleted" else None
+        self.SaveFileManager.append_change(self.UserName, action, index, habit)
+
+    def update_data(self, action=None, index=None):
+        """
+        Saves the current data and updates the main menu list.
+
+        A change of a single habit is sent to the listeners as a "changed", "added" or "removed" event,
+        so only the row of the habit is updated. Without an action the whole list is refreshed.
+
+        Parameters:
+            action (str, optional): The change that caused the update. If given only this change is saved.
+            index (int, optional): The index of the changed habit.
+        """
+        if not action:
+            self.save_data()
+            self.refresh_main_menu_list()
+            return
+
+        if action != "deleted":
+            # E.g. a new frequency can make a habit overdue. The reset is saved with the change.
+            reset_overdue_streaks([self.habits[index]])
+        self.save_change(action, index)
+        if action != "deleted":
+            self.index_habit(self.habits[index])
+        self.notify(HABIT_EVENTS[action], index)
+
+    def add_listener(self, listener):
+        """
+        Registers a callback for changes of single habits.
+
+        Parameters:
+            listener (callable): Called with the event, "changed", "added" or "removed", and the index of the habit.
+                                 For "removed" the index is the one the habit had before it was deleted.
+        """
+        self.listeners.append(listener)
+
+    def notify(self, event, index):
+        """
+        Sends a change of a habit to all listeners.
+
+        Parameters:
+            event (str): One of "changed", "added" or "removed".
+            index (int): The index of the habit.
+        """
+        logging.debug(f"Habit {index} {event}.")
+        for listener in self.listeners:
+            listener(event, index)
+
+    def get_due_index(self):
+        """
+        Returns the index of the habits ordered by their next due date.
+
+        The habits of the loaded user are always in the index. The habits of the other users are added
+        once the background build started by the first user load has finished, see due_index_complete.
+
+        Returns:
+            DueIndex: The index of the habits.
+        """
+        return self.due_index
+
+    def start_due_index_build(self):
+        """
+        Builds the index of all users from the savefile in the background.
+
+        The finished index replaces the current one on the GUI thread, see on_due_index_built.
+        """
+        if self._due_index_build is not None:
+            return
+
+        # The saver is taken on the GUI thread, shutdown may reset the attribute while the build runs.
+        saver = self.saver
+
+        def build():
+            # Pending saves are written first, so the index includes the latest changes.
+            if saver:
+                saver.flush()
+            return build_due_index(iter_manager_habits(self.SaveFileManager))
+
+        self._due_index_users = {self.UserName}
+        self._due_index_build = self.executor.submit(build)
+        self._due_index_build.add_done_callback(lambda done: wx.CallAfter(self.on_due_index_built, done))
+
+    def on_due_index_built(self, future):
+        """
+        Takes over the index built in the background. Runs on the GUI thread.
+
+        The loaded user may have changed habits during the build, so their habits are indexed from memory again.
+
+        Parameters:
+            future (Future): The finished build.
+        """
+        self._due_index_build = None
+        try:
+            due_index = future.result()
+        except Exception as e:
+            logging.error(f"Error occurred while building the due index. Error: {str(e)}")
+            return
+        if len(self._due_index_users) > 1:
+            # Another user was loaded during the build, their last changes may be missing.
+            self.start_due_index_build()
+            return
+        self.due_index = due_index
+        self.due_index_complete = True
+        self.index_user_habits()
+
+    def index_habit(self, habit):
+        """
+        Adds a habit of the current user to the due index or moves it to its new due date.
+
+        Parameters:
+            habit (Habit): The habit.
+        """
+        self.due_index.update((self.UserName, habit.uid), habit.next_due_date, habit.name)
+
+    def index_user_habits(self):
+        """
+        Replaces the habits of the current user in the due index with the loaded habits.
+
+        Loaded habits are indexed under their id, so later changes find their entry. The first call
+        starts building the index of all other users in the background.
+        """
+        self.due_index.remove_user(self.UserName)
+        for habit in self.habits:
+            self.index_habit(habit)
+        if self._due_index_build is not None:
+            self._due_index_users.add(self.UserName)
+        elif not self.due_index_complete:
+            self.start_due_index_build()
+
+    def get_overdue_habits(self, min_days=0):
+        """
+        Returns the habits of the current user that are overdue.
+
+        Parameters:
+            min_days (int, optional): The number of days a habit has to be overdue at least. Defaults to 0.
+
+        Returns:
+            list[Habit]: The overdue habits, the longest overdue first.
+        """
+        habits_by_id = {habit.uid: habit for habit in self.habits}
+        overdue = self.due_index.overdue(date.today().toordinal(), min_days, user=self.UserName)
+        return [habits_by_id[entry.key[1]] for entry in overdue if entry.key[1] in habits_by_id]
+
+    def get_cross_user_stats(self, callback):
+        """
+        Collects the leaderboards and percentiles across all users in the background.
+
+        Pending saves are written first, so the statistics include the latest changes. The scan reads
+        every user of the savefile, so it runs in the executor and the GUI stays responsive.
+
+        Parameters:
+            callback (callable): Called on the GUI thread with the collected CrossUserStats.
+        """
+        saver = self.saver
+
+        def collect():
+            if saver:
+                saver.flush()
+            return collect_cross_user_stats(iter_manager_habits(self.SaveFileManager))
+
+        def deliver(future):
+            try:
+                stats = future.result()
+            except Exception as e:
+                logging.error(f"Error occurred while collecting the cross user statistics. Error: {str(e)}")
+                return
+            callback(stats)
+
+        future = self.executor.submit(collect)
+        future.add_done_callback(lambda done: wx.CallAfter(deliver, done))
 
     def get_habit_by_index(self, index):
         """
@@ -194,12 +465,17 @@ def set_up_logging():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Track your habits with Habit Hero.")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite", "sharded"],
+                        help="The storage format of the savefile, see create_save_file_manager.")
+    args = parser.parse_args()
+
     # Setting up logging ensures logs are captured from the very start
     set_up_logging()
 
-    # Launch the Orchestrator. Using a try-finally ensures that even if an error occurs,
-    # the logging system shuts down gracefully.
+    # Launch the Orchestrator. Pending saves are flushed by the Orchestrator when the GUI loop ends.
+    # Using a try-finally ensures that even if an error occurs, the logging system shuts down gracefully.
     try:
-        Orchestrator()
+        Orchestrator(storage_format=args.storage)
     finally:
         logging.shutdown()
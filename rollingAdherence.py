@@ -0,0 +1,158 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import date
+
+# The window sizes in days shown in the main list.
+WINDOWS = (7, 30, 90, 365)
+
+
+class RollingAdherence:
+    """
+    Completion rates of a habit over the last N days for several window sizes.
+
+    Every window keeps the logged days inside it in a deque. A new day is appended on the right
+    and days that fell out of the window are dropped on the left, so keeping the windows current
+    costs O(1) amortized per log entry or day. Only the days inside the biggest window are ever read.
+
+    The rate compares the performed entries with the number of expected ones, which are the due
+    occurrences of the frequency inside the window, e.g. 30 for Daily or the number of Sundays for
+    Weekly in 30 days, see FrequencyRule.expected_between. Windows shorter than the period of the
+    frequency have no rate.
+
+    The days are not copied. Whoever inserts a day into them has to call add() afterwards.
+
+    Attributes:
+        days (array): The sorted day ordinals of the habit, see Habit.log_days.
+        rule (FrequencyRule): The compiled frequency of the habit.
+        windows (tuple[int]): The window sizes in days.
+        today (int): The day ordinal the windows end on.
+    """
+
+    def __init__(self, days, rule, windows=WINDOWS, today=None):
+        """
+        Fills the windows with the days before today.
+
+        Parameters:
+            days (array): The sorted day ordinals of the habit.
+            rule (FrequencyRule): The compiled frequency of the habit.
+            windows (tuple[int], optional): The window sizes in days. Defaults to WINDOWS.
+            today (int, optional): The day ordinal the windows end on. Defaults to today.
+        """
+        self.days = days
+        self.rule = rule
+        self.windows = windows
+        self._build(today or date.today().toordinal())
+
+    def _build(self, today):
+        """
+        Fills the windows from the days, only looking at the days inside the biggest window.
+
+        Parameters:
+            today (int): The day ordinal the windows end on.
+        """
+        self.today = today
+        self._queues = {window: deque() for window in self.windows}
+        start = bisect_left(self.days, today - max(self.windows) + 1)
+        end = bisect_right(self.days, today)
+        for i in range(start, end):
+            self._append(self.days[i])
+
+    def _append(self, day):
+        """Appends a day to every window it falls into."""
+        for window, queue in self._queues.items():
+            if day > self.today - window:
+                queue.append(day)
+
+    def advance(self, today):
+        """
+        Moves the end of the windows to another day.
+
+        Moving forward appends the days up to the new end and drops the days that fell out of the windows.
+        Moving back fills the windows again.
+
+        Parameters:
+            today (int): The day ordinal the windows end on.
+        """
+        if today < self.today:
+            self._build(today)
+            return
+        if today == self.today:
+            return
+
+        start = bisect_right(self.days, self.today)
+        end = bisect_right(self.days, today)
+        self.today = today
+        for window, queue in self._queues.items():
+            while queue and queue[0] <= today - window:
+                queue.popleft()
+        for i in range(start, end):
+            self._append(self.days[i])
+
+    def add(self, day):
+        """
+        Counts a day that was just inserted into the days.
+
+        Days after the end of the windows, e.g. logged in advance, don't move the end. They are
+        picked up by advance() once the windows reach them.
+
+        Parameters:
+            day (int): The day ordinal.
+        """
+        if day > self.today:
+            return
+        if day <= self.today - max(self.windows):
+            # Too old to be in any window.
+            return
+
+        latest = self._queues[max(self.windows)]
+        if not latest or day >= latest[-1]:
+            self._append(day)
+        else:
+            # A back-dated day in the middle of a window. Rare, the windows are filled again.
+            self._build(self.today)
+
+    def performed(self, window):
+        """
+        Returns the number of log entries in a window.
+
+        Parameters:
+            window (int): The window size in days.
+
+        Returns:
+            int: The number of entries in the last `window` days.
+        """
+        return len(self._queues[window])
+
+    def rate(self, window, today=None):
+        """
+        Calculates the completion rate of a window.
+
+        Parameters:
+            window (int): The window size in days.
+            today (int, optional): The day ordinal the window ends on. Defaults to today.
+
+        Returns:
+            float or None: The completion rate as a percentage between 0 and 100, or None if the
+                           window is shorter than the period of the frequency.
+        """
+        self.advance(today or date.today().toordinal())
+        if window < self.rule.period:
+            return None
+        expected = self.rule.expected_between(self.today - window + 1, self.today)
+        if expected == 0:
+            return None
+        return min(self.performed(window) / expected, 1.0) * 100
+
+    def rates(self, today=None):
+        """
+        Calculates the completion rates of all windows.
+
+        Parameters:
+            today (int, optional): The day ordinal the windows end on. Defaults to today.
+
+        Returns:
+            dict: Mapping of the window sizes to the completion rates in percent, None for windows
+                  shorter than the period of the frequency.
+        """
+        today = today or date.today().toordinal()
+        return {window: self.rate(window, today) for window in self.windows}
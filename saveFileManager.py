@@ -1,6 +1,7 @@
 import json
 import os
 from habit import Habit
+from savefileStreamReader import load_user_habits, iter_usernames
 import logging
 
 
@@ -12,8 +13,15 @@ class SaveFileManager:
     a JSON-formatted save file. It also provides utility methods to retrieve a list 
     of all users present in the save file and load the entire data for diagnostic purposes.
 
+    The parsed savefile is kept in memory and reused as long as the file on disk is unchanged.
+    A change is detected by comparing the modification time, size and inode of the file.
+    As long as nothing is cached, reading methods stream through the savefile and only parse
+    the data they need instead of the whole file.
+
     Attributes:
         savefile_path (str): The path to the file where user habit data is saved.
+        cache_hits (int): Number of times the parsed savefile could be reused.
+        cache_misses (int): Number of times the savefile had to be read from disk.
     """
 
     def __init__(self, savefile_path="habithero_savefile.json"):
@@ -27,6 +35,14 @@ class SaveFileManager:
         """
         self.savefile_path = savefile_path
 
+        # Parsed savefile together with the file signature it was read with.
+        self._cache_data = None
+        self._cache_signature = None
+        # JSON text of every user as it is stored in the cached data.
+        self._user_json = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
         # Check for the existence of the savefile.
         # If it's not present, initialize an empty savefile to prevent issues during future operations.
         if not os.path.exists(self.savefile_path):
@@ -56,19 +72,37 @@ class SaveFileManager:
             # Load existing data to merge or overwrite
             data = self._load_all_data()
 
-            # Convert habits to dictionary format for uniformity in saved data
-            habits_dict_list = [habit.to_dict() for habit in habits_list]
+            # Convert habits to dictionary format for uniformity in saved data.
+            # Unchanged habits reuse the dictionary their cached JSON was built from.
+            habits_dict_list = [habit.saved_dict() for habit in habits_list]
 
             # Overwriting or adding new user data
             data[user_name] = habits_dict_list
 
-            # Committing user data to file, choosing to overwrite for simplicity and avoiding partial updates
-            with open(self.savefile_path, "w") as f:
-                json.dump(data, f)
+            # Only changed habits are serialized again, the others reuse their cached JSON.
+            # The JSON of all other users is reused as well.
+            self._user_json[user_name] = "[" + ", ".join(habit.to_json() for habit in habits_list) + "]"
+
+            # Committing user data to file, choosing to overwrite for simplicity.
+            # Writing to a temporary file first and moving it into place avoids partial updates.
+            temp_path = self.savefile_path + ".tmp"
+            with open(temp_path, "w") as f:
+                f.write("{")
+                for index, (name, user_habits) in enumerate(data.items()):
+                    if index:
+                        f.write(", ")
+                    f.write(json.dumps(name) + ": " + self._get_user_json(name, user_habits))
+                f.write("}")
+            os.replace(temp_path, self.savefile_path)
+
+            # The data we just wrote is the new content of the file, no need to read it again.
+            self._cache_data = data
+            self._cache_signature = self._file_signature()
 
             logging.info(f"Data for user {user_name} has been successfully saved.")
 
         except Exception as e:
+            self.clear_cache()
             logging.error(f"Error while saving data for user {user_name}: {str(e)}")
 
     def load_data(self, username):
@@ -83,20 +117,25 @@ class SaveFileManager:
         """
         try:
             logging.debug("load_data Called")
-            data = self._load_all_data()
-            logging.debug("All data loaded")
+            data = self._get_cached_data()
+            if data is not None:
+                habits_dict_list = data.get(username)
+            else:
+                # Only the requested user is parsed. The rest of the file is skipped.
+                habits_dict_list = load_user_habits(self.savefile_path, username)
+            logging.debug("User data loaded")
 
-            if username in data:
+            if habits_dict_list is not None:
                 logging.debug("Username was found")
-                habits_dict_list = data[username]
-                logging.debug("Habits where found")
 
                 # Debugging; might be removed after ensuring data integrity
                 for habit_dict in habits_dict_list:
                     logging.debug(f"Loaded habit data: {habit_dict}")
 
-                # Convert each habit dictionary back to its object form
-                habits_obj_list = [Habit.from_dict(habit_dict) for habit_dict in habits_dict_list]
+                # Convert each habit dictionary back to its object form.
+                # The logs are copied so the Habit objects don't change the cached data.
+                habits_obj_list = [Habit.from_dict(dict(habit_dict, logs=list(habit_dict.get("logs") or [])))
+                                   for habit_dict in habits_dict_list]
                 logging.info(f"Loaded data for user {username} successfully.")
 
                 return habits_obj_list
@@ -118,10 +157,10 @@ class SaveFileManager:
             list[str]: A list containing all the usernames, or an empty list if the savefile is empty or an error occurs.
         """
         try:
-            data = self._load_all_data()
+            data = self._get_cached_data()
 
-            # Extracting the usernames (keys) from the loaded data
-            users = list(data.keys())
+            # Extracting the usernames (keys) from the loaded data or from the file without parsing the habits
+            users = list(data.keys()) if data is not None else list(iter_usernames(self.savefile_path))
             logging.info(f"Retrieved {len(users)} users from the savefile.")
 
             return users
@@ -129,16 +168,82 @@ class SaveFileManager:
             logging.error(f"Error while retrieving user list: {str(e)}")
             return []  # Return an empty list on error
 
+    def _file_signature(self):
+        """
+        Internal helper that identifies the current version of the savefile on disk.
+
+        Returns:
+            tuple: The modification time in nanoseconds, the size and the inode of the savefile.
+
+        Raises:
+            FileNotFoundError: If the savefile doesn't exist.
+        """
+        stat = os.stat(self.savefile_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def clear_cache(self):
+        """
+        Drops the parsed savefile, so the next access reads it from disk again.
+        """
+        self._cache_data = None
+        self._cache_signature = None
+        self._user_json = {}
+
+    def _get_user_json(self, user_name, habits_dict_list):
+        """
+        Internal helper that returns the JSON text of a user, serializing it only once.
+
+        Parameters:
+            user_name (str): Name of the user.
+            habits_dict_list (list[dict]): The habits of the user as stored in the cached data.
+
+        Returns:
+            str: The habit list of the user as JSON.
+        """
+        user_json = self._user_json.get(user_name)
+        if user_json is None:
+            user_json = json.dumps(habits_dict_list)
+            self._user_json[user_name] = user_json
+        return user_json
+
+    def _get_cached_data(self):
+        """
+        Internal helper that returns the cached savefile if it is still up to date.
+
+        Returns:
+            dict or None: The cached data, or None if nothing is cached or the savefile changed on disk.
+        """
+        try:
+            if self._cache_data is not None and self._file_signature() == self._cache_signature:
+                self.cache_hits += 1
+                return self._cache_data
+        except OSError:
+            pass
+        self.cache_misses += 1
+        return None
+
     def _load_all_data(self):
         """
         Internal helper function to load the entire savefile.
 
+        The parsed data is cached. It is only read again if the savefile was changed on disk.
+        The returned dictionary is the cached object and must only be changed if the change is saved right after.
+
         Returns:
             dict: The data from the savefile if loaded successfully, or an empty dictionary on error.
         """
+        cached_data = self._get_cached_data()
+        if cached_data is not None:
+            return cached_data
+
         try:
+            signature = self._file_signature()
             with open(self.savefile_path, "r") as f:
-                return json.load(f)
+                data = json.load(f)
+            self._user_json = {}
+            self._cache_data = data
+            self._cache_signature = signature
+            return data
         except FileNotFoundError:
             # Since we creat the savefile while initiaing the class this should occure unles the user delets the savefile.
             logging.warning(f"Savefile {self.savefile_path} not found. An empty dictionary will be returned.")
@@ -161,8 +266,48 @@ class SaveFileManager:
         Returns:
             bool: True if the user exists, False otherwise.
         """
-        data = self._load_all_data()
-        if username in data:
-            return True
-        else:
+        try:
+            data = self._get_cached_data()
+            if data is not None:
+                return username in data
+            return username in iter_usernames(self.savefile_path)
+        except Exception as e:
+            logging.error(f"Error while checking for user {username}: {str(e)}")
             return False
+
+
+def create_save_file_manager(storage_format="json", savefile_path=None):
+    """
+    Creates the save file manager for the requested storage format.
+
+    All managers share the same public methods (save_data, load_data, get_all_users and user_exists),
+    so the rest of the application does not need to know which format is used.
+
+    Parameters:
+        storage_format (str, optional): "json" for the single JSON savefile, "journal" for the JSON savefile with
+                                        an append-only change journal, "sqlite" for the SQLite database or
+                                        "sharded" for a directory with one file per user. Defaults to "json".
+        savefile_path (str, optional): The path of the savefile or directory.
+                                       Defaults to the default path of the chosen format.
+
+    Returns:
+        The save file manager for the chosen format.
+
+    Raises:
+        ValueError: If the storage format is unknown.
+    """
+    if storage_format == "json":
+        return SaveFileManager(savefile_path or "habithero_savefile.json")
+    elif storage_format == "journal":
+        from journalSaveFileManager import JournalSaveFileManager
+        return JournalSaveFileManager(savefile_path or "habithero_savefile.json")
+    elif storage_format == "sqlite":
+        # Imported here to avoid loading sqlite3 when it's not needed.
+        from sqliteSaveFileManager import SQLiteSaveFileManager
+        return SQLiteSaveFileManager(savefile_path or "habithero_savefile.db")
+    elif storage_format == "sharded":
+        from shardedSaveFileManager import ShardedSaveFileManager
+        return ShardedSaveFileManager(savefile_path or "habithero_users")
+    else:
+        logging.error(f"Unknown storage format {storage_format}.")
+        raise ValueError(f"Unknown storage format: {storage_format}")
@@ -0,0 +1,214 @@
+import json
+import logging
+import mmap
+import re
+
+# Whitespace between JSON tokens.
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+# A complete JSON string including the quotes.
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# Everything up to the next bracket or brace that is not part of a string.
+_FILLER = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.S)
+# Numbers, true, false and null.
+_SCALAR = re.compile(rb'[^,\]}\s]+')
+
+
+def iter_user_spans(savefile_path):
+    """
+    Scans the top level object of a savefile and yields the position of every user entry.
+
+    The values are skipped on byte level without creating Python objects for them, so
+    scanning a savefile costs almost no memory no matter how big it is.
+
+    Parameters:
+        savefile_path (str): The path of the JSON savefile.
+
+    Yields:
+        tuple: The username, the buffer of the file and the start and end offset of the users value.
+
+    Raises:
+        ValueError: If the savefile is not a JSON object.
+    """
+    with open(savefile_path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be mapped and contains no users.
+            return
+
+        try:
+            brackets = _BracketFinder(buffer)
+            pos = _WHITESPACE.match(buffer, 0).end()
+            if buffer[pos:pos + 1] != b"{":
+                raise ValueError("Savefile doesn't contain a JSON object.")
+            pos = _WHITESPACE.match(buffer, pos + 1).end()
+            if buffer[pos:pos + 1] == b"}":
+                return
+
+            while True:
+                key_match = _STRING.match(buffer, pos)
+                if key_match is None:
+                    raise ValueError(f"Expected a username at offset {pos}.")
+                username = json.loads(key_match.group())
+
+                pos = _WHITESPACE.match(buffer, key_match.end()).end()
+                if buffer[pos:pos + 1] != b":":
+                    raise ValueError(f"Expected ':' at offset {pos}.")
+                start = _WHITESPACE.match(buffer, pos + 1).end()
+                end = _skip_value(buffer, start, brackets)
+
+                yield username, buffer, start, end
+
+                pos = _WHITESPACE.match(buffer, end).end()
+                separator = buffer[pos:pos + 1]
+                if separator == b"}":
+                    return
+                if separator != b",":
+                    raise ValueError(f"Expected ',' or '}}' at offset {pos}.")
+                pos = _WHITESPACE.match(buffer, pos + 1).end()
+        finally:
+            buffer.close()
+
+
+class _BracketFinder:
+    """
+    Finds the next bracket or brace in a buffer, no matter if it is part of a string or not.
+
+    A regex search for the four characters walks the buffer byte by byte, while find() for a single
+    character is a fast memory scan. The next position of every character is remembered, so each
+    character is only searched again once the scan has moved past it and the whole buffer is scanned
+    at most once per character.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.size = len(buffer)
+        self.next_positions = {b"[": -1, b"]": -1, b"{": -1, b"}": -1}
+
+    def find(self, pos):
+        """
+        Returns the offset of the next bracket or brace at or after pos, or -1 if there is none.
+        """
+        nearest = self.size
+        for char, char_pos in self.next_positions.items():
+            if char_pos < pos:
+                char_pos = self.buffer.find(char, pos)
+                if char_pos == -1:
+                    char_pos = self.size
+                self.next_positions[char] = char_pos
+            nearest = min(nearest, char_pos)
+        return nearest if nearest < self.size else -1
+
+
+def _skip_value(buffer, pos, brackets):
+    """
+    Finds the end of the JSON value starting at the given position.
+
+    Parameters:
+        buffer (mmap.mmap): The savefile content.
+        pos (int): The offset of the first character of the value.
+        brackets (_BracketFinder): The bracket finder of the buffer.
+
+    Returns:
+        int: The offset right behind the value.
+
+    Raises:
+        ValueError: If the value is not valid or the file ends in the middle of it.
+    """
+    first = buffer[pos:pos + 1]
+    if first == b'"':
+        match = _STRING.match(buffer, pos)
+        if match is None:
+            raise ValueError(f"Unterminated string at offset {pos}.")
+        return match.end()
+
+    if first not in (b"[", b"{"):
+        match = _SCALAR.match(buffer, pos)
+        if match is None:
+            raise ValueError(f"Expected a value at offset {pos}.")
+        return match.end()
+
+    # Containers: only brackets and braces outside of strings change the depth.
+    # Everything between two brackets is skipped in one go. Whether a bracket is part of a string is
+    # decided by counting the quotes in front of it, which only works if there are no escaped characters.
+    # Segments with escapes are rare and fall back to the slower regex that understands strings.
+    depth = 0
+    while True:
+        bracket_pos = brackets.find(pos)
+        if bracket_pos == -1:
+            raise ValueError("Savefile ended in the middle of a value.")
+
+        segment = buffer[pos:bracket_pos]
+        if b"\\" in segment:
+            pos = _FILLER.match(buffer, pos).end()
+            bracket_pos = pos
+            if buffer[pos:pos + 1] == b'"':
+                raise ValueError(f"Unterminated string at offset {pos}.")
+        elif segment.count(b'"') % 2:
+            # The bracket is inside a string. Continue behind the end of that string.
+            string_match = _STRING.match(buffer, buffer.rfind(b'"', pos, bracket_pos))
+            if string_match is None:
+                raise ValueError(f"Unterminated string at offset {bracket_pos}.")
+            pos = string_match.end()
+            continue
+
+        char = buffer[bracket_pos:bracket_pos + 1]
+        if char in (b"[", b"{"):
+            depth += 1
+        elif char in (b"]", b"}"):
+            depth -= 1
+            if depth == 0:
+                return bracket_pos + 1
+        else:
+            raise ValueError("Savefile ended in the middle of a value.")
+        pos = bracket_pos + 1
+
+
+def load_user_habits(savefile_path, username):
+    """
+    Reads the habit dictionaries of a single user from a savefile.
+
+    Only the value of the requested user is parsed, the data of all other users is skipped.
+
+    Parameters:
+        savefile_path (str): The path of the JSON savefile.
+        username (str): The name of the user.
+
+    Returns:
+        list[dict] or None: The habit dictionaries of the user, or None if the user doesn't exist.
+    """
+    for name, buffer, start, end in iter_user_spans(savefile_path):
+        if name == username:
+            return json.loads(buffer[start:end])
+    return None
+
+
+def iter_usernames(savefile_path):
+    """
+    Yields all usernames of a savefile without parsing their habits.
+
+    Parameters:
+        savefile_path (str): The path of the JSON savefile.
+
+    Yields:
+        str: The usernames in the order of the savefile.
+    """
+    for name, _, _, _ in iter_user_spans(savefile_path):
+        yield name
+
+
+def iter_users(savefile_path):
+    """
+    Yields the users of a savefile one after another.
+
+    Only the habits of one user are held in memory at any time.
+
+    Parameters:
+        savefile_path (str): The path of the JSON savefile.
+
+    Yields:
+        tuple: The username and the list of habit dictionaries of the user.
+    """
+    for name, buffer, start, end in iter_user_spans(savefile_path):
+        logging.debug(f"Streaming user {name}.")
+        yield name, json.loads(buffer[start:end])
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from habit import Habit
+from savefileStreamReader import iter_users
+
+# The umask can only be read by setting it, which changes it for every thread. It is read once
+# at import, before any writer thread runs.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class ShardedSaveFileManager:
+    """
+    A save file manager that keeps every user in a file of its own.
+
+    The directory contains one shard file per user and a small index file with the usernames,
+    the name of their shard, their habit count and the time they were last modified.
+    Listing and checking users only reads the index and saving a user only rewrites the shard
+    of that user plus the index. The public methods mirror the ones of SaveFileManager.
+
+    Several processes can save different users at the same time. Every file is written through a
+    temporary file of its own, and the index is read, changed and written while holding a lock, so
+    no process drops the index entry another one just wrote.
+
+    Attributes:
+        directory (str): The directory holding the shards and the index.
+        index_path (str): The path of the index file.
+    """
+
+    def __init__(self, directory="habithero_users"):
+        """
+        Initializes the ShardedSaveFileManager and creates the directory and an empty index if they don't exist.
+
+        Parameters:
+            directory (str, optional): The directory of the shards. Defaults to "habithero_users".
+        """
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock_path = self.index_path + ".lock"
+
+        if not os.path.exists(self.index_path):
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with self._index_lock():
+                    if not os.path.exists(self.index_path):
+                        _write_json_atomic(self.index_path, {"users": {}})
+                logging.info(f"Created an empty users index at {self.index_path}")
+            except Exception as e:
+                logging.error(f"Error creating the users index at {self.index_path}: {str(e)}")
+
+    @contextmanager
+    def _index_lock(self):
+        """
+        Internal helper that holds an exclusive lock on the index while the block runs.
+
+        The lock is taken on a separate lock file, since the index itself is replaced on every write.
+        """
+        with open(self.lock_path, "a+") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                # Retries for about ten seconds before giving up.
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _load_index(self):
+        """
+        Internal helper to load the users index.
+
+        Returns:
+            dict: Mapping of usernames to their metadata, or an empty dictionary on error.
+        """
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)["users"]
+        except FileNotFoundError:
+            logging.warning(f"Users index {self.index_path} not found. An empty dictionary will be returned.")
+            return {}
+        except (json.JSONDecodeError, KeyError):
+            logging.error(f"Error decoding users index {self.index_path}.")
+            return {}
+
+    def save_data(self, user_name, habits_list):
+        """
+        Save habit data for a specified user.
+
+        Only the shard of the user and the index are written.
+
+        Parameters:
+        - user_name (str): Name of the user.
+        - habits_list (list): List of Habit objects to be saved.
+        """
+        try:
+            # Only changed habits are serialized again, the others reuse their cached JSON.
+            habits_json = "[" + ", ".join(habit.to_json() for habit in habits_list) + "]"
+            self._write_user(user_name, habits_json, len(habits_list))
+            logging.info(f"Data for user {user_name} has been successfully saved.")
+        except Exception as e:
+            logging.error(f"Error while saving data for user {user_name}: {str(e)}")
+
+    def _write_user(self, user_name, habits_json, habit_count):
+        """
+        Internal helper that writes the shard of a user and updates the index entry.
+
+        Parameters:
+            user_name (str): Name of the user.
+            habits_json (str): The habit list of the user as JSON.
+            habit_count (int): The number of habits of the user.
+        """
+        # The shard name only depends on the username, so the shard can be written without the lock.
+        entry = {"file": shard_file_name(user_name)}
+        _write_text_atomic(os.path.join(self.directory, entry["file"]), habits_json)
+
+        entry["habit_count"] = habit_count
+        entry["last_modified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # The index is read again under the lock, so entries written by other processes are kept.
+        with self._index_lock():
+            index = self._load_index()
+            index[user_name] = entry
+            _write_json_atomic(self.index_path, {"users": index})
+
+    def load_data(self, username):
+        """
+        Loads the shard of a user and converts it to Habit objects.
+
+        Parameters:
+            username (str): The name of the user whose data needs to be loaded.
+
+        Returns:
+            list: A list of Habit objects for the specified user, or an empty list if the user does not exist.
+        """
+        try:
+            entry = self._load_index().get(username)
+            if entry is None:
+                logging.warning(f"User {username} not found in the data.")
+                return []
+
+            with open(os.path.join(self.directory, entry["file"]), "r") as f:
+                habits_dict_list = json.load(f)
+
+            habits_obj_list = [Habit.from_dict(habit_dict) for habit_dict in habits_dict_list]
+            logging.info(f"Loaded data for user {username} successfully.")
+            return habits_obj_list
+
+        except Exception as e:
+            logging.error(f"Error while loading data for user {username}: {str(e)}")
+            return []
+
+    def get_all_users(self):
+        """
+        Retrieves all the usernames from the index.
+
+        Returns:
+            list[str]: A list containing all the usernames, or an empty list if an error occurs.
+        """
+        users = list(self._load_index().keys())
+        logging.info(f"Retrieved {len(users)} users from the users index.")
+        return users
+
+    def get_user_info(self, username):
+        """
+        Retrieves the index metadata of a user.
+
+        Parameters:
+            username (str): The name of the user.
+
+        Returns:
+            dict or None: The shard file, habit count and last modification time, or None if the user doesn't exist.
+        """
+        return self._load_index().get(username)
+
+    def user_exists(self, username):
+        """
+        Checks if a user exists in the index.
+
+        Args:
+            username (str): The name of the user.
+
+        Returns:
+            bool: True if the user exists, False otherwise.
+        """
+        return username in self._load_index()
+
+
+def shard_file_name(user_name):
+    """
+    Builds the file name of the shard of a user.
+
+    Usernames can contain characters that are not allowed in file names, so they are replaced.
+    A short hash of the original name keeps names apart that only differ in those characters.
+
+    Parameters:
+        user_name (str): Name of the user.
+
+    Returns:
+        str: The file name of the shard.
+    """
+    safe_name = re.sub(r"[^A-Za-z0-9_-]", "_", user_name)[:50]
+    name_hash = hashlib.sha1(user_name.encode("utf-8")).hexdigest()[:10]
+    return f"{safe_name}-{name_hash}.json"
+
+
+def _write_text_atomic(path, text):
+    """
+    Writes text to a temporary file and moves it into place, so readers never see a half written file.
+
+    Parameters:
+        path (str): The target path.
+        text (str): The text to write.
+    """
+    # Every writer gets a temporary file of its own, so concurrent writers don't mix their content.
+    directory, file_name = os.path.split(path)
+    with tempfile.NamedTemporaryFile("w", dir=directory or ".", prefix=file_name + ".", suffix=".tmp",
+                                     delete=False) as f:
+        temp_path = f.name
+        try:
+            f.write(text)
+            # Temporary files are only readable by their owner. The file gets the mode of the file it
+            # replaces, or the one a newly created file would get.
+            try:
+                mode = os.stat(path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.chmod(temp_path, mode)
+        except Exception:
+            f.close()
+            os.remove(temp_path)
+            raise
+    os.replace(temp_path, path)
+
+
+def _write_json_atomic(path, data):
+    """
+    Writes JSON data atomically, see _write_text_atomic.
+
+    Parameters:
+        path (str): The target path.
+        data: The data to write.
+    """
+    _write_text_atomic(path, json.dumps(data))
+
+
+def migrate_json_to_shards(json_path="habithero_savefile.json", directory="habithero_users"):
+    """
+    Copies every user of a JSON savefile into the sharded directory layout.
+
+    The savefile is streamed, so only one user is held in memory at a time.
+
+    Parameters:
+        json_path (str, optional): The JSON savefile to read. Defaults to "habithero_savefile.json".
+        directory (str, optional): The directory of the shards. Defaults to "habithero_users".
+
+    Returns:
+        int: The number of migrated users.
+    """
+    manager = ShardedSaveFileManager(directory)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    migrated_entries = {}
+    for user_name, habits_dict_list in iter_users(json_path):
+        entry = {"file": shard_file_name(user_name), "habit_count": len(habits_dict_list), "last_modified": now}
+        _write_json_atomic(os.path.join(directory, entry["file"]), habits_dict_list)
+        migrated_entries[user_name] = entry
+    migrated = len(migrated_entries)
+
+    # The index is written once at the end instead of after every user.
+    with manager._index_lock():
+        index = manager._load_index()
+        index.update(migrated_entries)
+        _write_json_atomic(manager.index_path, {"users": index})
+    logging.info(f"Migrated {migrated} users from {json_path} to {directory}.")
+    return migrated
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python shardedSaveFileManager.py [json_path] [directory]
+    migrated = migrate_json_to_shards(*sys.argv[1:3])
+    print(f"Migrated {migrated} users.")
@@ -0,0 +1,265 @@
+import json
+import logging
+import sqlite3
+from habit import Habit
+
+
+class SQLiteSaveFileManager:
+    """
+    A SQLite based alternative to the JSON SaveFileManager.
+
+    Users, habits and log entries live in their own tables, so loading or saving one user only
+    touches the rows of that user instead of parsing and rewriting the whole savefile.
+    The public methods mirror the ones of SaveFileManager so both can be used interchangeably.
+
+    Attributes:
+        savefile_path (str): The path to the SQLite database file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            goal TEXT,
+            frequency TEXT NOT NULL,
+            start_date TEXT,
+            strict INTEGER NOT NULL DEFAULT 0,
+            streak INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS logs (
+            habit_id INTEGER NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            log_date TEXT NOT NULL,
+            PRIMARY KEY (habit_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS idx_habits_user ON habits(user_id, position);
+        CREATE INDEX IF NOT EXISTS idx_logs_habit_date ON logs(habit_id, log_date);
+    """
+
+    def __init__(self, savefile_path="habithero_savefile.db"):
+        """
+        Initializes the SQLiteSaveFileManager object and creates the tables if they don't exist yet.
+
+        Parameters:
+            savefile_path (str, optional): The path to the database file. Defaults to "habithero_savefile.db".
+        """
+        self.savefile_path = savefile_path
+        try:
+            with self._connect() as connection:
+                connection.executescript(self.SCHEMA)
+            logging.info(f"Opened SQLite savefile at {self.savefile_path}")
+        except sqlite3.Error as e:
+            logging.error(f"Error initializing SQLite savefile at {self.savefile_path}: {str(e)}")
+
+    def _connect(self):
+        """
+        Internal helper to open a connection with foreign keys enabled.
+
+        Returns:
+            sqlite3.Connection: An open connection to the savefile.
+        """
+        connection = sqlite3.connect(self.savefile_path)
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def save_data(self, user_name, habits_list):
+        """
+        Save habit data for a specified user.
+
+        Only the rows belonging to the user are replaced. All other users stay untouched.
+
+        Parameters:
+        - user_name (str): Name of the user.
+        - habits_list (list): List of Habit objects to be saved.
+        """
+        try:
+            habits_dict_list = [habit.saved_dict() for habit in habits_list]
+            connection = self._connect()
+            try:
+                with connection:
+                    _write_user(connection, user_name, habits_dict_list)
+            finally:
+                connection.close()
+            logging.info(f"Data for user {user_name} has been successfully saved.")
+        except Exception as e:
+            logging.error(f"Error while saving data for user {user_name}: {str(e)}")
+
+    def load_data(self, username):
+        """
+        Loads the habits of a user and converts them to Habit objects.
+
+        Parameters:
+            username (str): The name of the user whose data needs to be loaded.
+
+        Returns:
+            list: A list of Habit objects for the specified user, or an empty list if the user does not exist.
+        """
+        try:
+            connection = self._connect()
+            try:
+                habits_dict_list = _read_user(connection, username)
+            finally:
+                connection.close()
+
+            if habits_dict_list is None:
+                logging.warning(f"User {username} not found in the data.")
+                return []
+
+            habits_obj_list = [Habit.from_dict(habit_dict) for habit_dict in habits_dict_list]
+            logging.info(f"Loaded data for user {username} successfully.")
+            return habits_obj_list
+
+        except Exception as e:
+            logging.error(f"Error while loading data for user {username}: {str(e)}")
+            return []
+
+    def get_all_users(self):
+        """
+        Retrieves all the usernames present in the database.
+
+        Returns:
+            list[str]: A list containing all the usernames, or an empty list if an error occurs.
+        """
+        try:
+            connection = self._connect()
+            try:
+                users = [row[0] for row in connection.execute("SELECT name FROM users ORDER BY id")]
+            finally:
+                connection.close()
+            logging.info(f"Retrieved {len(users)} users from the savefile.")
+            return users
+        except Exception as e:
+            logging.error(f"Error while retrieving user list: {str(e)}")
+            return []
+
+    def user_exists(self, username):
+        """
+        Checks if a user exists in the database.
+
+        Args:
+            username (str): The name of the user.
+
+        Returns:
+            bool: True if the user exists, False otherwise.
+        """
+        try:
+            connection = self._connect()
+            try:
+                row = connection.execute("SELECT 1 FROM users WHERE name = ?", (username,)).fetchone()
+            finally:
+                connection.close()
+            return row is not None
+        except Exception as e:
+            logging.error(f"Error while checking for user {username}: {str(e)}")
+            return False
+
+
+def _write_user(connection, user_name, habits_dict_list):
+    """
+    Replaces all habits and logs of a user inside an open transaction.
+
+    Parameters:
+        connection (sqlite3.Connection): The open connection.
+        user_name (str): Name of the user.
+        habits_dict_list (list[dict]): The habits of the user in the savefile dictionary format.
+    """
+    connection.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (user_name,))
+    user_id = connection.execute("SELECT id FROM users WHERE name = ?", (user_name,)).fetchone()[0]
+
+    # The logs are removed by the foreign key cascade.
+    connection.execute("DELETE FROM habits WHERE user_id = ?", (user_id,))
+
+    for position, habit_dict in enumerate(habits_dict_list):
+        cursor = connection.execute(
+            "INSERT INTO habits (user_id, position, name, goal, frequency, start_date, strict, streak) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id, position, habit_dict["name"], habit_dict.get("goal"), habit_dict["frequency"],
+             habit_dict.get("start_date"), int(bool(habit_dict.get("strict", False))), habit_dict.get("streak", 0)))
+        habit_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO logs (habit_id, position, log_date) VALUES (?, ?, ?)",
+            [(habit_id, index, log_date) for index, log_date in enumerate(habit_dict.get("logs") or [])])
+
+
+def _read_user(connection, user_name):
+    """
+    Reads all habits of a user in the savefile dictionary format.
+
+    Parameters:
+        connection (sqlite3.Connection): The open connection.
+        user_name (str): Name of the user.
+
+    Returns:
+        list[dict] or None: The habit dictionaries in their saved order, or None if the user does not exist.
+    """
+    row = connection.execute("SELECT id FROM users WHERE name = ?", (user_name,)).fetchone()
+    if row is None:
+        return None
+    user_id = row[0]
+
+    habits = {}
+    habit_rows = connection.execute(
+        "SELECT id, name, goal, frequency, start_date, strict, streak FROM habits "
+        "WHERE user_id = ? ORDER BY position", (user_id,))
+    for habit_id, name, goal, frequency, start_date, strict, streak in habit_rows:
+        habits[habit_id] = {
+            'name': name,
+            'goal': goal,
+            'frequency': frequency,
+            'start_date': start_date,
+            'strict': bool(strict),
+            'streak': streak,
+            'logs': []
+        }
+
+    log_rows = connection.execute(
+        "SELECT logs.habit_id, logs.log_date FROM logs JOIN habits ON habits.id = logs.habit_id "
+        "WHERE habits.user_id = ? ORDER BY logs.habit_id, logs.position", (user_id,))
+    for habit_id, log_date in log_rows:
+        habits[habit_id]['logs'].append(log_date)
+
+    return list(habits.values())
+
+
+def migrate_json_to_sqlite(json_path="habithero_savefile.json", sqlite_path="habithero_savefile.db"):
+    """
+    Copies every user of a JSON savefile into a SQLite savefile.
+
+    Users that already exist in the database are overwritten with the data from the JSON file.
+
+    Parameters:
+        json_path (str, optional): The JSON savefile to read. Defaults to "habithero_savefile.json".
+        sqlite_path (str, optional): The database to write. Defaults to "habithero_savefile.db".
+
+    Returns:
+        int: The number of migrated users.
+    """
+    with open(json_path, "r") as f:
+        data = json.load(f)
+
+    # Creates the schema if needed.
+    manager = SQLiteSaveFileManager(sqlite_path)
+    connection = manager._connect()
+    try:
+        with connection:
+            for user_name, habits_dict_list in data.items():
+                _write_user(connection, user_name, habits_dict_list)
+    finally:
+        connection.close()
+
+    logging.info(f"Migrated {len(data)} users from {json_path} to {sqlite_path}.")
+    return len(data)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python sqliteSaveFileManager.py [json_path] [sqlite_path]
+    migrated = migrate_json_to_sqlite(*sys.argv[1:3])
+    print(f"Migrated {migrated} users.")
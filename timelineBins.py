@@ -0,0 +1,172 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+# Up to this many visible entries the timeline draws one line per entry.
+EVENT_LIMIT = 1000
+# Up to this many visible weeks the entries are counted per week, above per month.
+WEEK_BIN_LIMIT = 260
+
+
+def week_start(day):
+    """
+    Returns the Monday of the week of a day.
+
+    Parameters:
+        day (int): The day ordinal.
+
+    Returns:
+        int: The day ordinal of the Monday. Ordinal 1 is a Monday.
+    """
+    return day - (day - 1) % 7
+
+
+def month_start(day):
+    """
+    Returns the first day of the month of a day.
+
+    Parameters:
+        day (int): The day ordinal.
+
+    Returns:
+        int: The day ordinal of the first of the month.
+    """
+    return date.fromordinal(day).replace(day=1).toordinal()
+
+
+def next_month_start(day):
+    """
+    Returns the first day of the month after the month of a day.
+
+    Parameters:
+        day (int): The day ordinal.
+
+    Returns:
+        int: The day ordinal of the first of the next month.
+    """
+    current = date.fromordinal(day)
+    months = current.year * 12 + current.month
+    return date(months // 12, months % 12 + 1, 1).toordinal()
+
+
+def visible_days(low, high, offset):
+    """
+    Converts the x limits of a plot to the visible days.
+
+    Parameters:
+        low (float): The lower x limit.
+        high (float): The upper x limit.
+        offset (float): The x value of day ordinal 0, e.g. the matplotlib date of that day.
+
+    Returns:
+        tuple[int, int]: The first and the last visible day ordinal.
+    """
+    return int(low - offset), int(high - offset) + 1
+
+
+class TimelineBins:
+    """
+    The logs of a habit prepared for drawing a timeline at any zoom level.
+
+    The entries are counted per week and per month once. Every zoom level only slices the visible
+    part out of these aggregates with a binary search, so re-binning after a zoom or pan costs
+    O(log n + visible bins) no matter how many years of logs there are.
+
+    Attributes:
+        days (array): The sorted day ordinals of the habit.
+    """
+
+    def __init__(self, days):
+        """
+        Parameters:
+            days (array): The sorted day ordinals of the habit. They are copied, so the habit can change.
+        """
+        self.days = array('i', days)
+        # Mapping of "week" and "month" to the bin starts, widths and counts, built on first use.
+        self._aggregates = {}
+
+    def aggregate(self, kind):
+        """
+        Counts the entries per week or per month.
+
+        Parameters:
+            kind (str): "week" or "month".
+
+        Returns:
+            tuple: The arrays of the bin starts, the bin widths in days and the counts of all bins with entries.
+        """
+        if kind in self._aggregates:
+            return self._aggregates[kind]
+
+        starts, widths, counts = array('i'), array('i'), array('i')
+        for day in self.days:
+            start = week_start(day) if kind == "week" else month_start(day)
+            if starts and starts[-1] == start:
+                counts[-1] += 1
+                continue
+            starts.append(start)
+            widths.append(7 if kind == "week" else next_month_start(day) - start)
+            counts.append(1)
+        self._aggregates[kind] = (starts, widths, counts)
+        return self._aggregates[kind]
+
+    def visible_count(self, first, last):
+        """
+        Counts the entries between two days, both included.
+
+        Parameters:
+            first (int): The first day ordinal.
+            last (int): The last day ordinal.
+
+        Returns:
+            int: The number of entries.
+        """
+        return bisect_right(self.days, last) - bisect_left(self.days, first)
+
+    def mode(self, first, last):
+        """
+        Chooses how the entries between two days are drawn.
+
+        Parameters:
+            first (int): The first visible day ordinal.
+            last (int): The last visible day ordinal.
+
+        Returns:
+            str: "events" for one line per entry, "week" or "month" for bars of the counts.
+        """
+        if self.visible_count(first, last) <= EVENT_LIMIT:
+            return "events"
+        if (last - first) / 7 <= WEEK_BIN_LIMIT:
+            return "week"
+        return "month"
+
+    def events(self, first, last):
+        """
+        Returns the entries between two days.
+
+        Parameters:
+            first (int): The first day ordinal.
+            last (int): The last day ordinal.
+
+        Returns:
+            array: The day ordinals of the entries.
+        """
+        return self.days[bisect_left(self.days, first):bisect_right(self.days, last)]
+
+    def bins(self, kind, first, last):
+        """
+        Returns the bins overlapping the days between first and last.
+
+        Parameters:
+            kind (str): "week" or "month".
+            first (int): The first day ordinal.
+            last (int): The last day ordinal.
+
+        Returns:
+            tuple: The arrays of the bin starts, the bin widths and the counts.
+        """
+        starts, widths, counts = self.aggregate(kind)
+        # The bin containing the first day starts before it.
+        begin = max(bisect_right(starts, first) - 1, 0)
+        end = bisect_right(starts, last)
+        return starts[begin:end], widths[begin:end], counts[begin:end]
@@ -6,6 +6,11 @@ Created on Mon Mar 11 20:34:07 2024
 """
 
 import unittest
+import json
+import os
+import tempfile
+import threading
+import time
 
 from datetime import datetime, timedelta
 
@@ -17,6 +22,34 @@ from Analyzer import find_longest_streak
 from Analyzer import calculate_consistency_rate
 from Analyzer import next_habit_due
 from Analyzer import verify_frequency_in_range
+from Analyzer import summarize
+from Analyzer import summarize_days
+from Analyzer import next_habit_due_many
+from Analyzer import streak_series
+from habit import Habit, reset_overdue_streaks
+from saveFileManager import SaveFileManager
+from sqliteSaveFileManager import SQLiteSaveFileManager
+from sqliteSaveFileManager import migrate_json_to_sqlite
+from journalSaveFileManager import JournalSaveFileManager
+from shardedSaveFileManager import ShardedSaveFileManager
+from shardedSaveFileManager import migrate_json_to_shards
+from writeBehindSaver import WriteBehindSaver
+from savefileStreamReader import load_user_habits
+from savefileStreamReader import iter_users
+from frequencyRules import compile_frequency, FrequencyRule
+from calendarIndex import CalendarIndex
+from batchAnalyzer import analyze_savefile, write_csv
+from analyzerCache import AnalyzerCache
+from rollingAdherence import RollingAdherence
+from crossUserStats import CrossUserStats, collect_cross_user_stats, iter_manager_habits
+from dueIndex import DueIndex, build_due_index
+from habitRowModel import COLUMNS, HabitRowModel, habit_row
+from timelineBins import TimelineBins, week_start, month_start, visible_days
+
+try:
+    import AnalyzerNumpy
+except ImportError:
+    AnalyzerNumpy = None
 
 
 class TestAverageDurationBetweenDates(unittest.TestCase):
@@ -113,6 +146,9 @@ class TestDaysUntilDate(unittest.TestCase):
         with self.assertRaises(ValueError):
             days_until_date("invalid-date")
 
+    def test_as_of(self):
+        self.assertEqual(days_until_date("2024-03-01", as_of="2024-02-27"), 3)
+
 
 class TestFindLongestStreak(unittest.TestCase):
 
@@ -222,6 +258,18 @@ class TestNextHabitDue(unittest.TestCase):
         with self.assertRaises(ValueError):
             next_habit_due(last_performed, frequency)
 
+    def test_weekly_frequency_at_year_end(self):
+        # Sunday of the following week, even across the turn of the year.
+        self.assertEqual(next_habit_due("2024-12-24", "Weekly"), "2025-01-05")
+
+    def test_monthly_frequency_at_year_end(self):
+        self.assertEqual(next_habit_due("2024-12-15", "Monthly"), "2025-01-31")
+
+    def test_many(self):
+        pairs = [("2024-01-01", "Daily"), ("2024-01-01", "Weekly"), ("2024-01-01", "Monthly"),
+                 ("2024-01-01", "Every 3 Days"), ("2024-01-01", "Every Monday")]
+        self.assertEqual(next_habit_due_many(pairs), [next_habit_due(*pair) for pair in pairs])
+
 
 class TestFrequencyInRange(unittest.TestCase):
 
@@ -251,5 +299,931 @@ class TestFrequencyInRange(unittest.TestCase):
         self.assertFalse(verify_frequency_in_range(datetime(2024, 3, 23), datetime(2024, 3, 15), "Every Friday"))
 
 
+class TestSQLiteSaveFileManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "savefile.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_and_load(self):
+        manager = SQLiteSaveFileManager(self.db_path)
+        habit = Habit("Reading", "Read a book", "Daily", start_date="2024-01-01",
+                      logs=["2024-01-01", "2024-01-02", "2024-01-04"])
+        manager.save_data("Alice", [habit])
+        loaded = manager.load_data("Alice")
+        self.assertEqual(len(loaded), 1)
+        self.assertEqual(loaded[0].name, "Reading")
+        self.assertEqual(loaded[0].logs, ["2024-01-01", "2024-01-02", "2024-01-04"])
+
+    def test_save_only_replaces_one_user(self):
+        manager = SQLiteSaveFileManager(self.db_path)
+        manager.save_data("Alice", [Habit("Reading", "", "Daily", start_date="2024-01-01")])
+        manager.save_data("Bob", [Habit("Running", "", "Weekly", start_date="2024-01-01")])
+        manager.save_data("Alice", [])
+        self.assertEqual(manager.load_data("Alice"), [])
+        self.assertEqual(manager.load_data("Bob")[0].name, "Running")
+        self.assertEqual(manager.get_all_users(), ["Alice", "Bob"])
+
+    def test_unknown_user(self):
+        manager = SQLiteSaveFileManager(self.db_path)
+        self.assertFalse(manager.user_exists("Nobody"))
+        self.assertEqual(manager.load_data("Nobody"), [])
+
+    def test_migrate_json(self):
+        json_path = os.path.join(self.tmpdir.name, "savefile.json")
+        data = {"Alice": [{"name": "Reading", "goal": "", "frequency": "Daily", "start_date": "2024-01-01",
+                           "streak": 2, "logs": ["2024-01-01", "2024-01-02"]}]}
+        with open(json_path, "w") as f:
+            json.dump(data, f)
+        self.assertEqual(migrate_json_to_sqlite(json_path, self.db_path), 1)
+        manager = SQLiteSaveFileManager(self.db_path)
+        self.assertTrue(manager.user_exists("Alice"))
+        self.assertEqual(manager.load_data("Alice")[0].logs, ["2024-01-01", "2024-01-02"])
+
+
+class TestJournalSaveFileManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.savefile_path = os.path.join(self.tmpdir.name, "savefile.json")
+        self.habit = Habit("Reading", "Read a book", "Daily", start_date="2024-01-01", logs=["2024-01-01"])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_replay_after_restart(self):
+        manager = JournalSaveFileManager(self.savefile_path)
+        manager.save_data("Alice", [])
+        manager.append_change("Alice", "created", 0, self.habit)
+        self.habit.perform_habit_on_date("2024-01-02")
+        manager.append_change("Alice", "performed", 0, self.habit)
+        self.habit.edit_habit(new_name="Reading more")
+        manager.append_change("Alice", "edited", 0, self.habit)
+
+        loaded = JournalSaveFileManager(self.savefile_path).load_data("Alice")
+        self.assertEqual(loaded[0].name, "Reading more")
+        self.assertEqual(loaded[0].logs, ["2024-01-01", "2024-01-02"])
+
+    def test_delete(self):
+        manager = JournalSaveFileManager(self.savefile_path)
+        manager.save_data("Alice", [self.habit])
+        manager.append_change("Alice", "deleted", 0)
+        self.assertEqual(JournalSaveFileManager(self.savefile_path).load_data("Alice"), [])
+
+    def test_replace_keeps_cached_dicts_unchanged(self):
+        manager = JournalSaveFileManager(self.savefile_path)
+        manager.save_data("Alice", [self.habit])
+        changed = Habit("Writing", "", "Daily", start_date="2024-01-01", logs=["2024-01-05"])
+        manager.append_change("Alice", "performed", 0, changed)
+        manager.append_change("Alice", "edited", 0, changed)
+        # The saved dictionary of the unchanged habit is cached and must not pick up the later records.
+        self.assertEqual(self.habit.saved_dict()["name"], "Reading")
+        self.assertEqual(self.habit.saved_dict()["logs"], ["2024-01-01"])
+        loaded = manager.load_data("Alice")[0]
+        self.assertEqual((loaded.name, loaded.logs), ("Writing", ["2024-01-01", "2024-01-05"]))
+
+    def test_unreadable_snapshot(self):
+        os.mkdir(os.path.join(self.tmpdir.name, "savefile.snapshot.json"))
+        manager = JournalSaveFileManager(self.savefile_path)
+        self.assertEqual(manager.load_data("Alice"), [])
+
+    def test_compaction_truncates_journal(self):
+        manager = JournalSaveFileManager(self.savefile_path, compact_every=3)
+        manager.save_data("Alice", [self.habit])
+        for day in ["2024-01-02", "2024-01-03"]:
+            self.habit.perform_habit_on_date(day)
+            manager.append_change("Alice", "performed", 0, self.habit)
+        self.assertEqual(os.path.getsize(manager.journal_path), 0)
+        self.assertTrue(os.path.exists(manager.snapshot_path))
+        loaded = JournalSaveFileManager(self.savefile_path).load_data("Alice")
+        self.assertEqual(loaded[0].logs, ["2024-01-01", "2024-01-02", "2024-01-03"])
+
+    def test_seeded_from_savefile(self):
+        with open(self.savefile_path, "w") as f:
+            json.dump({"Alice": [self.habit.to_dict()]}, f)
+        manager = JournalSaveFileManager(self.savefile_path)
+        self.assertEqual(manager.get_all_users(), ["Alice"])
+
+
+class TestSaveFileManagerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.savefile_path = os.path.join(self.tmpdir.name, "savefile.json")
+        self.manager = SaveFileManager(self.savefile_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_repeated_reads_hit_cache(self):
+        self.manager.save_data("Alice", [])
+        self.manager.get_all_users()
+        self.manager.user_exists("Alice")
+        self.manager.load_data("Alice")
+        self.assertEqual(self.manager.cache_misses, 1)
+        self.assertEqual(self.manager.cache_hits, 3)
+
+    def test_own_write_updates_cache(self):
+        self.manager.save_data("Alice", [Habit("Reading", "", "Daily", start_date="2024-01-01")])
+        misses = self.manager.cache_misses
+        self.assertTrue(self.manager.user_exists("Alice"))
+        self.assertEqual(self.manager.cache_misses, misses)
+
+    def test_external_change_invalidates_cache(self):
+        self.manager.save_data("Alice", [])
+        with open(self.savefile_path, "w") as f:
+            json.dump({"Bob": []}, f)
+        # Make sure the signature differs even on file systems with coarse timestamps.
+        os.utime(self.savefile_path, ns=(0, 0))
+        self.assertEqual(self.manager.get_all_users(), ["Bob"])
+        self.assertEqual(self.manager.cache_hits, 0)
+
+    def test_loaded_habits_dont_change_cache(self):
+        self.manager.save_data("Alice", [Habit("Reading", "", "Daily", start_date="2024-01-01")])
+        habit = self.manager.load_data("Alice")[0]
+        habit.perform_habit_on_date("2024-01-02")
+        self.assertEqual(self.manager.load_data("Alice")[0].logs, ["2024-01-01"])
+
+
+class TestSavefileStreamReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.savefile_path = os.path.join(self.tmpdir.name, "savefile.json")
+        self.data = {
+            "Alice": [{"name": "Brackets [in] {name}", "goal": "Quote \\\" and \\\\", "frequency": "Daily",
+                       "start_date": "2024-01-01", "streak": 1, "logs": ["2024-01-01"]}],
+            "Bob": [],
+            "Ünïcode": [{"name": "Run", "goal": None, "frequency": "Weekly", "start_date": "2024-01-01",
+                         "streak": 2.5, "logs": ["2024-01-01", "2024-01-08"]}]
+        }
+        with open(self.savefile_path, "w") as f:
+            json.dump(self.data, f, indent=4)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load_single_user(self):
+        for username, habits in self.data.items():
+            self.assertEqual(load_user_habits(self.savefile_path, username), habits)
+
+    def test_unknown_user(self):
+        self.assertIsNone(load_user_habits(self.savefile_path, "Nobody"))
+
+    def test_iter_users(self):
+        self.assertEqual(dict(iter_users(self.savefile_path)), self.data)
+
+    def test_empty_object(self):
+        with open(self.savefile_path, "w") as f:
+            json.dump({}, f)
+        self.assertEqual(list(iter_users(self.savefile_path)), [])
+
+    def test_truncated_file(self):
+        with open(self.savefile_path, "w") as f:
+            f.write('{"Alice": [{"name": "Run", "logs": ["2024-01-01"')
+        with self.assertRaises(ValueError):
+            load_user_habits(self.savefile_path, "Bob")
+
+
+class TestShardedSaveFileManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "users")
+        self.manager = ShardedSaveFileManager(self.directory)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_save_and_load(self):
+        self.manager.save_data("Alice/Admin", [Habit("Reading", "", "Daily", start_date="2024-01-01")])
+        self.assertEqual(self.manager.load_data("Alice/Admin")[0].name, "Reading")
+        self.assertEqual(self.manager.get_user_info("Alice/Admin")["habit_count"], 1)
+        self.assertTrue(self.manager.user_exists("Alice/Admin"))
+
+    @unittest.skipIf(os.name == "nt", "File modes are POSIX only")
+    def test_files_keep_their_mode(self):
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.manager.save_data("Alice", [])
+        index_mode = os.stat(self.manager.index_path).st_mode & 0o777
+        self.assertEqual(index_mode, 0o666 & ~umask)
+        os.chmod(self.manager.index_path, 0o640)
+        self.manager.save_data("Bob", [])
+        self.assertEqual(os.stat(self.manager.index_path).st_mode & 0o777, 0o640)
+
+    def test_save_only_writes_own_shard(self):
+        self.manager.save_data("Alice", [])
+        self.manager.save_data("Bob", [])
+        bob_shard = os.path.join(self.directory, self.manager.get_user_info("Bob")["file"])
+        os.utime(bob_shard, ns=(0, 0))
+        self.manager.save_data("Alice", [Habit("Reading", "", "Daily", start_date="2024-01-01")])
+        self.assertEqual(os.stat(bob_shard).st_mtime_ns, 0)
+        self.assertEqual(self.manager.get_all_users(), ["Alice", "Bob"])
+
+    def test_concurrent_writers_keep_all_users(self):
+        def save_users(writer):
+            manager = ShardedSaveFileManager(self.directory)
+            for user in range(10):
+                manager.save_data(f"Writer{writer}-{user}", [])
+
+        threads = [threading.Thread(target=save_users, args=(writer,)) for writer in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.manager.get_all_users()), 40)
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith(".tmp")], [])
+
+    def test_migrate_json(self):
+        json_path = os.path.join(self.tmpdir.name, "savefile.json")
+        with open(json_path, "w") as f:
+            json.dump({"Alice": [], "Bob": [Habit("Run", "", "Weekly", start_date="2024-01-01").to_dict()]}, f)
+        self.assertEqual(migrate_json_to_shards(json_path, self.directory), 2)
+        self.assertEqual(self.manager.get_all_users(), ["Alice", "Bob"])
+        self.assertEqual(self.manager.load_data("Bob")[0].frequency, "Weekly")
+
+
+class TestHabitLogDays(unittest.TestCase):
+
+    def test_logs_are_sorted_ordinals(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-03", "2024-01-01"])
+        self.assertEqual(list(habit.log_days), [datetime(2024, 1, 1).toordinal(), datetime(2024, 1, 3).toordinal()])
+        self.assertEqual(habit.logs, ["2024-01-01", "2024-01-03"])
+        self.assertEqual(habit.get_last_performed(), "2024-01-03")
+
+    def test_perform_on_date_inserts_in_order(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-03"])
+        habit.perform_habit_on_date("2024-01-02")
+        habit.perform_habit_on_date("2024-01-02")
+        self.assertEqual(habit.logs, ["2024-01-01", "2024-01-02", "2024-01-03"])
+        self.assertTrue(habit.is_logged(datetime(2024, 1, 2).toordinal()))
+        self.assertFalse(habit.is_logged(datetime(2024, 1, 4).toordinal()))
+
+    def test_default_start_date_is_logged(self):
+        habit = Habit("Reading", "", "Daily")
+        self.assertEqual(habit.logs, [habit.start_date])
+
+    def test_perform_today_twice(self):
+        habit = Habit("Reading", "", "Daily", start_date="2024-01-01")
+        self.assertTrue(habit.perform_habit_today()[0])
+        self.assertFalse(habit.perform_habit_today()[0])
+        self.assertEqual(habit.get_last_performed(), datetime.now().strftime("%Y-%m-%d"))
+
+
+class TestHabitIncrementalStreak(unittest.TestCase):
+
+    def test_append_extends_streak(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-02", "2024-01-04"])
+        self.assertEqual(habit.streak, 1)
+        habit.perform_habit_on_date("2024-01-05")
+        self.assertEqual(habit.streak, 2)
+        self.assertEqual(habit.longest_streak, 2)
+        self.assertEqual(habit.times_broken, 1)
+
+    def test_back_dated_entry_joins_streaks(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-02", "2024-01-04", "2024-01-05"])
+        self.assertEqual((habit.longest_streak, habit.times_broken), (2, 1))
+        habit.perform_habit_on_date("2024-01-03")
+        self.assertEqual((habit.streak, habit.longest_streak, habit.times_broken), (5, 5, 0))
+
+    def test_matches_analyzer(self):
+        logs = ["2024-01-01", "2024-01-03", "2024-01-08", "2024-01-09", "2024-01-20"]
+        habit = Habit("Reading", "", "Every 2 Days", logs=logs[::2])
+        for log in logs[1::2]:
+            habit.perform_habit_on_date(log)
+        self.assertEqual((habit.longest_streak, habit.times_broken), find_longest_streak(habit.logs, "Every 2 Days"))
+        self.assertEqual(habit.streak, habit.calculate_streak())
+
+    def test_frequency_change_recalculates(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-03", "2024-01-05"])
+        self.assertEqual(habit.streak, 1)
+        habit.edit_habit(new_frequency="Every 2 Days")
+        self.assertEqual((habit.streak, habit.longest_streak, habit.times_broken), (3, 3, 0))
+
+
+class TestHabitDirtyTracking(unittest.TestCase):
+
+    def setUp(self):
+        self.habit = Habit("Reading", "", "Daily", start_date="2024-01-01", logs=["2024-01-01", "2024-01-02"])
+
+    def test_json_is_cached_until_change(self):
+        self.assertTrue(self.habit.dirty)
+        first = self.habit.to_json()
+        self.assertFalse(self.habit.dirty)
+        self.assertIs(self.habit.to_json(), first)
+        self.habit.perform_habit_on_date("2024-01-03")
+        self.assertTrue(self.habit.dirty)
+        self.assertEqual(json.loads(self.habit.to_json())["logs"][-1], "2024-01-03")
+
+    def test_mutators_raise_version(self):
+        version = self.habit.version
+        self.habit.edit_habit(new_goal="More pages")
+        self.habit.reset_streak()
+        self.assertEqual(self.habit.version, version + 2)
+
+    def test_saved_dict_is_cached_until_change(self):
+        saved = self.habit.saved_dict()
+        self.assertIs(self.habit.saved_dict(), saved)
+        self.assertEqual(saved, self.habit.to_dict())
+        self.habit.perform_habit_on_date("2024-01-03")
+        self.assertEqual(self.habit.saved_dict()["logs"][-1], "2024-01-03")
+
+    def test_snapshot_shares_cache(self):
+        self.habit.snapshot().to_json()
+        self.assertFalse(self.habit.dirty)
+
+    def test_savefile_written_from_fragments(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            savefile_path = os.path.join(tmpdir, "savefile.json")
+            manager = SaveFileManager(savefile_path)
+            manager.save_data("Bob", [Habit("Run", "", "Weekly", start_date="2024-01-01")])
+            manager.save_data("Alice", [self.habit])
+            self.habit.perform_habit_on_date("2024-01-03")
+            manager.save_data("Alice", [self.habit])
+            with open(savefile_path) as f:
+                data = json.load(f)
+            self.assertEqual(list(data), ["Bob", "Alice"])
+            self.assertEqual(data["Alice"][0]["logs"], ["2024-01-01", "2024-01-02", "2024-01-03"])
+
+
+class RecordingSaveFileManager:
+
+    def __init__(self):
+        self.saved = []
+
+    def save_data(self, user_name, habits_list):
+        self.saved.append((user_name, [habit.to_dict() for habit in habits_list]))
+
+
+class TestWriteBehindSaver(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = RecordingSaveFileManager()
+        self.saver = WriteBehindSaver(self.manager, delay=60)
+        self.habit = Habit("Reading", "", "Daily", start_date="2024-01-01")
+
+    def tearDown(self):
+        self.saver.close()
+
+    def test_burst_is_coalesced(self):
+        for day in ["2024-01-02", "2024-01-03", "2024-01-04"]:
+            self.habit.perform_habit_on_date(day)
+            self.saver.submit("Alice", [self.habit])
+        self.assertEqual(self.saver.queue_depth(), 1)
+        self.saver.flush()
+        self.assertEqual(len(self.manager.saved), 1)
+        self.assertEqual(self.manager.saved[0][1][0]["logs"][-1], "2024-01-04")
+        self.assertEqual(self.saver.metrics()["coalesced"], 2)
+
+    def test_snapshot_is_isolated(self):
+        self.saver.submit("Alice", [self.habit])
+        self.habit.perform_habit_on_date("2024-01-02")
+        self.saver.flush()
+        self.assertEqual(self.manager.saved[0][1][0]["logs"], ["2024-01-01"])
+
+    def test_close_flushes(self):
+        self.saver.submit("Alice", [])
+        self.saver.submit("Bob", [])
+        self.saver.close()
+        self.assertEqual(sorted(user for user, _ in self.manager.saved), ["Alice", "Bob"])
+
+    def test_continuous_submits_are_written_after_max_delay(self):
+        self.saver.max_delay = 0.2
+        deadline = time.monotonic() + 5
+        # The submits never pause for the 60 seconds of the debounce delay.
+        while not self.manager.saved and time.monotonic() < deadline:
+            self.saver.submit("Alice", [self.habit])
+            time.sleep(0.01)
+        self.assertTrue(self.manager.saved)
+
+
+class TestFrequencyRules(unittest.TestCase):
+
+    def day(self, date_str):
+        return datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+
+    def test_rules_are_cached(self):
+        self.assertIs(compile_frequency("Daily"), compile_frequency("Daily"))
+
+    def test_incomplete_rule_fails_on_construction(self):
+        class NoNextDueRule(FrequencyRule):
+            def in_range(self, prev_day, curr_day, strict=False):
+                return True
+
+        with self.assertRaises(TypeError):
+            NoNextDueRule("Sometimes")
+
+    def test_unknown_frequency(self):
+        with self.assertRaises(ValueError):
+            compile_frequency("Sometimes")
+        with self.assertRaises(ValueError):
+            compile_frequency("Every")
+
+    def test_in_range_many_matches_in_range(self):
+        days = [self.day(d) for d in ["2023-12-25", "2023-12-31", "2024-01-01", "2024-01-09", "2024-03-01"]]
+        for frequency in ["Daily", "Weekly", "Monthly", "Every 7 Days"]:
+            rule = compile_frequency(frequency)
+            expected = [rule.in_range(days[i - 1], days[i]) for i in range(1, len(days))]
+            self.assertEqual(rule.in_range_many(days), expected)
+
+    def test_weekday_next_due(self):
+        # 2024-01-01 was a Monday.
+        rule = compile_frequency("Every Monday")
+        self.assertEqual(rule.next_due(self.day("2024-01-01")), self.day("2024-01-08"))
+        self.assertEqual(rule.next_due(self.day("2024-01-03")), self.day("2024-01-08"))
+
+
+class TestStreakSeries(unittest.TestCase):
+
+    def test_daily(self):
+        series = streak_series(["2024-01-01", "2024-01-02", "2024-01-04", "2024-01-05"], "Daily", as_of="2024-01-10")
+        self.assertEqual([point.streak for point in series], [1, 2, 1, 2])
+        self.assertEqual([point.broken for point in series], [False, False, True, False])
+        self.assertEqual(series[-1].next_due_date, "2024-01-06")
+
+    def test_as_of_leaves_out_later_entries(self):
+        series = streak_series(["2024-01-01", "2024-01-08", "2024-01-15"], "Weekly", as_of="2024-01-10")
+        self.assertEqual([point.date for point in series], ["2024-01-01", "2024-01-08"])
+
+    def test_weekday_as_of(self):
+        logs = ["2024-01-01", "2024-01-08"]
+        # 2024-01-15 was a Monday, 2024-01-16 a Tuesday.
+        self.assertEqual(streak_series(logs, "Every Monday", as_of="2024-01-15")[-1].streak, 2)
+        self.assertEqual(streak_series(logs, "Every Monday", as_of="2024-01-16")[-1].streak, 1)
+
+    def test_matches_summary(self):
+        logs = ["2024-01-01", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-09"]
+        series = streak_series(logs, "Daily", as_of="2024-02-01")
+        stats = summarize(logs, "Daily")
+        self.assertEqual(max(point.streak for point in series), stats.longest_streak)
+        self.assertEqual(sum(point.broken for point in series), stats.times_broken)
+
+
+class TestRollingAdherence(unittest.TestCase):
+
+    def day(self, date_str):
+        return datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+
+    def test_daily_rates(self):
+        logs = ["2024-01-0" + str(i) for i in range(1, 8)]
+        habit = Habit("Reading", "", "Daily", logs=logs)
+        adherence = RollingAdherence(habit.log_days, habit.rule, today=self.day("2024-01-07"))
+        self.assertEqual(adherence.rate(7, self.day("2024-01-07")), 100.0)
+        self.assertAlmostEqual(adherence.rate(30, self.day("2024-01-07")), 7 / 30 * 100)
+        # Three days later the first three entries dropped out of the 7 day window.
+        self.assertAlmostEqual(adherence.rate(7, self.day("2024-01-10")), 4 / 7 * 100)
+
+    def test_weekly_is_capped(self):
+        habit = Habit("Running", "", "Weekly", logs=["2024-01-01", "2024-01-02"])
+        adherence = RollingAdherence(habit.log_days, habit.rule, today=self.day("2024-01-03"))
+        self.assertEqual(adherence.rate(7, self.day("2024-01-03")), 100.0)
+
+    def test_updates_with_new_entries(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-01"])
+        habit._adherence = RollingAdherence(habit.log_days, habit.rule, today=self.day("2024-01-01"))
+        habit.perform_habit_on_date("2024-01-02")
+        habit.perform_habit_on_date("2023-12-31")
+        # The day after the end of the windows doesn't move it, it is counted once the windows reach it.
+        self.assertEqual(habit.adherence.today, self.day("2024-01-01"))
+        self.assertEqual(habit.adherence.performed(7), 2)
+        habit.adherence.advance(self.day("2024-01-02"))
+        self.assertEqual(habit.adherence.performed(7), 3)
+        self.assertEqual(habit.adherence.performed(365), 3)
+
+    def test_expected_occurrences(self):
+        # 2024-01-03 is a Wednesday, the 7 days before it contain one Wednesday and one Sunday.
+        habit = Habit("Swimming", "", "Every Wednesday", logs=["2024-01-03"])
+        adherence = RollingAdherence(habit.log_days, habit.rule, today=self.day("2024-01-03"))
+        self.assertEqual(adherence.rate(7, self.day("2024-01-03")), 100.0)
+        # 2024-01-02 to 2024-01-31 contain five Wednesdays.
+        self.assertAlmostEqual(adherence.rate(30, self.day("2024-01-31")), 20.0)
+        weekly = Habit("Running", "", "Weekly", logs=["2024-01-05"])
+        adherence = RollingAdherence(weekly.log_days, weekly.rule, today=self.day("2024-01-31"))
+        # 2024-01-02 to 2024-01-31 contain four Sundays.
+        self.assertAlmostEqual(adherence.rate(30, self.day("2024-01-31")), 25.0)
+
+    def test_window_shorter_than_period(self):
+        habit = Habit("Cleaning", "", "Monthly", logs=["2024-01-15", "2024-02-10"])
+        adherence = RollingAdherence(habit.log_days, habit.rule, today=self.day("2024-03-01"))
+        rates = adherence.rates(self.day("2024-03-01"))
+        self.assertIsNone(rates[7])
+        self.assertIsNone(rates[30])
+        # 2023-12-03 to 2024-03-01 contain the ends of December, January and February.
+        self.assertAlmostEqual(rates[90], 2 / 3 * 100)
+        self.assertIsNone(RollingAdherence(habit.log_days, compile_frequency("Every 10 Days")).rate(7))
+
+
+class TestCalendarIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.habit = Habit("Reading", "", "Daily", logs=["2023-03-05", "2024-03-01", "2024-03-02", "2024-05-20"])
+
+    def day(self, date_str):
+        return datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+
+    def test_counts(self):
+        calendar = self.habit.calendar
+        self.assertEqual(calendar.count_in_month(3, 2024), 2)
+        self.assertEqual(calendar.count_in_month(4, 2024), 0)
+        self.assertEqual(calendar.count_in_month(1, 2020), 0)
+        self.assertEqual(calendar.count_in_year(2024), 3)
+        self.assertEqual(calendar.count_between(self.day("2023-01-01"), self.day("2024-03-01")), 2)
+        # 2024-02-26 to 2024-03-03 is one week.
+        self.assertEqual(calendar.count_in_week(self.day("2024-02-28")), 2)
+        self.assertEqual(calendar.year_over_year(2024)[2], (3, 2, 1))
+
+    def test_updates_incrementally(self):
+        calendar = self.habit.calendar
+        self.habit.perform_habit_on_date("2024-05-21")
+        self.habit.perform_habit_on_date("2022-12-31")
+        self.habit.perform_habit_on_date("2024-04-10")
+        self.assertIs(self.habit.calendar, calendar)
+        rebuilt = CalendarIndex(self.habit.log_days)
+        self.assertEqual(calendar.month_counts(), rebuilt.month_counts())
+        self.assertEqual(calendar.count_in_year(2024), 5)
+        self.assertEqual(calendar.count_in_year(2022), 1)
+
+    def test_matches_count_performed_in_month(self):
+        self.habit.perform_habit_on_date("2024-03-31")
+        for year in (2023, 2024):
+            for month in range(1, 13):
+                self.assertEqual(self.habit.calendar.count_in_month(month, year),
+                                 count_performed_in_month(self.habit.logs, month, year))
+
+
+class TestSummarize(unittest.TestCase):
+
+    def setUp(self):
+        self.logs = ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-07", "2024-01-08", "2024-02-01"]
+
+    def test_matches_single_functions(self):
+        stats = summarize(self.logs, "Daily")
+        self.assertEqual((stats.longest_streak, stats.times_broken), find_longest_streak(self.logs, "Daily"))
+        self.assertEqual(stats.consistency, calculate_consistency_rate(self.logs, "Daily"))
+        self.assertEqual(stats.average_gap, average_duration_between_dates(self.logs))
+        self.assertEqual(stats.longest_gap, longest_break_between_dates(self.logs))
+        self.assertEqual(stats.current_streak, 1)
+
+    def test_dates_and_months(self):
+        stats = summarize(self.logs, "Daily")
+        self.assertEqual((stats.first_date, stats.last_date), ("2024-01-01", "2024-02-01"))
+        self.assertEqual(stats.performed_in_month(1, 2024), 5)
+        self.assertEqual(stats.performed_in_month(3, 2024), 0)
+
+    def test_empty_logs(self):
+        stats = summarize([], "Weekly")
+        self.assertEqual(stats.consistency, 0.0)
+        self.assertIsNone(stats.first_date)
+
+    def test_days_match_logs(self):
+        habit = Habit("Reading", "", "Every 2 Days", start_date="2023-12-30", logs=self.logs + ["2023-12-30"])
+        self.assertEqual(summarize_days(habit.log_days, habit.frequency), summarize(habit.logs, habit.frequency))
+
+    def test_is_immutable(self):
+        stats = summarize(self.logs, "Daily")
+        with self.assertRaises(AttributeError):
+            stats.longest_streak = 10
+
+
+class TestAnalyzerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AnalyzerCache(max_entries=2)
+        self.habit = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-02"])
+
+    def test_repeat_lookup_is_cached(self):
+        stats = self.cache.summarize(self.habit, "2024-01-03")
+        self.assertIs(self.cache.summarize(self.habit, "2024-01-03"), stats)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_change_invalidates(self):
+        self.cache.summarize(self.habit, "2024-01-03")
+        self.habit.perform_habit_on_date("2024-01-03")
+        self.assertEqual(self.cache.summarize(self.habit, "2024-01-03").longest_streak, 3)
+        self.assertEqual(self.cache.metrics()["entries"], 1)
+
+    def test_eviction(self):
+        other = Habit("Running", "", "Weekly", logs=["2024-01-01"])
+        self.cache.summarize(self.habit, "2024-01-03")
+        self.cache.summarize(other, "2024-01-03")
+        self.cache.summarize(other, "2024-01-04")
+        self.assertEqual(self.cache.evictions, 1)
+        self.cache.summarize(self.habit, "2024-01-03")
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_days_until_due_of_more_habits_than_entries(self):
+        habits = [Habit(f"Habit {i}", "", "Daily", logs=["2024-01-01"]) for i in range(5)]
+        for habit in habits:
+            self.cache.days_until_due(habit, "2024-01-01")
+        self.cache.summarize(self.habit, "2024-01-03")
+        for habit in habits:
+            self.cache.days_until_due(habit, "2024-01-01")
+        self.assertEqual((self.cache.hits, self.cache.evictions), (5, 0))
+        self.assertIsNotNone(self.cache.cached_summary(self.habit, "2024-01-03"))
+
+    def test_older_snapshot_keeps_newer_results(self):
+        snapshot = self.habit.snapshot()
+        self.habit.perform_habit_on_date("2024-01-03")
+        newer = self.cache.summarize(self.habit, "2024-01-03")
+        self.assertEqual(self.cache.summarize(snapshot, "2024-01-03").longest_streak, 2)
+        self.assertIs(self.cache.cached_summary(self.habit, "2024-01-03"), newer)
+        self.cache.days_until_due(self.habit, "2024-01-03")
+        self.cache.days_until_due(snapshot, "2024-01-03")
+        self.cache.days_until_due(self.habit, "2024-01-03")
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_days_until_due(self):
+        self.assertEqual(self.cache.days_until_due(self.habit, "2024-01-01"), 2)
+
+    def test_store_background_summary(self):
+        snapshot = self.habit.snapshot()
+        self.assertIsNone(self.cache.cached_summary(snapshot, "2024-01-03"))
+        stats = summarize(snapshot.logs, snapshot.frequency)
+        self.cache.store_summary(snapshot, stats, "2024-01-03")
+        self.assertIs(self.cache.cached_summary(self.habit, "2024-01-03"), stats)
+
+    def test_stale_summary_is_not_stored(self):
+        snapshot = self.habit.snapshot()
+        self.habit.perform_habit_on_date("2024-01-03")
+        newer = self.cache.summarize(self.habit, "2024-01-03")
+        self.cache.store_summary(snapshot, summarize(snapshot.logs, snapshot.frequency), "2024-01-03")
+        self.assertIs(self.cache.cached_summary(self.habit, "2024-01-03"), newer)
+
+
+class TestBatchAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "savefile.json")
+        data = {}
+        for user in range(5):
+            data[f"User{user}"] = [
+                {"name": f"Habit{i}", "goal": "", "frequency": "Daily", "start_date": "2024-01-01", "streak": 1,
+                 "logs": ["2024-01-01", "2024-01-02", "2024-01-04"][:i + 1]} for i in range(3)]
+        data["User0"].append({"name": "Broken", "goal": "", "frequency": "Sometimes", "start_date": "2024-01-01",
+                              "streak": 1, "logs": ["2024-01-01"]})
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_rows(self):
+        rows = list(analyze_savefile(self.path, workers=1))
+        self.assertEqual(len(rows), 15)
+        self.assertEqual((rows[2]["user"], rows[2]["habit"]), ("User0", "Habit2"))
+        self.assertEqual((rows[2]["longest_streak"], rows[2]["times_broken"]), (2, 1))
+        self.assertEqual(rows[2]["next_due_date"], "2024-01-05")
+
+    def test_order_is_deterministic(self):
+        expected = list(analyze_savefile(self.path, workers=1))
+        self.assertEqual(list(analyze_savefile(self.path, workers=2, chunk_size=2)), expected)
+
+    def test_csv(self):
+        path = os.path.join(self.tmpdir.name, "report.csv")
+        with open(path, "w", newline="") as f:
+            self.assertEqual(write_csv(analyze_savefile(self.path, workers=1), f), 15)
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 16)
+
+
+class TestCrossUserStats(unittest.TestCase):
+
+    def habit(self, name, frequency, logs):
+        return {"name": name, "goal": "", "frequency": frequency, "start_date": logs[0], "streak": 1, "logs": logs}
+
+    def test_top_k(self):
+        stats = CrossUserStats(top_k=2)
+        today = datetime(2024, 1, 10).toordinal()
+        for user, length in [("Alice", 3), ("Bob", 5), ("Carol", 4), ("Dave", 5)]:
+            logs = [f"2024-01-{day:02d}" for day in range(10 - length, 10)]
+            stats.add_habit(user, self.habit("Reading", "Daily", logs), today)
+        self.assertEqual(stats.top_longest_streaks(), [(5, "Bob", "Reading"), (5, "Dave", "Reading")])
+        self.assertEqual(stats.users, 4)
+
+    def test_overdue_has_no_current_streak(self):
+        stats = CrossUserStats()
+        stats.add_habit("Alice", self.habit("Reading", "Daily", ["2024-01-01", "2024-01-02"]),
+                        datetime(2024, 2, 1).toordinal())
+        self.assertEqual(stats.top_current_streaks(), [(0, "Alice", "Reading")])
+        self.assertEqual(stats.top_longest_streaks(), [(2, "Alice", "Reading")])
+
+    def test_percentiles_and_bounded_sample(self):
+        stats = CrossUserStats(sample_size=50, seed=1)
+        for i in range(200):
+            logs = ["2024-01-01", "2024-01-02"] if i % 2 else ["2024-01-01", "2024-01-05"]
+            stats.add_habit(f"User{i}", self.habit("Reading", "Daily", logs))
+        self.assertEqual(stats.frequency_types(), {"Daily": 200})
+        self.assertEqual(len(stats._samples["Daily"]), 50)
+        percentiles = stats.percentiles("Daily", (0, 100))
+        self.assertEqual((percentiles[0], percentiles[100]), (0.0, 100.0))
+        self.assertEqual(stats.percentiles("Weekly"), {})
+
+    def test_collect_from_savefile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = SaveFileManager(os.path.join(tmpdir, "savefile.json"))
+            manager.save_data("Alice", [Habit("Reading", "", "Weekly", logs=["2024-01-01", "2024-01-08"])])
+            manager.save_data("Bob", [Habit("Running", "", "Every 2 Days", logs=["2024-01-01"])])
+            stats = collect_cross_user_stats(iter_manager_habits(manager))
+        self.assertEqual((stats.users, stats.habits), (2, 2))
+        self.assertEqual(stats.frequency_types(), {"Weekly": 1, "Every N Days": 1})
+
+
+@unittest.skipIf(AnalyzerNumpy is None, "NumPy is not installed")
+class TestDueIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DueIndex()
+        self.index.update(("Alice", 1), "2024-01-05", "Reading")
+        self.index.update(("Alice", 2), "2024-01-10", "Running")
+        self.index.update(("Bob", 1), "2024-01-10", "Cooking")
+        self.index.update(("Bob", 2), "2024-01-20", "Writing")
+        self.today = datetime(2024, 1, 10).toordinal()
+
+    def names(self, entries):
+        return [entry.habit for entry in entries]
+
+    def test_queries(self):
+        self.assertEqual(self.names(self.index.due_on(self.today)), ["Running", "Cooking"])
+        self.assertEqual(self.names(self.index.overdue(self.today)), ["Reading"])
+        self.assertEqual(self.names(self.index.overdue(self.today, min_days=5)), [])
+        self.assertEqual(self.names(self.index.due_within(self.today, 7)), ["Running", "Cooking"])
+        self.assertEqual(self.names(self.index.due_within(self.today, 10)), ["Running", "Cooking", "Writing"])
+
+    def test_user_queries(self):
+        self.assertEqual(self.names(self.index.due_on(self.today, user="Bob")), ["Cooking"])
+        self.assertEqual(self.names(self.index.overdue(self.today, user="Alice")), ["Reading"])
+        self.assertEqual(self.index.overdue(self.today, user="Bob"), [])
+        self.assertEqual(self.index.due_within(self.today, user="Carol"), [])
+        self.assertEqual(sorted(self.index.users()), ["Alice", "Bob"])
+
+    def test_many_habits_stay_sorted(self):
+        index = DueIndex()
+        for i in range(2000):
+            index.update(("Alice", i), (datetime(2024, 1, 1) + timedelta(days=i * 7 % 365)).strftime("%Y-%m-%d"), "Habit")
+        for i in range(0, 2000, 2):
+            index.remove(("Alice", i))
+        entries = index.due_within(0, 10 ** 6, user="Alice")
+        self.assertEqual(len(entries), 1000)
+        self.assertEqual([entry.due_date for entry in entries], sorted(entry.due_date for entry in entries))
+
+    def test_update_and_remove(self):
+        self.index.update(("Alice", 1), "2024-01-15", "Reading")
+        self.assertEqual(self.names(self.index.overdue(self.today)), [])
+        self.assertEqual(self.index.get(("Alice", 1)).due_date, "2024-01-15")
+        self.index.remove(("Bob", 1))
+        self.index.remove(("Bob", 1))
+        self.assertEqual(self.names(self.index.due_on(self.today)), ["Running"])
+        self.index.remove_user("Alice")
+        self.assertEqual(len(self.index), 1)
+        self.assertIsNone(self.index.get(("Alice", 2)))
+
+    def test_build_from_savefile(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = SaveFileManager(os.path.join(tmpdir, "savefile.json"))
+            manager.save_data("Alice", [Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-02"]),
+                                        Habit("Running", "", "Weekly", logs=["2024-01-01"])])
+            manager.save_data("Bob", [Habit("Cooking", "", "Every 3 Days", logs=["2024-01-01"])])
+            index = build_due_index(iter_manager_habits(manager))
+        self.assertEqual([(entry.due_date, entry.user, entry.habit) for entry in index.due_within(0, 10 ** 6)],
+                         [("2024-01-03", "Alice", "Reading"), ("2024-01-04", "Bob", "Cooking"),
+                          ("2024-01-14", "Alice", "Running")])
+
+
+class TestHabitRowModel(unittest.TestCase):
+
+    def test_habit_row(self):
+        habit = Habit("Reading", "", "Daily", start_date="2024-01-01", logs=["2024-01-01", "2024-01-02"])
+        row = habit_row(habit, 3)
+        self.assertEqual(len(row), len(COLUMNS))
+        self.assertEqual(row[:7], ("Reading", "Daily", "2024-01-01", "2024-01-02", "2024-01-03", "3", "2"))
+        self.assertEqual(habit_row(habit, -1)[6], "0")
+        monthly = Habit("Cleaning", "", "Monthly", start_date="2024-01-01", logs=["2024-01-01"])
+        self.assertEqual(habit_row(monthly, 3)[7:9], ("n/a", "n/a"))
+
+    def test_widest(self):
+        model = HabitRowModel(["Habit", "Streak"])
+        model.set_rows([("Read", "1"), ("Go running", "12")], [0, 2])
+        self.assertEqual((model.widest(0), model.widest(1)), ("Go running", "Streak"))
+        self.assertEqual(model.habit_index(1), 2)
+        self.assertEqual(model.habit_index(-1), -1)
+
+        model.set_row(1, ("Run", "12345678"))
+        self.assertEqual((model.widest(0), model.widest(1)), ("Habit", "12345678"))
+        self.assertEqual(model.text(1, 0), "Run")
+
+    def test_append_and_remove(self):
+        model = HabitRowModel(["Habit"])
+        model.set_rows([("Read",), ("Go running",), ("Cook",)], [0, 2, 3])
+        model.append_row(("Write",), 4)
+        self.assertEqual(model.row_of(4), 3)
+        self.assertEqual(model.remove_habit(1), -1)
+        self.assertEqual(model.habit_indices, [0, 1, 2, 3])
+        self.assertEqual(model.remove_habit(1), 1)
+        self.assertEqual(model.habit_indices, [0, 1, 2])
+        self.assertEqual(model.widest(0), "Habit")
+
+
+class TestResetOverdueStreaks(unittest.TestCase):
+
+    def test_only_overdue_streaks_are_reset(self):
+        overdue = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-02"])
+        due = Habit("Running", "", "Weekly", logs=["2024-01-01", "2024-01-08"])
+        no_streak = Habit("Cooking", "", "Daily", logs=["2024-01-01"])
+        no_streak.streak = 0
+        today = datetime(2024, 1, 10).toordinal()
+        self.assertTrue(overdue.is_overdue(today))
+        self.assertFalse(due.is_overdue(today))
+
+        version = due.version
+        self.assertEqual(reset_overdue_streaks([overdue, due, no_streak], today), [overdue])
+        self.assertEqual((overdue.streak, due.streak), (0, 2))
+        self.assertEqual(due.version, version)
+        self.assertEqual(reset_overdue_streaks([overdue, due, no_streak], today), [])
+
+    def test_loading_a_reset_habit_changes_nothing(self):
+        habit = Habit("Reading", "", "Daily", logs=["2024-01-01", "2024-01-02"])
+        self.assertEqual(habit.streak, 2)
+        reset_overdue_streaks([habit])
+        loaded = Habit.from_dict(habit.to_dict())
+        self.assertEqual((loaded.streak, loaded.version), (0, 0))
+        self.assertEqual(reset_overdue_streaks([loaded]), [])
+        # A streak saved before the habit became overdue is still reset.
+        self.assertEqual(len(reset_overdue_streaks([Habit.from_dict(dict(habit.to_dict(), streak=2))])), 1)
+
+
+class TestTimelineBins(unittest.TestCase):
+
+    def setUp(self):
+        self.first = datetime(2019, 1, 1).toordinal()
+        # Five years of daily logs.
+        self.timeline = TimelineBins(range(self.first, self.first + 5 * 365))
+
+    def test_aggregates(self):
+        starts, widths, counts = self.timeline.aggregate("month")
+        self.assertEqual(len(starts), 60)
+        self.assertEqual((starts[1], widths[1], counts[1]), (datetime(2019, 2, 1).toordinal(), 28, 28))
+        self.assertEqual(sum(counts), 5 * 365)
+        starts, widths, counts = self.timeline.aggregate("week")
+        self.assertTrue(all(start == week_start(start) for start in starts))
+        self.assertEqual(sum(counts), 5 * 365)
+        self.assertEqual(month_start(datetime(2024, 2, 29).toordinal()), datetime(2024, 2, 1).toordinal())
+
+    def test_mode_follows_zoom(self):
+        last = self.first + 5 * 365
+        self.assertEqual(self.timeline.mode(self.first, last), "month")
+        self.assertEqual(self.timeline.mode(self.first, self.first + 4 * 365), "week")
+        self.assertEqual(self.timeline.mode(self.first, self.first + 100), "events")
+        self.assertEqual(len(self.timeline.events(self.first, self.first + 100)), 101)
+
+    def test_visible_bins(self):
+        starts, widths, counts = self.timeline.bins("month", datetime(2020, 3, 15).toordinal(),
+                                                    datetime(2020, 5, 2).toordinal())
+        self.assertEqual(list(starts), [datetime(2020, month, 1).toordinal() for month in (3, 4, 5)])
+        self.assertEqual(list(counts), [31, 30, 31])
+
+    def test_zoom_changes_mode(self):
+        # The x values of matplotlib dates, day ordinal 0 is 719163 days before 1970-01-01.
+        offset = -719163.0
+        low, high = self.first - 1 + offset, self.first + 5 * 365 + offset
+        self.assertEqual(visible_days(low, high, offset), (self.first - 1, self.first + 5 * 365 + 1))
+        self.assertEqual(self.timeline.mode(*visible_days(low, high, offset)), "month")
+        # Zooming in to about three months draws the single entries.
+        self.assertEqual(self.timeline.mode(*visible_days(low, low + 90.5, offset)), "events")
+        # Panning to a time without logs still shows events.
+        self.assertEqual(self.timeline.mode(*visible_days(high + 10, high + 3000, offset)), "events")
+
+
+class TestAnalyzerNumpy(unittest.TestCase):
+
+    def setUp(self):
+        self.logs = ["2023-12-25", "2023-12-26", "2023-12-27", "2024-01-03", "2024-01-04", "2024-02-20"]
+
+    def test_gaps(self):
+        self.assertEqual(AnalyzerNumpy.average_duration_between_dates(self.logs), 11)
+        self.assertEqual(AnalyzerNumpy.longest_break_between_dates(self.logs), 47)
+        self.assertEqual(AnalyzerNumpy.average_duration_between_dates(["2024-01-01"]), 0)
+
+    def test_month_counts(self):
+        self.assertEqual(AnalyzerNumpy.count_performed_in_month(self.logs, 1, 2024), 2)
+        self.assertEqual(AnalyzerNumpy.count_performed_per_month(self.logs),
+                         {(2023, 12): 3, (2024, 1): 2, (2024, 2): 1})
+
+    def test_streaks_match_habit(self):
+        for frequency in ["Daily", "Weekly", "Monthly", "Every 2 Days"]:
+            habit = Habit("Reading", "", frequency, logs=self.logs)
+            self.assertEqual(AnalyzerNumpy.find_longest_streak(self.logs, frequency),
+                             (habit.longest_streak, habit.times_broken))
+
+    def test_iso_weeks(self):
+        days = [datetime(2020, 12, 31), datetime(2021, 1, 3), datetime(2021, 1, 4), datetime(2024, 12, 30)]
+        weeks = AnalyzerNumpy.iso_weeks(AnalyzerNumpy.days_from_ordinals([day.toordinal() for day in days]))
+        self.assertEqual(weeks.tolist(), [day.isocalendar()[1] for day in days])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+
+
+class WriteBehindSaver:
+    """
+    Saves habit data on a background thread so the GUI never waits for the disk.
+
+    Every submit takes a snapshot of the habits and returns right away. The writer thread waits
+    until no new data was submitted for `delay` seconds and then writes the latest snapshot of
+    every pending user once, so a burst of clicks ends up as a single write. Data that has been
+    pending for `max_delay` seconds is written even if the submits don't stop.
+
+    Attributes:
+        save_file_manager: The save file manager used for the actual writes.
+        delay (float): Seconds without new submits before the pending data is written.
+        max_delay (float): Seconds after the first pending submit the data is written at the latest.
+        writes (int): Number of writes done so far.
+        coalesced (int): Number of submits that were replaced by a newer one before being written.
+        last_latency (float): Seconds between the first submit of the last written batch and the end of its write.
+        max_latency (float): The highest latency seen so far.
+    """
+
+    def __init__(self, save_file_manager, delay=0.5, max_delay=5.0):
+        """
+        Initializes the WriteBehindSaver and starts the writer thread.
+
+        Parameters:
+            save_file_manager: The save file manager used for the actual writes.
+            delay (float, optional): Seconds without new submits before writing. Defaults to 0.5.
+            max_delay (float, optional): Seconds after the first pending submit before writing anyway. Defaults to 5.0.
+        """
+        self.save_file_manager = save_file_manager
+        self.delay = delay
+        self.max_delay = max_delay
+
+        self.writes = 0
+        self.coalesced = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+        # Mapping of user names to the latest habit snapshots and the time of the first pending submit.
+        self._pending = {}
+        self._last_submit = 0.0
+        self._writing = False
+        self._flush_requested = False
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="WriteBehindSaver", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_name, habits_list):
+        """
+        Queues the habits of a user for saving.
+
+        Parameters:
+            user_name (str): Name of the user.
+            habits_list (list): List of Habit objects to be saved.
+        """
+        # The snapshot is taken on the calling thread, later changes to the habits don't affect it.
+        snapshots = [habit.snapshot() for habit in habits_list]
+        with self._condition:
+            now = time.monotonic()
+            if user_name in self._pending:
+                self.coalesced += 1
+                first_submit = self._pending[user_name][1]
+            else:
+                first_submit = now
+            self._pending[user_name] = (snapshots, first_submit)
+            self._last_submit = now
+            self._condition.notify_all()
+
+    def queue_depth(self):
+        """
+        Returns the number of users waiting to be written.
+
+        Returns:
+            int: The number of pending users.
+        """
+        with self._condition:
+            return len(self._pending)
+
+    def metrics(self):
+        """
+        Collects the current queue and latency figures.
+
+        Returns:
+            dict: The queue depth, write and coalesce counters and the last and maximum write latency in seconds.
+        """
+        with self._condition:
+            return {
+                'queue_depth': len(self._pending),
+                'writes': self.writes,
+                'coalesced': self.coalesced,
+                'last_latency': self.last_latency,
+                'max_latency': self.max_latency
+            }
+
+    def flush(self):
+        """
+        Writes all pending data right away and waits until it is on disk.
+        """
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._pending or self._writing:
+                self._condition.wait()
+            self._flush_requested = False
+
+    def close(self):
+        """
+        Flushes the pending data and stops the writer thread.
+        """
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        logging.info(f"Write-behind saver closed. Metrics: {self.metrics()}")
+
+    def _run(self):
+        """
+        Main loop of the writer thread.
+        """
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._pending:
+                    return
+
+                # Debounce: wait until the burst of submits is over, but not longer than max_delay
+                # after the oldest pending submit.
+                while not self._flush_requested and not self._closed:
+                    oldest_submit = min(first_submit for _, first_submit in self._pending.values())
+                    deadline = min(self._last_submit + self.delay, oldest_submit + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending
+                self._pending = {}
+                self._writing = True
+
+            try:
+                for user_name, (snapshots, first_submit) in batch.items():
+                    self.save_file_manager.save_data(user_name, snapshots)
+                    latency = time.monotonic() - first_submit
+                    with self._condition:
+                        self.writes += 1
+                        self.last_latency = latency
+                        self.max_latency = max(self.max_latency, latency)
+                    logging.debug(f"Write-behind save of user {user_name} took {latency:.3f} s after the first submit.")
+            except Exception as e:
+                logging.error(f"Error in write-behind saver: {str(e)}")
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()